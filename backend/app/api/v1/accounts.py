@@ -0,0 +1,95 @@
+from fastapi import APIRouter, HTTPException, Request, status
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.core.config import settings
+from app.core.deps import DbSession, CurrentUser
+from app.core.uploads import UploadError, UploadStream, UploadTooLarge
+from app.models.finance import BankAccount, ExpenseStatement
+from app.schemas.finance import BankAccountCreate, BankAccountResponse, StatementResponse
+from app.services.statement_import import StatementImportError, import_statement
+
+router = APIRouter(prefix="/accounts", tags=["Accounts"])
+
+
+@router.post("", response_model=BankAccountResponse, status_code=status.HTTP_201_CREATED)
+async def create_account(account_data: BankAccountCreate, current_user: CurrentUser, db: DbSession):
+    account = BankAccount(
+        user_id=current_user.id,
+        name=account_data.name,
+        institution=account_data.institution,
+        currency=account_data.currency.upper(),
+    )
+    db.add(account)
+    await db.commit()
+    await db.refresh(account)
+    return account
+
+
+@router.get("", response_model=list[BankAccountResponse])
+async def list_accounts(current_user: CurrentUser, db: DbSession):
+    result = await db.execute(
+        select(BankAccount)
+        .where(BankAccount.user_id == current_user.id)
+        .order_by(BankAccount.created_at)
+    )
+    return result.scalars().all()
+
+
+@router.post(
+    "/{account_id}/statements",
+    response_model=StatementResponse,
+    status_code=status.HTTP_201_CREATED,
+)
+async def upload_statement(account_id: int, request: Request, current_user: CurrentUser, db: DbSession):
+    """Import a CSV or OFX/QFX statement sent as the ``file`` field of a multipart form.
+
+    The file is received in full before anything is written, then parsed
+    and inserted in one transaction; transactions already in the account
+    are skipped.
+    """
+    account = await get_user_account(db, current_user.id, account_id)
+    upload = UploadStream(
+        request.headers.get("content-type", ""),
+        request.stream(),
+        max_bytes=settings.STATEMENT_MAX_UPLOAD_MB * 1024 * 1024,
+    )
+    try:
+        return await import_statement(db, account, upload)
+    except UploadTooLarge as e:
+        raise HTTPException(
+            status_code=status.HTTP_413_REQUEST_ENTITY_TOO_LARGE,
+            detail=str(e),
+        )
+    except (UploadError, StatementImportError) as e:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail=str(e),
+        )
+
+
+@router.get("/{account_id}/statements", response_model=list[StatementResponse])
+async def list_statements(account_id: int, current_user: CurrentUser, db: DbSession, limit: int = 50):
+    await get_user_account(db, current_user.id, account_id)
+    result = await db.execute(
+        select(ExpenseStatement)
+        .where(ExpenseStatement.account_id == account_id)
+        .order_by(ExpenseStatement.created_at.desc())
+        .limit(min(limit, 200))
+    )
+    return result.scalars().all()
+
+
+async def get_user_account(db: AsyncSession, user_id: int, account_id: int) -> BankAccount:
+    result = await db.execute(
+        select(BankAccount).where(BankAccount.id == account_id, BankAccount.user_id == user_id)
+    )
+    account = result.scalar_one_or_none()
+
+    if not account:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail="Account not found",
+        )
+
+    return account
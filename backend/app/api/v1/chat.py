@@ -1,10 +1,16 @@
-from fastapi import APIRouter, HTTPException, status
+from datetime import datetime, timezone
+from typing import Optional
+
+from fastapi import APIRouter, HTTPException, Request, Response, status
 from fastapi.responses import StreamingResponse
-from sqlalchemy import select
+from sqlalchemy import func, select, update
+from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy.orm import selectinload
 
+from app.core.database import async_session_maker
 from app.core.deps import DbSession, CurrentUser
-from app.models.chat import ChatSession, ChatMessage, MessageRole
+from app.core.http_cache import cache_headers, make_etag, matched_etag, not_modified
+from app.models.chat import ChatSession, ChatMessage, ChatSessionArchive, MessageRole
 from app.schemas.chat import (
     ChatSessionCreate,
     ChatSessionUpdate,
@@ -13,20 +19,45 @@ from app.schemas.chat import (
     ChatRequest,
     ChatResponse,
     ChatMessageResponse,
+    ImportResult,
+)
+from app.services.chat_archive import rehydrate_session
+from app.services.chat_transfer import (
+    HistoryImportError,
+    export_user_history,
+    import_user_history,
 )
-from app.services.llm_service import llm_service
+from app.services.llm_service import build_conversation_history, llm_service
+from app.services.spending_rollups import spending_summary
 
 router = APIRouter(prefix="/chat", tags=["Chat"])
 
 
 @router.get("/sessions", response_model=list[ChatSessionResponse])
-async def list_sessions(current_user: CurrentUser, db: DbSession):
+async def list_sessions(
+    request: Request,
+    response: Response,
+    current_user: CurrentUser,
+    db: DbSession,
+):
+    # Cheap aggregate first: any create, rename, delete or new message
+    # changes the count or the latest updated_at.
+    result = await db.execute(
+        select(func.count(ChatSession.id), func.max(ChatSession.updated_at))
+        .where(ChatSession.user_id == current_user.id)
+    )
+    count, last_updated = result.one()
+    etag = make_etag("sessions", current_user.id, count, last_updated)
+    if matched := matched_etag(request, etag):
+        return not_modified(matched)
+
     result = await db.execute(
         select(ChatSession)
         .where(ChatSession.user_id == current_user.id)
         .order_by(ChatSession.updated_at.desc())
     )
     sessions = result.scalars().all()
+    response.headers.update(cache_headers(etag))
     return sessions
 
 
@@ -47,20 +78,49 @@ async def create_session(
 
 
 @router.get("/sessions/{session_id}", response_model=ChatSessionWithMessages)
-async def get_session(session_id: int, current_user: CurrentUser, db: DbSession):
+async def get_session(
+    session_id: int,
+    request: Request,
+    response: Response,
+    current_user: CurrentUser,
+    db: DbSession,
+):
+    # Validate the client's copy before loading any messages. Archived
+    # messages are counted too, so archiving doesn't change the ETag.
+    message_count = (
+        select(func.count(ChatMessage.id))
+        .where(ChatMessage.session_id == ChatSession.id)
+        .scalar_subquery()
+    )
+    archived_count = (
+        select(ChatSessionArchive.message_count)
+        .where(
+            ChatSessionArchive.session_id == ChatSession.id,
+            ChatSessionArchive.payload.is_not(None),
+        )
+        .scalar_subquery()
+    )
     result = await db.execute(
-        select(ChatSession)
-        .options(selectinload(ChatSession.messages))
+        select(ChatSession, message_count, archived_count)
         .where(ChatSession.id == session_id, ChatSession.user_id == current_user.id)
     )
-    session = result.scalar_one_or_none()
+    row = result.one_or_none()
 
-    if not session:
+    if not row:
         raise HTTPException(
             status_code=status.HTTP_404_NOT_FOUND,
             detail="Chat session not found",
         )
 
+    session, count, archived = row
+    etag = make_etag("session", session.id, session.updated_at, count + (archived or 0))
+    if matched := matched_etag(request, etag):
+        return not_modified(matched)
+
+    if archived is not None:
+        await rehydrate_session(db, session.id)
+    await db.refresh(session, attribute_names=["messages"])
+    response.headers.update(cache_headers(etag))
     return session
 
 
@@ -111,20 +171,40 @@ async def delete_session(session_id: int, current_user: CurrentUser, db: DbSessi
     await db.commit()
 
 
-@router.post("/send", response_model=ChatResponse)
-async def send_message(
-    chat_request: ChatRequest,
-    current_user: CurrentUser,
-    db: DbSession,
-):
-    # Get or create session
-    if chat_request.session_id:
+@router.get("/export")
+async def export_history(current_user: CurrentUser):
+    return StreamingResponse(
+        export_user_history(current_user.id),
+        media_type="application/x-ndjson",
+        headers={"Content-Disposition": 'attachment; filename="chat-history.ndjson"'},
+    )
+
+
+@router.post("/import", response_model=ImportResult, status_code=status.HTTP_201_CREATED)
+async def import_history(request: Request, current_user: CurrentUser, db: DbSession):
+    # The NDJSON body is buffered to a temporary file, then parsed from there
+    try:
+        return await import_user_history(db, current_user.id, request.stream())
+    except HistoryImportError as e:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail=str(e),
+        )
+
+
+async def get_or_create_session(
+    db: AsyncSession,
+    user_id: int,
+    message: str,
+    session_id: Optional[int] = None,
+) -> ChatSession:
+    if session_id:
         result = await db.execute(
             select(ChatSession)
             .options(selectinload(ChatSession.messages))
             .where(
-                ChatSession.id == chat_request.session_id,
-                ChatSession.user_id == current_user.id,
+                ChatSession.id == session_id,
+                ChatSession.user_id == user_id,
             )
         )
         session = result.scalar_one_or_none()
@@ -134,48 +214,81 @@ async def send_message(
                 status_code=status.HTTP_404_NOT_FOUND,
                 detail="Chat session not found",
             )
-    else:
-        # Create new session
-        session = ChatSession(
-            user_id=current_user.id,
-            title=chat_request.message[:50] + "..." if len(chat_request.message) > 50 else chat_request.message,
-        )
-        db.add(session)
-        await db.commit()
-        await db.refresh(session)
-        session.messages = []
 
-    # Save user message
-    user_message = ChatMessage(
-        session_id=session.id,
-        role=MessageRole.USER,
-        content=chat_request.message,
+        # Continuing a cold session: bring its history back first
+        if await rehydrate_session(db, session.id):
+            await db.refresh(session, attribute_names=["messages"])
+        return session
+
+    # Create new session; start with an empty, already-loaded message list so
+    # building the history below never triggers a lazy load.
+    session = ChatSession(
+        user_id=user_id,
+        title=message[:50] + "..." if len(message) > 50 else message,
+        messages=[],
     )
-    db.add(user_message)
+    db.add(session)
     await db.commit()
-    await db.refresh(user_message)
+    return session
+
+
+async def save_message(
+    db: AsyncSession,
+    session_id: int,
+    role: MessageRole,
+    content: str,
+) -> ChatMessage:
+    message = ChatMessage(
+        session_id=session_id,
+        role=role,
+        content=content,
+    )
+    db.add(message)
+    # Keep the session's updated_at in step with its history so listings
+    # sort by activity and ETags change with every new message.
+    await db.execute(
+        update(ChatSession)
+        .where(ChatSession.id == session_id)
+        .values(updated_at=datetime.now(timezone.utc))
+    )
+    await db.commit()
+    await db.refresh(message)
+    return message
+
+
+def sse_event(data: str) -> str:
+    return f"data: {data}\n\n"
+
+
+@router.post("/send", response_model=ChatResponse)
+async def send_message(
+    chat_request: ChatRequest,
+    current_user: CurrentUser,
+    db: DbSession,
+):
+    session = await get_or_create_session(
+        db, current_user.id, chat_request.message, chat_request.session_id
+    )
 
     # Build conversation history for context
-    conversation_history = [
-        {"role": msg.role.value, "content": msg.content}
-        for msg in session.messages
-    ]
+    conversation_history = build_conversation_history(session)
+
+    # Save user message
+    user_message = await save_message(
+        db, session.id, MessageRole.USER, chat_request.message
+    )
 
     # Generate AI response
     ai_response = await llm_service.generate_response(
         message=chat_request.message,
         conversation_history=conversation_history,
+        user_context=await spending_summary(db, current_user.id),
     )
 
     # Save assistant message
-    assistant_message = ChatMessage(
-        session_id=session.id,
-        role=MessageRole.ASSISTANT,
-        content=ai_response,
+    assistant_message = await save_message(
+        db, session.id, MessageRole.ASSISTANT, ai_response
     )
-    db.add(assistant_message)
-    await db.commit()
-    await db.refresh(assistant_message)
 
     return ChatResponse(
         session_id=session.id,
@@ -190,67 +303,33 @@ async def send_message_stream(
     current_user: CurrentUser,
     db: DbSession,
 ):
-    # Get or create session
-    if chat_request.session_id:
-        result = await db.execute(
-            select(ChatSession)
-            .options(selectinload(ChatSession.messages))
-            .where(
-                ChatSession.id == chat_request.session_id,
-                ChatSession.user_id == current_user.id,
-            )
-        )
-        session = result.scalar_one_or_none()
-
-        if not session:
-            raise HTTPException(
-                status_code=status.HTTP_404_NOT_FOUND,
-                detail="Chat session not found",
-            )
-    else:
-        session = ChatSession(
-            user_id=current_user.id,
-            title=chat_request.message[:50] + "..." if len(chat_request.message) > 50 else chat_request.message,
-        )
-        db.add(session)
-        await db.commit()
-        await db.refresh(session)
-        session.messages = []
-
-    # Save user message
-    user_message = ChatMessage(
-        session_id=session.id,
-        role=MessageRole.USER,
-        content=chat_request.message,
+    session = await get_or_create_session(
+        db, current_user.id, chat_request.message, chat_request.session_id
     )
-    db.add(user_message)
-    await db.commit()
+    conversation_history = build_conversation_history(session)
+    user_context = await spending_summary(db, current_user.id)
 
-    conversation_history = [
-        {"role": msg.role.value, "content": msg.content}
-        for msg in session.messages
-    ]
+    # Save user message
+    await save_message(db, session.id, MessageRole.USER, chat_request.message)
 
     async def generate():
         full_response = []
         async for chunk in llm_service.generate_response_stream(
             message=chat_request.message,
             conversation_history=conversation_history,
+            user_context=user_context,
         ):
             full_response.append(chunk)
-            yield f"data: {chunk}\n\n"
-
-        # Save complete response
-        complete_response = "".join(full_response)
-        assistant_message = ChatMessage(
-            session_id=session.id,
-            role=MessageRole.ASSISTANT,
-            content=complete_response,
-        )
-        db.add(assistant_message)
-        await db.commit()
+            yield sse_event(chunk)
+
+        # Save complete response. The request's session is closed once the
+        # endpoint returns, before this body is sent, so use one of our own
+        async with async_session_maker() as reply_db:
+            await save_message(
+                reply_db, session.id, MessageRole.ASSISTANT, "".join(full_response)
+            )
 
-        yield "data: [DONE]\n\n"
+        yield sse_event("[DONE]")
 
     return StreamingResponse(
         generate(),
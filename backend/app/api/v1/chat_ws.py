@@ -0,0 +1,242 @@
+import asyncio
+import logging
+from typing import Optional
+
+from fastapi import APIRouter, HTTPException, WebSocket, WebSocketDisconnect, status
+from pydantic import BaseModel, ValidationError
+
+from app.api.v1.chat import get_or_create_session, save_message
+from app.core.config import settings
+from app.core.database import async_session_maker
+from app.core.deps import authenticate_token
+from app.core.serialization import dumps
+from app.models.chat import MessageRole
+from app.services.llm_service import build_conversation_history, llm_service
+from app.services.spending_rollups import spending_summary
+
+logger = logging.getLogger(__name__)
+
+router = APIRouter(prefix="/chat", tags=["Chat"])
+
+
+class WSClientFrame(BaseModel):
+    type: str
+    request_id: Optional[str] = None
+    session_id: Optional[int] = None
+    message: Optional[str] = None
+
+
+class ChatConnection:
+    """One authenticated socket carrying any number of chat sessions.
+
+    Every ``send`` frame runs as its own task keyed by ``request_id`` so it can
+    be cancelled independently. All outbound frames go through a bounded
+    queue drained by a single writer: when the client reads slowly the queue
+    fills, ``put`` blocks and the LLM stream stops being consumed. Replies to
+    client frames never wait for room: the reader has to keep reading so a
+    ``cancel`` behind them still gets through.
+
+    Every generation ends with exactly one ``done``, ``cancelled`` or
+    ``error`` frame for its ``request_id``, unless the connection closes first.
+    """
+
+    def __init__(self, websocket: WebSocket, user_id: int):
+        self.websocket = websocket
+        self.user_id = user_id
+        self.outbox: asyncio.Queue[Optional[dict]] = asyncio.Queue(
+            maxsize=settings.WS_SEND_QUEUE_SIZE
+        )
+        self.generations: dict[str, asyncio.Task] = {}
+        self.closing = False
+
+    async def send(self, frame: dict) -> None:
+        await self.outbox.put(frame)
+
+    def reply(self, frame: dict) -> None:
+        """Answer a client frame without blocking the reader.
+
+        Dropped when the outbox is full: the client is not reading, so it
+        would not see the reply any time soon either.
+        """
+        try:
+            self.outbox.put_nowait(frame)
+        except asyncio.QueueFull:
+            logger.warning(f"WebSocket outbox full, dropping {frame['type']} reply")
+
+    async def send_final(self, frame: dict) -> None:
+        """Send a generation's last frame, waiting for room like any other.
+
+        Skipped once the connection is closing: the writer may already be
+        gone, and nobody would read the frame anyway.
+        """
+        if not self.closing:
+            await self.outbox.put(frame)
+
+    async def writer(self) -> None:
+        while True:
+            frame = await self.outbox.get()
+            if frame is None:
+                return
+            await self.websocket.send_text(dumps(frame).decode("utf-8"))
+
+    async def reader(self) -> None:
+        while True:
+            message = await self.websocket.receive()
+            if message["type"] == "websocket.disconnect":
+                raise WebSocketDisconnect(message.get("code", status.WS_1000_NORMAL_CLOSURE))
+            try:
+                # Text or binary; invalid JSON is a ValidationError too
+                frame = WSClientFrame.model_validate_json(message.get("text") or message.get("bytes") or b"")
+            except ValidationError:
+                self.reply({"type": "error", "detail": "Malformed frame"})
+                continue
+
+            if frame.type == "send":
+                self.start_generation(frame)
+            elif frame.type == "cancel":
+                task = self.generations.get(frame.request_id)
+                if task:
+                    task.cancel()
+            elif frame.type == "ping":
+                self.reply({"type": "pong"})
+            else:
+                self.reply({
+                    "type": "error",
+                    "request_id": frame.request_id,
+                    "detail": f"Unknown frame type: {frame.type}",
+                })
+
+    def start_generation(self, frame: WSClientFrame) -> None:
+        if not frame.request_id or not frame.message:
+            self.reply({
+                "type": "error",
+                "request_id": frame.request_id,
+                "detail": "send requires request_id and message",
+            })
+            return
+        if frame.request_id in self.generations:
+            self.reply({
+                "type": "error",
+                "request_id": frame.request_id,
+                "detail": "Duplicate request_id",
+            })
+            return
+        if len(self.generations) >= settings.WS_MAX_CONCURRENT_STREAMS:
+            self.reply({
+                "type": "error",
+                "request_id": frame.request_id,
+                "detail": "Too many concurrent generations",
+            })
+            return
+
+        task = asyncio.create_task(self.generate(frame))
+        self.generations[frame.request_id] = task
+        task.add_done_callback(lambda t: self._finished(frame.request_id, t))
+
+    def _finished(self, request_id: str, task: asyncio.Task) -> None:
+        self.generations.pop(request_id, None)
+        if not task.cancelled() and task.exception():
+            logger.error(f"WebSocket generation {request_id} failed: {task.exception()}")
+
+    async def generate(self, frame: WSClientFrame) -> None:
+        try:
+            await self._generate(frame)
+        except Exception:
+            await self.send_final({
+                "type": "error",
+                "request_id": frame.request_id,
+                "detail": "Generation failed",
+            })
+            raise
+
+    async def _generate(self, frame: WSClientFrame) -> None:
+        request_id = frame.request_id
+        # Each generation gets its own DB session: AsyncSession is not safe to
+        # share between concurrently running tasks.
+        async with async_session_maker() as db:
+            try:
+                session = await get_or_create_session(
+                    db, self.user_id, frame.message, frame.session_id
+                )
+            except HTTPException as e:
+                await self.send({"type": "error", "request_id": request_id, "detail": e.detail})
+                return
+
+            conversation_history = build_conversation_history(session)
+            user_context = await spending_summary(db, self.user_id)
+            await save_message(db, session.id, MessageRole.USER, frame.message)
+            await self.send({"type": "start", "request_id": request_id, "session_id": session.id})
+
+            full_response = []
+            try:
+                async for chunk in llm_service.generate_response_stream(
+                    message=frame.message,
+                    conversation_history=conversation_history,
+                    user_context=user_context,
+                ):
+                    full_response.append(chunk)
+                    await self.send({
+                        "type": "chunk",
+                        "request_id": request_id,
+                        "session_id": session.id,
+                        "content": chunk,
+                    })
+            except asyncio.CancelledError:
+                # Keep whatever was generated so the history stays consistent
+                # with what the client has already rendered.
+                if full_response:
+                    await save_message(
+                        db, session.id, MessageRole.ASSISTANT, "".join(full_response)
+                    )
+                await self.send_final({
+                    "type": "cancelled",
+                    "request_id": request_id,
+                    "session_id": session.id,
+                })
+                raise
+
+            assistant_message = await save_message(
+                db, session.id, MessageRole.ASSISTANT, "".join(full_response)
+            )
+            await self.send({
+                "type": "done",
+                "request_id": request_id,
+                "session_id": session.id,
+                "message_id": assistant_message.id,
+            })
+
+    async def close(self) -> None:
+        self.closing = True
+        for task in list(self.generations.values()):
+            task.cancel()
+        await asyncio.gather(*self.generations.values(), return_exceptions=True)
+
+
+@router.websocket("/ws")
+async def chat_websocket(websocket: WebSocket, token: str):
+    # Authenticate once per connection instead of once per message
+    async with async_session_maker() as db:
+        try:
+            user = await authenticate_token(token, db)
+        except HTTPException as e:
+            await websocket.close(code=status.WS_1008_POLICY_VIOLATION, reason=e.detail)
+            return
+
+    await websocket.accept()
+    connection = ChatConnection(websocket, user.id)
+    writer = asyncio.create_task(connection.writer())
+    reader = asyncio.create_task(connection.reader())
+
+    try:
+        await asyncio.wait({reader, writer}, return_when=asyncio.FIRST_COMPLETED)
+    finally:
+        reader.cancel()
+        await connection.close()
+        writer.cancel()
+        for task in (reader, writer):
+            try:
+                await task
+            except (asyncio.CancelledError, WebSocketDisconnect):
+                pass
+            except Exception as e:
+                logger.error(f"WebSocket chat error: {e}")
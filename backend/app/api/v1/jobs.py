@@ -0,0 +1,59 @@
+from fastapi import APIRouter, HTTPException, status
+from sqlalchemy import select
+
+from app.core.deps import DbSession, CurrentUser
+from app.models.job import Job
+from app.schemas.job import JobCreate, JobResponse
+from app.services.batch_jobs import USER_JOB_KINDS
+from app.services.job_queue import enqueue
+
+router = APIRouter(prefix="/jobs", tags=["Jobs"])
+
+
+@router.post("", response_model=JobResponse, status_code=status.HTTP_202_ACCEPTED)
+async def create_job(job_data: JobCreate, current_user: CurrentUser, db: DbSession):
+    if job_data.kind not in USER_JOB_KINDS:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail=f"Unknown job kind. Available: {', '.join(sorted(USER_JOB_KINDS))}",
+        )
+
+    return await enqueue(
+        db,
+        job_data.kind,
+        job_data.payload,
+        user_id=current_user.id,
+        priority=job_data.priority,
+        # Keys are scoped per user
+        idempotency_key=(
+            f"user:{current_user.id}:{job_data.idempotency_key}"
+            if job_data.idempotency_key else None
+        ),
+    )
+
+
+@router.get("", response_model=list[JobResponse])
+async def list_jobs(current_user: CurrentUser, db: DbSession, limit: int = 50):
+    result = await db.execute(
+        select(Job)
+        .where(Job.user_id == current_user.id)
+        .order_by(Job.created_at.desc())
+        .limit(min(limit, 200))
+    )
+    return result.scalars().all()
+
+
+@router.get("/{job_id}", response_model=JobResponse)
+async def get_job(job_id: int, current_user: CurrentUser, db: DbSession):
+    result = await db.execute(
+        select(Job).where(Job.id == job_id, Job.user_id == current_user.id)
+    )
+    job = result.scalar_one_or_none()
+
+    if not job:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail="Job not found",
+        )
+
+    return job
@@ -0,0 +1,52 @@
+from fastapi import APIRouter, HTTPException, Query, status
+
+from app.core.deps import CurrentUser
+from app.schemas.market import QuoteResponse
+from app.services.market_data import MarketDataError, MarketDataNotConfigured, market_data
+
+router = APIRouter(prefix="/market", tags=["Market"])
+
+MAX_SYMBOLS_PER_REQUEST = 100
+
+
+@router.get("/quotes", response_model=list[QuoteResponse])
+async def get_quotes(
+    current_user: CurrentUser,
+    symbols: str = Query(..., description="Comma-separated, e.g. AAPL,RY.TO"),
+):
+    requested = [s for s in symbols.split(",") if s.strip()]
+    if not requested or len(requested) > MAX_SYMBOLS_PER_REQUEST:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail=f"Request between 1 and {MAX_SYMBOLS_PER_REQUEST} symbols",
+        )
+
+    try:
+        quotes = await market_data.get_quotes(requested)
+    except (MarketDataError, MarketDataNotConfigured) as e:
+        raise HTTPException(
+            status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+            detail=str(e),
+        )
+
+    # Unknown symbols are left out
+    return list(quotes.values())
+
+
+@router.get("/quotes/{symbol}", response_model=QuoteResponse)
+async def get_quote(symbol: str, current_user: CurrentUser):
+    try:
+        quote = await market_data.get_quote(symbol)
+    except (MarketDataError, MarketDataNotConfigured) as e:
+        raise HTTPException(
+            status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+            detail=str(e),
+        )
+
+    if quote is None:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail="Unknown symbol",
+        )
+
+    return quote
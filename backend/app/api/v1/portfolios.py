@@ -0,0 +1,62 @@
+from datetime import date, timedelta
+
+from fastapi import APIRouter, HTTPException, Query, status
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.core.deps import DbSession, CurrentUser
+from app.schemas.portfolio import (
+    PerformanceResponse,
+    PortfolioSummaryResponse,
+    PortfolioValuationResponse,
+)
+from app.services.portfolio_analytics import (
+    PortfolioBook,
+    cents_to_decimal,
+    current_prices,
+    load_book,
+    portfolio_performance,
+    value_portfolios,
+)
+
+router = APIRouter(prefix="/portfolios", tags=["Portfolios"])
+
+
+@router.get("", response_model=list[PortfolioSummaryResponse])
+async def list_portfolios(current_user: CurrentUser, db: DbSession):
+    book = await load_book(db, user_id=current_user.id)
+    valuation = value_portfolios(book, await current_prices(book))
+    return valuation.portfolios()
+
+
+async def get_user_book(db: AsyncSession, user_id: int, portfolio_id: int) -> PortfolioBook:
+    book = await load_book(db, user_id=user_id, portfolio_ids=[portfolio_id])
+    if not len(book):
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail="Portfolio not found",
+        )
+    return book
+
+
+@router.get("/{portfolio_id}", response_model=PortfolioValuationResponse)
+async def get_portfolio(portfolio_id: int, current_user: CurrentUser, db: DbSession):
+    book = await get_user_book(db, current_user.id, portfolio_id)
+    valuation = value_portfolios(book, await current_prices(book))
+    return valuation.portfolio(0)
+
+
+@router.get("/{portfolio_id}/performance", response_model=PerformanceResponse)
+async def get_performance(
+    portfolio_id: int,
+    current_user: CurrentUser,
+    db: DbSession,
+    days: int = Query(90, ge=1, le=3650),
+):
+    book = await get_user_book(db, current_user.id, portfolio_id)
+    end = date.today()
+    curves = await portfolio_performance(db, book, end - timedelta(days=days - 1), end)
+    return PerformanceResponse(
+        portfolio_id=portfolio_id,
+        dates=curves.days.tolist(),
+        values=[cents_to_decimal(cents) for cents in curves.values[0].tolist()],
+    )
@@ -1,9 +1,22 @@
 from fastapi import APIRouter
 
+from app.api.v1.accounts import router as accounts_router
 from app.api.v1.auth import router as auth_router
 from app.api.v1.chat import router as chat_router
+from app.api.v1.chat_ws import router as chat_ws_router
+from app.api.v1.jobs import router as jobs_router
+from app.api.v1.market import router as market_router
+from app.api.v1.portfolios import router as portfolios_router
+from app.api.v1.transactions import router as transactions_router
+from app.core.serialization import FastJSONResponse
 
-api_router = APIRouter()
+api_router = APIRouter(default_response_class=FastJSONResponse)
 
+api_router.include_router(accounts_router)
 api_router.include_router(auth_router)
 api_router.include_router(chat_router)
+api_router.include_router(chat_ws_router)
+api_router.include_router(jobs_router)
+api_router.include_router(market_router)
+api_router.include_router(portfolios_router)
+api_router.include_router(transactions_router)
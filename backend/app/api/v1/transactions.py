@@ -0,0 +1,122 @@
+from datetime import date
+from decimal import Decimal
+from typing import Optional
+
+from fastapi import APIRouter, HTTPException, Query, status
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.core.deps import DbSession, CurrentUser
+from app.models.finance import SpendingRollup, Transaction
+from app.schemas.finance import SpendingRollupResponse, TransactionResponse, TransactionUpdate
+from app.services.spending_rollups import RollupChanges
+from app.services.statement_import import CATEGORIES
+
+router = APIRouter(prefix="/transactions", tags=["Transactions"])
+
+
+@router.get("", response_model=list[TransactionResponse])
+async def list_transactions(
+    current_user: CurrentUser,
+    db: DbSession,
+    account_id: Optional[int] = None,
+    category: Optional[str] = None,
+    start: Optional[date] = None,
+    end: Optional[date] = None,
+    limit: int = Query(100, ge=1, le=1000),
+    offset: int = Query(0, ge=0),
+):
+    stmt = select(Transaction).where(Transaction.user_id == current_user.id)
+    if account_id is not None:
+        stmt = stmt.where(Transaction.account_id == account_id)
+    if category is not None:
+        stmt = stmt.where(Transaction.category == category)
+    if start is not None:
+        stmt = stmt.where(Transaction.posted_on >= start)
+    if end is not None:
+        stmt = stmt.where(Transaction.posted_on <= end)
+
+    result = await db.execute(
+        stmt.order_by(Transaction.posted_on.desc(), Transaction.id.desc()).offset(offset).limit(limit)
+    )
+    return result.scalars().all()
+
+
+@router.get("/rollups", response_model=list[SpendingRollupResponse])
+async def list_rollups(
+    current_user: CurrentUser,
+    db: DbSession,
+    start: Optional[date] = None,
+    end: Optional[date] = None,
+):
+    """Per-month, per-category totals, read from the maintained rollups."""
+    stmt = select(SpendingRollup).where(
+        SpendingRollup.user_id == current_user.id,
+        SpendingRollup.transaction_count > 0,
+    )
+    if start is not None:
+        stmt = stmt.where(SpendingRollup.month >= start.replace(day=1))
+    if end is not None:
+        stmt = stmt.where(SpendingRollup.month <= end)
+
+    result = await db.execute(stmt.order_by(SpendingRollup.month.desc(), SpendingRollup.category))
+    return [
+        SpendingRollupResponse(
+            month=rollup.month,
+            category=rollup.category,
+            transaction_count=rollup.transaction_count,
+            spent=Decimal(rollup.spent_cents).scaleb(-2),
+            received=Decimal(rollup.received_cents).scaleb(-2),
+        )
+        for rollup in result.scalars()
+    ]
+
+
+@router.patch("/{transaction_id}", response_model=TransactionResponse)
+async def update_transaction(
+    transaction_id: int,
+    update_data: TransactionUpdate,
+    current_user: CurrentUser,
+    db: DbSession,
+):
+    transaction = await get_user_transaction(db, current_user.id, transaction_id)
+    if update_data.category is not None and update_data.category not in CATEGORIES:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail=f"Unknown category. Available: {', '.join(CATEGORIES)}",
+        )
+
+    rollups = RollupChanges()
+    rollups.remove_transaction(transaction)
+    for field, value in update_data.model_dump(exclude_unset=True, exclude_none=True).items():
+        setattr(transaction, field, value)
+    rollups.add_transaction(transaction)
+    await rollups.apply(db)
+    await db.commit()
+    await db.refresh(transaction)
+    return transaction
+
+
+@router.delete("/{transaction_id}", status_code=status.HTTP_204_NO_CONTENT)
+async def delete_transaction(transaction_id: int, current_user: CurrentUser, db: DbSession):
+    transaction = await get_user_transaction(db, current_user.id, transaction_id)
+    rollups = RollupChanges()
+    rollups.remove_transaction(transaction)
+    await db.delete(transaction)
+    await rollups.apply(db)
+    await db.commit()
+
+
+async def get_user_transaction(db: AsyncSession, user_id: int, transaction_id: int) -> Transaction:
+    result = await db.execute(
+        select(Transaction).where(Transaction.id == transaction_id, Transaction.user_id == user_id)
+    )
+    transaction = result.scalar_one_or_none()
+
+    if not transaction:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail="Transaction not found",
+        )
+
+    return transaction
@@ -0,0 +1,158 @@
+"""gzip/brotli response compression.
+
+Like starlette's ``GZipMiddleware`` but also negotiates brotli (when the
+``brotli`` package is installed) and never touches ``text/event-stream``
+responses, which must reach the client chunk by chunk.
+"""
+import zlib
+from typing import Optional
+
+from starlette.datastructures import Headers, MutableHeaders
+from starlette.types import ASGIApp, Message, Receive, Scope, Send
+
+try:
+    import brotli
+except ImportError:  # pragma: no cover - optional dependency
+    brotli = None
+
+UNCOMPRESSIBLE_TYPES = ("text/event-stream",)
+
+
+def choose_encoding(accept_encoding: str) -> Optional[str]:
+    accepted = {}
+    for item in accept_encoding.split(","):
+        coding, _, params = item.strip().partition(";")
+        q = 1.0
+        params = params.strip()
+        if params.startswith("q="):
+            try:
+                q = float(params[2:])
+            except ValueError:
+                q = 0.0
+        if coding:
+            accepted[coding.lower()] = q
+
+    if brotli is not None and accepted.get("br", 0) > 0:
+        return "br"
+    if accepted.get("gzip", 0) > 0:
+        return "gzip"
+    return None
+
+
+class _Compressor:
+    def __init__(self, encoding: str, gzip_level: int, brotli_quality: int):
+        self.encoding = encoding
+        if encoding == "br":
+            self._brotli = brotli.Compressor(quality=brotli_quality)
+        else:
+            self._zlib = zlib.compressobj(gzip_level, zlib.DEFLATED, 31)
+
+    def compress(self, data: bytes) -> bytes:
+        if self.encoding == "br":
+            return self._brotli.process(data) + self._brotli.flush()
+        return self._zlib.compress(data) + self._zlib.flush(zlib.Z_SYNC_FLUSH)
+
+    def finish(self, data: bytes = b"") -> bytes:
+        if self.encoding == "br":
+            return self._brotli.process(data) + self._brotli.finish()
+        return self._zlib.compress(data) + self._zlib.flush(zlib.Z_FINISH)
+
+
+class CompressionMiddleware:
+    def __init__(
+        self,
+        app: ASGIApp,
+        minimum_size: int = 1024,
+        gzip_level: int = 6,
+        brotli_quality: int = 4,
+    ) -> None:
+        self.app = app
+        self.minimum_size = minimum_size
+        self.gzip_level = gzip_level
+        self.brotli_quality = brotli_quality
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        if scope["type"] == "http":
+            encoding = choose_encoding(Headers(scope=scope).get("Accept-Encoding", ""))
+            responder = _CompressionResponder(self, encoding, send)
+            await self.app(scope, receive, responder.send)
+            return
+        await self.app(scope, receive, send)
+
+
+class _CompressionResponder:
+    def __init__(self, middleware: CompressionMiddleware, encoding: Optional[str], send: Send):
+        self.middleware = middleware
+        self.encoding = encoding
+        self.downstream = send
+        self.initial_message: Message = {}
+        self.started = False
+        self.passthrough = False
+        self.compressor: Optional[_Compressor] = None
+
+    async def send(self, message: Message) -> None:
+        message_type = message["type"]
+        if message_type == "http.response.start":
+            # Hold the headers until the first body chunk tells us whether
+            # the response is worth compressing.
+            self.initial_message = message
+            headers = MutableHeaders(raw=message["headers"])
+            content_type = headers.get("content-type", "")
+            compressible = not (
+                "content-encoding" in headers
+                or content_type.startswith(UNCOMPRESSIBLE_TYPES)
+            )
+            if compressible:
+                # Whether or not this one is compressed, the response to the
+                # same request with another Accept-Encoding may be, so shared
+                # caches must key on it (304s included)
+                headers.add_vary_header("Accept-Encoding")
+            self.passthrough = not compressible or self.encoding is None
+            return
+
+        if message_type != "http.response.body":
+            await self.downstream(message)
+            return
+
+        if self.passthrough:
+            if not self.started:
+                self.started = True
+                await self.downstream(self.initial_message)
+            await self.downstream(message)
+            return
+
+        body = message.get("body", b"")
+        more_body = message.get("more_body", False)
+
+        if not self.started:
+            self.started = True
+            if len(body) < self.middleware.minimum_size and not more_body:
+                await self.downstream(self.initial_message)
+                await self.downstream(message)
+                self.passthrough = True
+                return
+
+            self.compressor = _Compressor(
+                self.encoding, self.middleware.gzip_level, self.middleware.brotli_quality
+            )
+            headers = MutableHeaders(raw=self.initial_message["headers"])
+            headers["Content-Encoding"] = self.encoding
+            etag = headers.get("etag")
+            if etag and etag.endswith('"'):
+                # A strong ETag identifies the encoded bytes, so each coding
+                # needs its own tag (see http_cache.matched_etag).
+                headers["ETag"] = f'{etag[:-1]}-{self.encoding}"'
+            if more_body:
+                del headers["Content-Length"]
+                message["body"] = self.compressor.compress(body)
+            else:
+                message["body"] = self.compressor.finish(body)
+                headers["Content-Length"] = str(len(message["body"]))
+            await self.downstream(self.initial_message)
+            await self.downstream(message)
+            return
+
+        message["body"] = (
+            self.compressor.compress(body) if more_body else self.compressor.finish(body)
+        )
+        await self.downstream(message)
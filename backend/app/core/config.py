@@ -10,6 +10,7 @@ class Settings(BaseSettings):
 
     # Database
     DATABASE_URL: str = "sqlite+aiosqlite:///./smartasset.db"
+    DB_SCHEMA_INIT: str = "auto"  # auto, always or skip (see init_db)
 
     # JWT Authentication
     SECRET_KEY: str = "your-secret-key-change-in-production"
@@ -22,6 +23,68 @@ class Settings(BaseSettings):
     OLLAMA_MODEL: str = "llama3.2"
     LLM_MOCK_MODE: bool = False  # Set to True to use mock responses
 
+    # Ollama model residency (see app/services/model_residency.py)
+    OLLAMA_PRELOAD_MODELS: list[str] = []  # Defaults to [OLLAMA_MODEL]
+    OLLAMA_KEEP_ALIVE_ACTIVE: str = "30m"  # keep_alive while a model has traffic
+    OLLAMA_KEEP_ALIVE_IDLE: str = "5m"  # keep_alive once traffic stops
+    OLLAMA_TRAFFIC_WINDOW_SECONDS: int = 900
+    OLLAMA_RESIDENCY_POLL_SECONDS: int = 60
+    OLLAMA_WARMUP_TIMEOUT: float = 300.0
+    OLLAMA_COLD_LOAD_THRESHOLD_MS: int = 500  # load_duration counted as a cold load
+    OLLAMA_NUM_CTX: Optional[int] = None
+    OLLAMA_NUM_PREDICT: Optional[int] = None
+
+    # Chat history archiving (see app/services/chat_archive.py)
+    CHAT_ARCHIVE_AFTER_DAYS: int = 90
+    CHAT_ARCHIVE_INTERVAL_SECONDS: int = 3600  # 0 disables the in-process job
+    CHAT_ARCHIVE_BATCH_SIZE: int = 100
+    CHAT_STORAGE_STATS_TTL_SECONDS: float = 300.0  # How long GET /health/storage reuses its scan
+
+    # Chat history export/import
+    CHAT_EXPORT_YIELD_PER: int = 2000  # Rows fetched per cursor round trip
+    CHAT_IMPORT_BATCH_SIZE: int = 5000  # Rows per executemany insert
+
+    # Background jobs (see app/services/job_queue.py)
+    JOB_WORKER_CONCURRENCY: int = 4  # Jobs in flight per worker process
+    JOB_LLM_CONCURRENCY: int = 1  # Batch LLM generations per process
+    JOB_POLL_SECONDS: float = 1.0
+    JOB_LOCK_TIMEOUT_SECONDS: int = 900  # Running jobs older than this are requeued
+    JOB_RETRY_BASE_SECONDS: float = 10.0
+    JOB_RETRY_MAX_SECONDS: float = 3600.0
+    JOB_WORKER_NICE: int = 10  # CPU niceness added to worker processes
+    JOB_LLM_WAIT_POLL_SECONDS: float = 0.5  # How often a waiting batch generation rechecks for chat
+    LLM_INTERACTIVE_LEASES: bool = False  # Record chat generations so job workers in other processes wait for them
+    LLM_INTERACTIVE_LEASE_SECONDS: int = 600  # Longest a crashed chat generation can hold batch work back
+
+    # Market data (see app/services/market_data.py)
+    MARKET_DATA_PROVIDER: str = ""  # e.g. replay; quote endpoints answer 503 until one is set
+    MARKET_DATA_REPLAY_PATH: str = "./market_replay.jsonl"  # Used by the replay provider
+    MARKET_DATA_TTL_SECONDS: float = 15.0  # Quotes younger than this are served as-is
+    MARKET_DATA_TTL_OVERRIDES: dict[str, float] = {}  # Per-symbol TTL, e.g. {"BTC-USD": 5}
+    MARKET_DATA_STALE_SECONDS: float = 300.0  # Past TTL but within this: served while refreshing
+    MARKET_DATA_BATCH_WINDOW_MS: float = 10.0  # Lookups collected into one upstream request
+    MARKET_DATA_BATCH_SIZE: int = 50  # Max symbols per upstream request
+    MARKET_DATA_CACHE_SIZE: int = 5000  # Symbols kept in memory
+    MARKET_DATA_WRITE_THROUGH: bool = True  # Record fetched quotes in price_history_cache
+
+    # Bank statement import (see app/services/statement_import.py)
+    STATEMENT_IMPORT_BATCH_SIZE: int = 2000  # Rows per bulk insert
+    STATEMENT_MAX_UPLOAD_MB: int = 100
+    UPLOAD_SPOOL_MEMORY_MB: int = 1  # Imports are buffered before parsing; on disk beyond this
+    SPENDING_SUMMARY_MONTHS: int = 3  # Months of rollups in the chat system prompt (0 = off)
+
+    # Serialization
+    JSON_BACKEND: str = "auto"  # auto, orjson, msgspec or json
+
+    # Response compression
+    COMPRESSION_MINIMUM_SIZE: int = 1024  # Bytes; smaller bodies are sent as-is
+    COMPRESSION_GZIP_LEVEL: int = 6
+    COMPRESSION_BROTLI_QUALITY: int = 4
+
+    # WebSocket chat
+    WS_MAX_CONCURRENT_STREAMS: int = 4  # Generations in flight per connection
+    WS_SEND_QUEUE_SIZE: int = 64  # Outbound frames buffered before backpressure
+
     # CORS
     CORS_ORIGINS: list[str] = ["http://localhost:3000", "http://127.0.0.1:3000"]
 
@@ -1,8 +1,17 @@
+import hashlib
+import logging
+from datetime import datetime, timezone
+from typing import Optional
+
+from sqlalchemy import Column, DateTime, Insert, Integer, String, Table, insert, select, update
 from sqlalchemy.ext.asyncio import create_async_engine, AsyncSession, async_sessionmaker
 from sqlalchemy.orm import DeclarativeBase
+from sqlalchemy.schema import CreateIndex, CreateTable
 
 from app.core.config import settings
 
+logger = logging.getLogger(__name__)
+
 
 engine = create_async_engine(
     settings.DATABASE_URL,
@@ -20,6 +29,16 @@ class Base(DeclarativeBase):
     pass
 
 
+# Single-row table recording which schema the database was last created for
+schema_version = Table(
+    "schema_version",
+    Base.metadata,
+    Column("id", Integer, primary_key=True),
+    Column("fingerprint", String(64), nullable=False),
+    Column("applied_at", DateTime(timezone=True), nullable=False),
+)
+
+
 async def get_db() -> AsyncSession:
     async with async_session_maker() as session:
         try:
@@ -28,6 +47,134 @@ async def get_db() -> AsyncSession:
             await session.close()
 
 
-async def init_db():
-    async with engine.begin() as conn:
-        await conn.run_sync(Base.metadata.create_all)
+def _dialect_insert(model) -> Optional[Insert]:
+    """The dialect's ``INSERT`` with ``ON CONFLICT`` support, if it has one."""
+    if engine.dialect.name == "postgresql":
+        from sqlalchemy.dialects.postgresql import insert as dialect_insert
+    elif engine.dialect.name == "sqlite":
+        from sqlalchemy.dialects.sqlite import insert as dialect_insert
+    else:
+        return None
+    return dialect_insert(model)
+
+
+def insert_ignoring_conflicts(model, index_elements: list[str]) -> Insert:
+    """``INSERT`` that silently skips rows violating the given unique index.
+
+    With ``RETURNING`` only the rows actually inserted come back.
+    """
+    stmt = _dialect_insert(model)
+    if stmt is None:
+        return insert(model)
+    return stmt.on_conflict_do_nothing(index_elements=index_elements)
+
+
+async def insert_or_accumulate(
+    db: AsyncSession,
+    model,
+    rows: list[dict],
+    index_elements: list[str],
+    add: list[str],
+    replace: Optional[list[str]] = None,
+) -> None:
+    """Insert ``rows``; for a row already in the given unique index, add the
+    ``add`` columns onto it and overwrite the ``replace`` columns instead.
+
+    The addition happens in the database, so concurrent writers never lose
+    each other's increments. SQLite and PostgreSQL do it in one upsert.
+    Other databases get an ``UPDATE`` per row, and an ``INSERT`` where it
+    matched nothing; two transactions inserting the same new key at once
+    then fail with ``IntegrityError`` rather than losing an increment.
+    """
+    if not rows:
+        return
+    table = model.__table__
+    replace = replace or []
+    stmt = _dialect_insert(model)
+    if stmt is not None:
+        await db.execute(
+            stmt.on_conflict_do_update(
+                index_elements=index_elements,
+                set_={
+                    **{column: table.c[column] + stmt.excluded[column] for column in add},
+                    **{column: stmt.excluded[column] for column in replace},
+                },
+            ),
+            rows,
+        )
+        return
+
+    for row in rows:
+        updated = await db.execute(
+            update(table)
+            .where(*(table.c[column] == row[column] for column in index_elements))
+            .values(
+                **{column: table.c[column] + row[column] for column in add},
+                **{column: row[column] for column in replace},
+            )
+        )
+        if updated.rowcount == 0:
+            await db.execute(insert(table).values(row))
+
+
+def schema_fingerprint() -> str:
+    """Hash of the DDL the current models compile to on this dialect.
+
+    Computed offline from ``Base.metadata``, so it costs no round trips.
+    """
+    import app.models  # noqa: F401  (register every model on the metadata)
+
+    digest = hashlib.sha256()
+    for table in Base.metadata.sorted_tables:
+        digest.update(str(CreateTable(table).compile(dialect=engine.dialect)).encode("utf-8"))
+        for index in sorted(table.indexes, key=lambda i: i.name or ""):
+            digest.update(str(CreateIndex(index).compile(dialect=engine.dialect)).encode("utf-8"))
+    return digest.hexdigest()
+
+
+async def _stored_fingerprint() -> Optional[str]:
+    try:
+        async with engine.connect() as conn:
+            result = await conn.execute(
+                select(schema_version.c.fingerprint).where(schema_version.c.id == 1)
+            )
+            return result.scalar_one_or_none()
+    except Exception:
+        # Fresh database: the version table does not exist yet
+        return None
+
+
+async def init_db() -> str:
+    """Create missing tables according to ``settings.DB_SCHEMA_INIT``.
+
+    - ``always``: run ``create_all`` (reflects every table) on each start
+    - ``auto``: run it only when the stored schema fingerprint differs from
+      the models, so warm restarts cost a single primary-key lookup
+    - ``skip``: never touch the schema (managed by a separate deploy step)
+
+    Returns what was done, for startup logging.
+    """
+    mode = settings.DB_SCHEMA_INIT
+    if mode == "skip":
+        return "skipped"
+
+    fingerprint = schema_fingerprint()
+    if mode == "auto" and await _stored_fingerprint() == fingerprint:
+        return "up to date"
+
+    try:
+        async with engine.begin() as conn:
+            await conn.run_sync(Base.metadata.create_all)
+            await conn.execute(schema_version.delete())
+            await conn.execute(
+                schema_version.insert().values(
+                    id=1, fingerprint=fingerprint, applied_at=datetime.now(timezone.utc)
+                )
+            )
+    except Exception:
+        # Several workers booting at once may race on the same DDL; losing
+        # that race is fine as long as the winner left the expected schema.
+        if await _stored_fingerprint() == fingerprint:
+            return "applied by another worker"
+        raise
+    return "applied"
@@ -0,0 +1,50 @@
+"""Conditional GET helpers (strong ETags / If-None-Match)."""
+import hashlib
+from typing import Optional
+
+from fastapi import Request, Response, status
+
+CONTENT_CODINGS = ("gzip", "br")
+
+
+def make_etag(*parts) -> str:
+    digest = hashlib.sha1(":".join(str(p) for p in parts).encode("utf-8")).hexdigest()
+    return f'"{digest}"'
+
+
+def _normalize(tag: str) -> str:
+    # CompressionMiddleware suffixes the tag with the content-coding it applied
+    for encoding in CONTENT_CODINGS:
+        suffix = f'-{encoding}"'
+        if tag.endswith(suffix):
+            return tag[: -len(suffix)] + '"'
+    return tag
+
+
+def matched_etag(request: Request, etag: str) -> Optional[str]:
+    """The If-None-Match tag that matches ``etag``, or ``None``.
+
+    Comparison is weak and ignores content-coding suffixes; the tag comes
+    back as the client's (strong) representation tag, suffix included.
+    """
+    if_none_match = request.headers.get("if-none-match")
+    if not if_none_match:
+        return None
+    if if_none_match.strip() == "*":
+        return etag
+    for tag in if_none_match.split(","):
+        tag = tag.strip().removeprefix("W/")
+        if _normalize(tag) == etag:
+            return tag
+    return None
+
+
+def cache_headers(etag: str) -> dict[str, str]:
+    # Clients may keep a copy but must revalidate it on every use
+    return {"ETag": etag, "Cache-Control": "private, no-cache"}
+
+
+def not_modified(etag: str) -> Response:
+    """304 for a match; pass the tag from ``matched_etag`` so it names the
+    representation the client holds, as the 200 did."""
+    return Response(status_code=status.HTTP_304_NOT_MODIFIED, headers=cache_headers(etag))
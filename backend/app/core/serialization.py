@@ -0,0 +1,61 @@
+"""JSON encode/decode with an optional high-performance backend.
+
+``orjson`` or ``msgspec`` are used when installed, otherwise the stdlib
+``json`` module. The backend is picked once at import time from
+``settings.JSON_BACKEND`` ("auto", "orjson", "msgspec" or "json").
+"""
+import json
+from typing import Any, Callable
+
+from fastapi.responses import JSONResponse
+
+from app.core.config import settings
+
+
+def _stdlib_dumps(obj: Any) -> bytes:
+    # Same output as starlette's JSONResponse.render
+    return json.dumps(
+        obj,
+        ensure_ascii=False,
+        allow_nan=False,
+        indent=None,
+        separators=(",", ":"),
+    ).encode("utf-8")
+
+
+def _load_backend(name: str) -> tuple[str, Callable[[Any], bytes], Callable[[Any], Any], type[Exception]]:
+    if name in ("auto", "orjson"):
+        try:
+            import orjson
+
+            def _orjson_dumps(obj: Any) -> bytes:
+                return orjson.dumps(obj, option=orjson.OPT_NON_STR_KEYS)
+
+            return "orjson", _orjson_dumps, orjson.loads, orjson.JSONDecodeError
+        except ImportError:
+            if name == "orjson":
+                raise
+
+    if name in ("auto", "msgspec"):
+        try:
+            import msgspec
+
+            return "msgspec", msgspec.json.encode, msgspec.json.decode, msgspec.DecodeError
+        except ImportError:
+            if name == "msgspec":
+                raise
+
+    if name not in ("auto", "json"):
+        raise ValueError(f"Unknown JSON_BACKEND: {name}")
+
+    return "json", _stdlib_dumps, json.loads, json.JSONDecodeError
+
+
+JSON_BACKEND, dumps, loads, JSONDecodeError = _load_backend(settings.JSON_BACKEND)
+
+
+class FastJSONResponse(JSONResponse):
+    """JSONResponse rendered with the configured backend."""
+
+    def render(self, content: Any) -> bytes:
+        return dumps(content)
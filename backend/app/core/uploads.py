@@ -0,0 +1,159 @@
+"""Streaming access to a file uploaded as ``multipart/form-data``.
+
+Starlette's ``request.form()`` spools every file part to a temporary file
+before the endpoint runs. ``UploadStream`` instead runs python-multipart's
+push parser over ``request.stream()`` and yields the bytes of one file
+field as they arrive, so an upload of any size is processed in constant
+memory and while it is still being received.
+
+``spooled`` buffers a body in a temporary file before handing it on, for
+consumers that should not start until the client has finished sending.
+"""
+import tempfile
+from contextlib import asynccontextmanager
+from typing import AsyncIterable, AsyncIterator, Optional
+
+import multipart
+from multipart.exceptions import MultipartParseError
+from multipart.multipart import parse_options_header
+from starlette.concurrency import run_in_threadpool
+
+from app.core.config import settings
+
+SPOOL_READ_SIZE = 64 * 1024
+
+
+class UploadError(ValueError):
+    """The request body is not a usable multipart upload."""
+
+
+class UploadTooLarge(UploadError):
+    pass
+
+
+class UploadStream:
+    """Async iterator over the contents of the ``field_name`` file part.
+
+    ``filename`` is set once that part's headers have been parsed, i.e.
+    before the first chunk is yielded. Other form fields are skipped.
+    """
+
+    def __init__(
+        self,
+        content_type: str,
+        body: AsyncIterable[bytes],
+        field_name: str = "file",
+        max_bytes: Optional[int] = None,
+    ):
+        self.content_type = content_type
+        self.body = body
+        self.field_name = field_name
+        self.max_bytes = max_bytes
+        self.filename: Optional[str] = None
+        self.bytes_read = 0
+
+    def __aiter__(self) -> AsyncIterator[bytes]:
+        return self._chunks()
+
+    async def _chunks(self) -> AsyncIterator[bytes]:
+        mimetype, params = parse_options_header(self.content_type)
+        boundary = params.get(b"boundary")
+        if mimetype != b"multipart/form-data" or not boundary:
+            raise UploadError("Expected a multipart/form-data body with a boundary")
+
+        field = self.field_name.encode()
+        header_name = bytearray()
+        header_value = bytearray()
+        disposition = b""
+        in_file = False
+        found = False
+        ready: list[bytes] = []
+
+        def on_part_begin():
+            nonlocal disposition
+            disposition = b""
+
+        def on_header_field(data: bytes, start: int, end: int):
+            header_name.extend(data[start:end])
+
+        def on_header_value(data: bytes, start: int, end: int):
+            header_value.extend(data[start:end])
+
+        def on_header_end():
+            nonlocal disposition
+            if header_name.lower() == b"content-disposition":
+                disposition = bytes(header_value)
+            header_name.clear()
+            header_value.clear()
+
+        def on_headers_finished():
+            nonlocal in_file, found
+            _, options = parse_options_header(disposition)
+            if not found and options.get(b"name") == field and b"filename" in options:
+                in_file = found = True
+                self.filename = options[b"filename"].decode("utf-8", "replace")
+
+        def on_part_data(data: bytes, start: int, end: int):
+            if in_file:
+                ready.append(data[start:end])
+
+        def on_part_end():
+            nonlocal in_file
+            in_file = False
+
+        parser = multipart.MultipartParser(boundary, {
+            "on_part_begin": on_part_begin,
+            "on_header_field": on_header_field,
+            "on_header_value": on_header_value,
+            "on_header_end": on_header_end,
+            "on_headers_finished": on_headers_finished,
+            "on_part_data": on_part_data,
+            "on_part_end": on_part_end,
+        })
+
+        async for chunk in self.body:
+            self.bytes_read += len(chunk)
+            if self.max_bytes is not None and self.bytes_read > self.max_bytes:
+                raise UploadTooLarge(f"Upload exceeds {self.max_bytes} bytes")
+            try:
+                parser.write(chunk)
+            except MultipartParseError as e:
+                raise UploadError(f"Malformed multipart body: {e}")
+            if ready:
+                data = b"".join(ready)
+                ready.clear()
+                yield data
+
+        parser.finalize()
+        if not found:
+            raise UploadError(f"No file in form field '{self.field_name}'")
+
+
+async def _file_io(file: tempfile.SpooledTemporaryFile, method, *args):
+    # Same as Starlette's UploadFile: only a file that rolled over to disk
+    # is worth a thread
+    if getattr(file, "_rolled", True):
+        return await run_in_threadpool(method, *args)
+    return method(*args)
+
+
+async def _read_chunks(file: tempfile.SpooledTemporaryFile) -> AsyncIterator[bytes]:
+    while chunk := await _file_io(file, file.read, SPOOL_READ_SIZE):
+        yield chunk
+
+
+@asynccontextmanager
+async def spooled(body: AsyncIterable[bytes]) -> AsyncIterator[AsyncIterator[bytes]]:
+    """Receive all of ``body``, then provide an iterator over its chunks.
+
+    Importers enter this before starting their database transaction, so a
+    slow client never keeps a write transaction (on SQLite, the database's
+    write lock) open. The body is held in memory up to
+    ``UPLOAD_SPOOL_MEMORY_MB`` and in a temporary file beyond that; errors
+    raised by ``body`` (e.g. ``UploadTooLarge``) surface on entering.
+    """
+    with tempfile.SpooledTemporaryFile(max_size=settings.UPLOAD_SPOOL_MEMORY_MB * 1024 * 1024) as file:
+        async for chunk in body:
+            await _file_io(file, file.write, chunk)
+        await _file_io(file, file.seek, 0)
+        yield _read_chunks(file)
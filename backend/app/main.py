@@ -1,19 +1,37 @@
+import logging
+import time
 from contextlib import asynccontextmanager
 
 from fastapi import FastAPI
 from fastapi.middleware.cors import CORSMiddleware
 
+from app.core.compression import CompressionMiddleware
 from app.core.config import settings
 from app.core.database import init_db
 from app.api.v1.router import api_router
+from app.services.chat_archive import chat_archiver
+from app.services.market_data import market_data
+from app.services.model_residency import model_residency
+
+
+logger = logging.getLogger(__name__)
 
 
 @asynccontextmanager
 async def lifespan(app: FastAPI):
     # Startup: Initialize database
-    await init_db()
+    started = time.perf_counter()
+    outcome = await init_db()
+    logger.info(f"Schema init {outcome} in {(time.perf_counter() - started) * 1000:.1f} ms")
+    # Load the LLM in the background so startup is not blocked on it
+    model_residency.start()
+    chat_archiver.start()
+    market_data.start()
     yield
     # Shutdown: Cleanup if needed
+    await market_data.stop()
+    await chat_archiver.stop()
+    await model_residency.stop()
 
 
 app = FastAPI(
@@ -32,6 +50,14 @@ app.add_middleware(
     allow_headers=["*"],
 )
 
+# Response compression (skips small bodies and SSE streams)
+app.add_middleware(
+    CompressionMiddleware,
+    minimum_size=settings.COMPRESSION_MINIMUM_SIZE,
+    gzip_level=settings.COMPRESSION_GZIP_LEVEL,
+    brotli_quality=settings.COMPRESSION_BROTLI_QUALITY,
+)
+
 # Include API routes
 app.include_router(api_router, prefix=settings.API_V1_PREFIX)
 
@@ -48,3 +74,18 @@ async def root():
 @app.get("/health")
 async def health_check():
     return {"status": "healthy"}
+
+
+@app.get("/health/models")
+async def model_health():
+    return {"models": model_residency.snapshot()}
+
+
+@app.get("/health/storage")
+async def storage_health():
+    return await chat_archiver.cached_stats()
+
+
+@app.get("/health/market")
+async def market_health():
+    return market_data.snapshot()
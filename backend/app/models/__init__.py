@@ -1,4 +1,11 @@
 from app.models.user import User
-from app.models.chat import ChatSession, ChatMessage
+from app.models.chat import ChatSession, ChatMessage, ChatSessionArchive
+from app.models.job import InteractiveGeneration, Job
+from app.models.market import MarketDataCache
+from app.models.portfolio import Portfolio, TradeTransaction
+from app.models.finance import BankAccount, ExpenseStatement, SpendingRollup, Transaction
 
-__all__ = ["User", "ChatSession", "ChatMessage"]
+__all__ = [
+    "User", "ChatSession", "ChatMessage", "ChatSessionArchive", "Job", "InteractiveGeneration", "MarketDataCache", "Portfolio", "TradeTransaction",
+    "BankAccount", "ExpenseStatement", "Transaction", "SpendingRollup",
+]
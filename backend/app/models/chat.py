@@ -1,6 +1,7 @@
 from datetime import datetime, timezone
 from enum import Enum
-from sqlalchemy import String, Text, DateTime, ForeignKey, Enum as SQLEnum
+from typing import Optional
+from sqlalchemy import String, Text, DateTime, ForeignKey, Integer, LargeBinary, Enum as SQLEnum
 from sqlalchemy.orm import Mapped, mapped_column, relationship
 
 from app.core.database import Base
@@ -32,6 +33,9 @@ class ChatSession(Base):
     messages: Mapped[list["ChatMessage"]] = relationship(
         "ChatMessage", back_populates="session", cascade="all, delete-orphan", order_by="ChatMessage.created_at"
     )
+    archive: Mapped[Optional["ChatSessionArchive"]] = relationship(
+        "ChatSessionArchive", back_populates="session", cascade="all, delete-orphan", uselist=False
+    )
 
     def __repr__(self) -> str:
         return f"<ChatSession(id={self.id}, title={self.title})>"
@@ -55,5 +59,33 @@ class ChatMessage(Base):
         return f"<ChatMessage(id={self.id}, role={self.role})>"
 
 
+class ChatSessionArchive(Base):
+    """Compressed copy of a cold session's messages (see services/chat_archive).
+
+    While ``payload`` is set the session's rows are absent from
+    ``chat_messages``. After rehydration the row stays with ``payload``
+    cleared so the archiver knows the session was recently read.
+    """
+
+    __tablename__ = "chat_session_archives"
+
+    session_id: Mapped[int] = mapped_column(ForeignKey("chat_sessions.id"), primary_key=True)
+    codec: Mapped[str] = mapped_column(String(16), nullable=False)
+    payload: Mapped[Optional[bytes]] = mapped_column(LargeBinary, nullable=True)
+    message_count: Mapped[int] = mapped_column(Integer, nullable=False, default=0)
+    raw_bytes: Mapped[int] = mapped_column(Integer, nullable=False, default=0)
+    compressed_bytes: Mapped[int] = mapped_column(Integer, nullable=False, default=0)
+    archived_at: Mapped[datetime] = mapped_column(
+        DateTime(timezone=True), default=lambda: datetime.now(timezone.utc)
+    )
+    rehydrated_at: Mapped[Optional[datetime]] = mapped_column(DateTime(timezone=True), nullable=True)
+
+    # Relationships
+    session: Mapped["ChatSession"] = relationship("ChatSession", back_populates="archive")
+
+    def __repr__(self) -> str:
+        return f"<ChatSessionArchive(session_id={self.session_id}, messages={self.message_count})>"
+
+
 # Import here to avoid circular imports
 from app.models.user import User
@@ -0,0 +1,143 @@
+from datetime import date, datetime, timezone
+from decimal import Decimal
+from enum import Enum
+from typing import Optional
+from sqlalchemy import BigInteger, Date, DateTime, ForeignKey, Index, Integer, Numeric, String, Text, UniqueConstraint, Enum as SQLEnum
+from sqlalchemy.orm import Mapped, mapped_column, relationship
+
+from app.core.database import Base
+
+
+class StatementFormat(str, Enum):
+    CSV = "csv"
+    OFX = "ofx"
+
+
+class StatementStatus(str, Enum):
+    PROCESSING = "processing"
+    COMPLETED = "completed"
+
+
+class BankAccount(Base):
+    __tablename__ = "bank_accounts"
+
+    id: Mapped[int] = mapped_column(primary_key=True, index=True)
+    user_id: Mapped[int] = mapped_column(ForeignKey("users.id"), nullable=False, index=True)
+    name: Mapped[str] = mapped_column(String(100), nullable=False)
+    institution: Mapped[Optional[str]] = mapped_column(String(100), nullable=True)
+    currency: Mapped[str] = mapped_column(String(3), default="CAD")
+    created_at: Mapped[datetime] = mapped_column(
+        DateTime(timezone=True), default=lambda: datetime.now(timezone.utc)
+    )
+
+    # Relationships
+    user: Mapped["User"] = relationship("User", back_populates="bank_accounts")
+    transactions: Mapped[list["Transaction"]] = relationship(
+        "Transaction", back_populates="account", cascade="all, delete-orphan"
+    )
+    statements: Mapped[list["ExpenseStatement"]] = relationship(
+        "ExpenseStatement", back_populates="account", cascade="all, delete-orphan"
+    )
+
+    def __repr__(self) -> str:
+        return f"<BankAccount(id={self.id}, name={self.name})>"
+
+
+class ExpenseStatement(Base):
+    """One uploaded statement file and what its import did."""
+
+    __tablename__ = "expense_statements"
+
+    id: Mapped[int] = mapped_column(primary_key=True, index=True)
+    user_id: Mapped[int] = mapped_column(ForeignKey("users.id"), nullable=False, index=True)
+    account_id: Mapped[int] = mapped_column(ForeignKey("bank_accounts.id"), nullable=False, index=True)
+    filename: Mapped[Optional[str]] = mapped_column(String(255), nullable=True)
+    format: Mapped[Optional[StatementFormat]] = mapped_column(SQLEnum(StatementFormat), nullable=True)
+    status: Mapped[StatementStatus] = mapped_column(
+        SQLEnum(StatementStatus), nullable=False, default=StatementStatus.PROCESSING
+    )
+    rows_parsed: Mapped[int] = mapped_column(Integer, default=0)
+    rows_inserted: Mapped[int] = mapped_column(Integer, default=0)
+    rows_duplicate: Mapped[int] = mapped_column(Integer, default=0)
+    rows_rejected: Mapped[int] = mapped_column(Integer, default=0)
+    first_error: Mapped[Optional[str]] = mapped_column(Text, nullable=True)  # First rejected row
+    bytes_read: Mapped[int] = mapped_column(Integer, default=0)
+    duration_ms: Mapped[Optional[int]] = mapped_column(Integer, nullable=True)
+    created_at: Mapped[datetime] = mapped_column(
+        DateTime(timezone=True), default=lambda: datetime.now(timezone.utc)
+    )
+
+    # Relationships
+    account: Mapped["BankAccount"] = relationship("BankAccount", back_populates="statements")
+
+    @property
+    def rows_per_sec(self) -> float:
+        rows = (self.rows_parsed or 0) + (self.rows_rejected or 0)
+        return rows / (self.duration_ms / 1000) if self.duration_ms else 0.0
+
+    def __repr__(self) -> str:
+        return f"<ExpenseStatement(id={self.id}, filename={self.filename}, status={self.status})>"
+
+
+class Transaction(Base):
+    """A bank or card transaction. Negative amounts are money out."""
+
+    __tablename__ = "transactions"
+    __table_args__ = (
+        # Deduplication: the same statement row always hashes the same
+        UniqueConstraint("account_id", "content_hash", name="uq_transactions_account_hash"),
+        Index("ix_transactions_user_posted", "user_id", "posted_on"),
+    )
+
+    id: Mapped[int] = mapped_column(primary_key=True, index=True)
+    user_id: Mapped[int] = mapped_column(ForeignKey("users.id"), nullable=False)
+    account_id: Mapped[int] = mapped_column(ForeignKey("bank_accounts.id"), nullable=False)
+    statement_id: Mapped[Optional[int]] = mapped_column(ForeignKey("expense_statements.id"), nullable=True)
+    posted_on: Mapped[date] = mapped_column(Date, nullable=False)
+    amount: Mapped[Decimal] = mapped_column(Numeric(18, 2), nullable=False)
+    description: Mapped[str] = mapped_column(String(255), nullable=False)
+    merchant: Mapped[str] = mapped_column(String(255), nullable=False)  # Normalized description
+    category: Mapped[str] = mapped_column(String(64), nullable=False)
+    fit_id: Mapped[Optional[str]] = mapped_column(String(255), nullable=True)  # OFX transaction id
+    content_hash: Mapped[str] = mapped_column(String(32), nullable=False)
+    created_at: Mapped[datetime] = mapped_column(
+        DateTime(timezone=True), default=lambda: datetime.now(timezone.utc)
+    )
+
+    # Relationships
+    account: Mapped["BankAccount"] = relationship("BankAccount", back_populates="transactions")
+
+    def __repr__(self) -> str:
+        return f"<Transaction(id={self.id}, {self.posted_on} {self.amount} {self.merchant})>"
+
+
+class SpendingRollup(Base):
+    """Totals of a user's transactions per month and category.
+
+    Maintained incrementally by ``app.services.spending_rollups`` on every
+    write to ``transactions``. Amounts are integer cents so that
+    concurrent ``+=`` updates stay exact on every database.
+    """
+
+    __tablename__ = "spending_rollups"
+    __table_args__ = (
+        UniqueConstraint("user_id", "month", "category", name="uq_spending_rollups_user_month_category"),
+    )
+
+    id: Mapped[int] = mapped_column(primary_key=True, index=True)
+    user_id: Mapped[int] = mapped_column(ForeignKey("users.id"), nullable=False)
+    month: Mapped[date] = mapped_column(Date, nullable=False)  # First day of the month
+    category: Mapped[str] = mapped_column(String(64), nullable=False)
+    transaction_count: Mapped[int] = mapped_column(Integer, nullable=False, default=0)
+    spent_cents: Mapped[int] = mapped_column(BigInteger, nullable=False, default=0)  # Money out, positive
+    received_cents: Mapped[int] = mapped_column(BigInteger, nullable=False, default=0)  # Money in
+    updated_at: Mapped[datetime] = mapped_column(
+        DateTime(timezone=True), default=lambda: datetime.now(timezone.utc)
+    )
+
+    def __repr__(self) -> str:
+        return f"<SpendingRollup(user_id={self.user_id}, {self.month:%Y-%m} {self.category})>"
+
+
+# Import here to avoid circular imports
+from app.models.user import User  # noqa: E402
@@ -0,0 +1,71 @@
+from datetime import datetime, timezone
+from enum import Enum
+from typing import Any, Optional
+from sqlalchemy import JSON, String, Text, DateTime, ForeignKey, Index, Integer, Enum as SQLEnum
+from sqlalchemy.orm import Mapped, mapped_column
+
+from app.core.database import Base
+
+
+class JobStatus(str, Enum):
+    QUEUED = "queued"
+    RUNNING = "running"
+    SUCCEEDED = "succeeded"
+    FAILED = "failed"
+
+
+class JobPriority(int, Enum):
+    # Higher runs first
+    LOW = -10
+    NORMAL = 0
+    HIGH = 10
+
+
+class Job(Base):
+    __tablename__ = "jobs"
+    __table_args__ = (
+        # Claim query: next queued job by priority, then due time
+        Index("ix_jobs_claim", "status", "priority", "run_at"),
+    )
+
+    id: Mapped[int] = mapped_column(primary_key=True, index=True)
+    user_id: Mapped[Optional[int]] = mapped_column(ForeignKey("users.id"), nullable=True, index=True)
+    kind: Mapped[str] = mapped_column(String(64), nullable=False)
+    payload: Mapped[dict[str, Any]] = mapped_column(JSON, nullable=False, default=dict)
+    status: Mapped[JobStatus] = mapped_column(SQLEnum(JobStatus), nullable=False, default=JobStatus.QUEUED)
+    priority: Mapped[int] = mapped_column(Integer, nullable=False, default=JobPriority.NORMAL)
+    idempotency_key: Mapped[Optional[str]] = mapped_column(String(255), unique=True, nullable=True)
+    attempts: Mapped[int] = mapped_column(Integer, nullable=False, default=0)
+    max_attempts: Mapped[int] = mapped_column(Integer, nullable=False, default=3)
+    run_at: Mapped[datetime] = mapped_column(
+        DateTime(timezone=True), default=lambda: datetime.now(timezone.utc)
+    )
+    locked_by: Mapped[Optional[str]] = mapped_column(String(64), nullable=True)
+    locked_at: Mapped[Optional[datetime]] = mapped_column(DateTime(timezone=True), nullable=True)
+    result: Mapped[Optional[dict[str, Any]]] = mapped_column(JSON, nullable=True)
+    error: Mapped[Optional[str]] = mapped_column(Text, nullable=True)
+    created_at: Mapped[datetime] = mapped_column(
+        DateTime(timezone=True), default=lambda: datetime.now(timezone.utc)
+    )
+    finished_at: Mapped[Optional[datetime]] = mapped_column(DateTime(timezone=True), nullable=True)
+
+    def __repr__(self) -> str:
+        return f"<Job(id={self.id}, kind={self.kind}, status={self.status})>"
+
+
+class InteractiveGeneration(Base):
+    """An interactive LLM generation in progress, in any API process.
+
+    Batch workers run in other processes and check this table before each
+    generation. ``expires_at`` bounds how long a row left behind by a
+    crashed process can hold them back.
+    """
+
+    __tablename__ = "llm_interactive_generations"
+
+    id: Mapped[int] = mapped_column(primary_key=True)
+    holder: Mapped[str] = mapped_column(String(64), nullable=False)
+    started_at: Mapped[datetime] = mapped_column(
+        DateTime(timezone=True), default=lambda: datetime.now(timezone.utc)
+    )
+    expires_at: Mapped[datetime] = mapped_column(DateTime(timezone=True), nullable=False, index=True)
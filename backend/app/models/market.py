@@ -0,0 +1,38 @@
+from datetime import datetime, timezone
+from decimal import Decimal
+from typing import Optional
+from sqlalchemy import BigInteger, DateTime, Numeric, String, UniqueConstraint
+from sqlalchemy.orm import Mapped, mapped_column
+
+from app.core.database import Base
+
+
+class MarketDataCache(Base):
+    """One quote as received from a market data provider.
+
+    Rows are only appended (one per symbol and quote time), so the table
+    doubles as a price history and as the warm start for the in-memory
+    quote cache.
+    """
+
+    __tablename__ = "price_history_cache"
+    __table_args__ = (
+        # Its index also serves "latest quote per symbol"
+        UniqueConstraint("symbol", "updated_at", name="uq_price_history_symbol_time"),
+    )
+
+    id: Mapped[int] = mapped_column(primary_key=True, index=True)
+    symbol: Mapped[str] = mapped_column(String(32), nullable=False)
+    price: Mapped[Decimal] = mapped_column(Numeric(18, 6), nullable=False)
+    change: Mapped[Optional[Decimal]] = mapped_column(Numeric(18, 6), nullable=True)
+    change_percent: Mapped[Optional[Decimal]] = mapped_column(Numeric(12, 6), nullable=True)
+    volume: Mapped[Optional[int]] = mapped_column(BigInteger, nullable=True)
+    updated_at: Mapped[datetime] = mapped_column(DateTime(timezone=True), nullable=False)
+    source: Mapped[str] = mapped_column(String(32), nullable=False)
+    # Indexed for the cache warm-up, which reads only recently fetched rows
+    fetched_at: Mapped[datetime] = mapped_column(
+        DateTime(timezone=True), default=lambda: datetime.now(timezone.utc), index=True
+    )
+
+    def __repr__(self) -> str:
+        return f"<MarketDataCache(symbol={self.symbol}, price={self.price}, updated_at={self.updated_at})>"
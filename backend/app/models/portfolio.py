@@ -0,0 +1,69 @@
+from datetime import datetime, timezone
+from decimal import Decimal
+from enum import Enum
+from typing import Optional
+from sqlalchemy import Boolean, DateTime, ForeignKey, Index, Integer, Numeric, String, Enum as SQLEnum
+from sqlalchemy.orm import Mapped, mapped_column, relationship
+
+from app.core.database import Base
+
+
+class TradeSide(str, Enum):
+    BUY = "buy"
+    SELL = "sell"
+
+
+class Portfolio(Base):
+    __tablename__ = "portfolios"
+
+    id: Mapped[int] = mapped_column(primary_key=True, index=True)
+    user_id: Mapped[int] = mapped_column(ForeignKey("users.id"), nullable=False, index=True)
+    name: Mapped[str] = mapped_column(String(100), default="Learning Portfolio")
+    initial_cash: Mapped[Decimal] = mapped_column(Numeric(18, 2), nullable=False, default=Decimal("100000.00"))
+    current_cash: Mapped[Decimal] = mapped_column(Numeric(18, 2), nullable=False, default=Decimal("100000.00"))
+    is_active: Mapped[bool] = mapped_column(Boolean, default=True)
+    created_at: Mapped[datetime] = mapped_column(
+        DateTime(timezone=True), default=lambda: datetime.now(timezone.utc)
+    )
+
+    # Relationships
+    user: Mapped["User"] = relationship("User", back_populates="portfolios")
+    transactions: Mapped[list["TradeTransaction"]] = relationship(
+        "TradeTransaction", back_populates="portfolio", cascade="all, delete-orphan",
+        order_by="TradeTransaction.executed_at",
+    )
+
+    def __repr__(self) -> str:
+        return f"<Portfolio(id={self.id}, name={self.name})>"
+
+
+class TradeTransaction(Base):
+    """A fill in a portfolio. Holdings and P&L are derived from these."""
+
+    __tablename__ = "trade_transactions"
+    __table_args__ = (
+        Index("ix_trade_transactions_portfolio_time", "portfolio_id", "executed_at"),
+    )
+
+    id: Mapped[int] = mapped_column(primary_key=True, index=True)
+    portfolio_id: Mapped[int] = mapped_column(ForeignKey("portfolios.id"), nullable=False)
+    order_id: Mapped[Optional[int]] = mapped_column(Integer, nullable=True)
+    symbol: Mapped[str] = mapped_column(String(32), nullable=False)
+    side: Mapped[TradeSide] = mapped_column(SQLEnum(TradeSide), nullable=False)
+    quantity: Mapped[Decimal] = mapped_column(Numeric(18, 6), nullable=False)
+    price: Mapped[Decimal] = mapped_column(Numeric(18, 6), nullable=False)
+    total_value: Mapped[Decimal] = mapped_column(Numeric(18, 2), nullable=False)  # quantity * price
+    fees: Mapped[Decimal] = mapped_column(Numeric(18, 2), nullable=False, default=Decimal("0.00"))
+    executed_at: Mapped[datetime] = mapped_column(
+        DateTime(timezone=True), default=lambda: datetime.now(timezone.utc)
+    )
+
+    # Relationships
+    portfolio: Mapped["Portfolio"] = relationship("Portfolio", back_populates="transactions")
+
+    def __repr__(self) -> str:
+        return f"<TradeTransaction(id={self.id}, {self.side} {self.quantity} {self.symbol} @ {self.price})>"
+
+
+# Import here to avoid circular imports
+from app.models.user import User  # noqa: E402
@@ -27,6 +27,12 @@ class User(Base):
     chat_sessions: Mapped[list["ChatSession"]] = relationship(
         "ChatSession", back_populates="user", cascade="all, delete-orphan"
     )
+    portfolios: Mapped[list["Portfolio"]] = relationship(
+        "Portfolio", back_populates="user", cascade="all, delete-orphan"
+    )
+    bank_accounts: Mapped[list["BankAccount"]] = relationship(
+        "BankAccount", back_populates="user", cascade="all, delete-orphan"
+    )
 
     def __repr__(self) -> str:
         return f"<User(id={self.id}, email={self.email})>"
@@ -34,3 +40,5 @@ class User(Base):
 
 # Import here to avoid circular imports
 from app.models.chat import ChatSession
+from app.models.portfolio import Portfolio
+from app.models.finance import BankAccount
@@ -1,6 +1,6 @@
 from datetime import datetime
-from typing import Optional
-from pydantic import BaseModel, ConfigDict
+from typing import Annotated, Literal, Optional, Union
+from pydantic import BaseModel, ConfigDict, Field, TypeAdapter
 
 from app.models.chat import MessageRole
 
@@ -56,3 +56,32 @@ class ChatResponse(BaseModel):
     session_id: int
     user_message: ChatMessageResponse
     assistant_message: ChatMessageResponse
+
+
+# History export/import: one JSON object per NDJSON line. A session line
+# precedes the message lines that reference its id.
+
+class ExportSessionLine(BaseModel):
+    type: Literal["session"]
+    id: int
+    title: Optional[str] = Field("New Chat", max_length=255)  # ChatSession.title
+    created_at: Optional[datetime] = None
+    updated_at: Optional[datetime] = None
+
+
+class ExportMessageLine(BaseModel):
+    type: Literal["message"]
+    session_id: int
+    role: MessageRole
+    content: str
+    created_at: Optional[datetime] = None
+
+
+ExportLine = TypeAdapter(
+    Annotated[Union[ExportSessionLine, ExportMessageLine], Field(discriminator="type")]
+)
+
+
+class ImportResult(BaseModel):
+    sessions: int
+    messages: int
@@ -0,0 +1,68 @@
+from datetime import date, datetime
+from decimal import Decimal
+from typing import Optional
+from pydantic import BaseModel, ConfigDict, Field
+
+from app.models.finance import StatementFormat, StatementStatus
+
+
+class BankAccountCreate(BaseModel):
+    name: str = Field(min_length=1, max_length=100)
+    institution: Optional[str] = Field(default=None, max_length=100)
+    currency: str = Field(default="CAD", min_length=3, max_length=3)
+
+
+class BankAccountResponse(BaseModel):
+    id: int
+    name: str
+    institution: Optional[str] = None
+    currency: str
+    created_at: datetime
+
+    model_config = ConfigDict(from_attributes=True)
+
+
+class StatementResponse(BaseModel):
+    id: int
+    account_id: int
+    filename: Optional[str] = None
+    format: Optional[StatementFormat] = None
+    status: StatementStatus
+    rows_parsed: int
+    rows_inserted: int
+    rows_duplicate: int
+    rows_rejected: int
+    first_error: Optional[str] = None
+    bytes_read: int
+    duration_ms: Optional[int] = None
+    rows_per_sec: float
+    created_at: datetime
+
+    model_config = ConfigDict(from_attributes=True)
+
+
+class TransactionResponse(BaseModel):
+    id: int
+    account_id: int
+    statement_id: Optional[int] = None
+    posted_on: date
+    amount: Decimal
+    description: str
+    merchant: str
+    category: str
+
+    model_config = ConfigDict(from_attributes=True)
+
+
+class TransactionUpdate(BaseModel):
+    posted_on: Optional[date] = None
+    amount: Optional[Decimal] = Field(default=None, max_digits=16, decimal_places=2)
+    category: Optional[str] = None
+
+
+class SpendingRollupResponse(BaseModel):
+    month: date
+    category: str
+    transaction_count: int
+    spent: Decimal
+    received: Decimal
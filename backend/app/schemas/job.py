@@ -0,0 +1,28 @@
+from datetime import datetime
+from typing import Any, Optional
+from pydantic import BaseModel, ConfigDict, Field
+
+from app.models.job import JobPriority, JobStatus
+
+
+class JobCreate(BaseModel):
+    kind: str
+    payload: dict[str, Any] = Field(default_factory=dict)
+    priority: JobPriority = JobPriority.LOW
+    idempotency_key: Optional[str] = Field(default=None, max_length=128)
+
+
+class JobResponse(BaseModel):
+    id: int
+    kind: str
+    status: JobStatus
+    priority: int
+    attempts: int
+    max_attempts: int
+    result: Optional[dict[str, Any]] = None
+    error: Optional[str] = None
+    created_at: datetime
+    run_at: datetime
+    finished_at: Optional[datetime] = None
+
+    model_config = ConfigDict(from_attributes=True)
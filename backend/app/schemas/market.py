@@ -0,0 +1,16 @@
+from datetime import datetime
+from decimal import Decimal
+from typing import Optional
+from pydantic import BaseModel, ConfigDict
+
+
+class QuoteResponse(BaseModel):
+    symbol: str
+    price: Decimal
+    change: Optional[Decimal] = None
+    change_percent: Optional[Decimal] = None
+    volume: Optional[int] = None
+    updated_at: datetime
+    source: str
+
+    model_config = ConfigDict(from_attributes=True)
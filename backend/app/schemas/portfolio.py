@@ -0,0 +1,42 @@
+from datetime import date
+from decimal import Decimal
+from typing import Optional
+from pydantic import BaseModel, ConfigDict
+
+
+class PositionResponse(BaseModel):
+    symbol: str
+    quantity: Decimal
+    average_cost: Optional[Decimal] = None
+    cost_basis: Decimal
+    price: Decimal
+    market_value: Decimal
+    unrealized_pnl: Decimal
+    realized_pnl: Decimal
+
+    model_config = ConfigDict(from_attributes=True)
+
+
+class PortfolioSummaryResponse(BaseModel):
+    portfolio_id: int
+    name: str
+    initial_cash: Decimal
+    cash: Decimal
+    holdings_value: Decimal
+    total_value: Decimal
+    cost_basis: Decimal
+    realized_pnl: Decimal
+    unrealized_pnl: Decimal
+    total_pnl: Decimal
+
+    model_config = ConfigDict(from_attributes=True)
+
+
+class PortfolioValuationResponse(PortfolioSummaryResponse):
+    positions: list[PositionResponse] = []
+
+
+class PerformanceResponse(BaseModel):
+    portfolio_id: int
+    dates: list[date]
+    values: list[Decimal]  # End-of-day total value
@@ -0,0 +1,64 @@
+"""Job handlers for batch LLM work.
+
+Every generation here runs with ``BATCH`` priority so it yields to
+interactive chat (see ``LLMPriorityGate``). User-submittable kinds are
+listed in ``USER_JOB_KINDS``.
+"""
+from sqlalchemy import select
+from sqlalchemy.orm import selectinload
+
+from app.core.database import async_session_maker
+from app.models.chat import ChatSession
+from app.models.job import Job
+from app.services.chat_archive import rehydrate_session
+from app.services.job_queue import PermanentJobError, job_handler
+from app.services.llm_service import BATCH, build_conversation_history, llm_service
+from app.services.spending_rollups import spending_summary
+
+USER_JOB_KINDS = {"llm.generate", "chat.summarize_session"}
+
+SUMMARY_PROMPT = (
+    "Summarize this conversation in a few bullet points: the user's "
+    "financial situation, the questions asked and the advice given."
+)
+
+
+@job_handler("llm.generate")
+async def llm_generate(job: Job) -> dict:
+    prompt = job.payload.get("prompt")
+    if not isinstance(prompt, str) or not prompt:
+        raise PermanentJobError("payload.prompt must be a non-empty string")
+
+    user_context = None
+    if job.user_id is not None:
+        async with async_session_maker() as db:
+            user_context = await spending_summary(db, job.user_id)
+
+    content = await llm_service.generate_response(message=prompt, priority=BATCH, user_context=user_context)
+    return {"content": content}
+
+
+@job_handler("chat.summarize_session")
+async def summarize_session(job: Job) -> dict:
+    session_id = job.payload.get("session_id")
+    if not isinstance(session_id, int):
+        raise PermanentJobError("payload.session_id must be an integer")
+
+    async with async_session_maker() as db:
+        await rehydrate_session(db, session_id)
+        result = await db.execute(
+            select(ChatSession)
+            .options(selectinload(ChatSession.messages))
+            .where(ChatSession.id == session_id, ChatSession.user_id == job.user_id)
+        )
+        session = result.scalar_one_or_none()
+        if session is None:
+            raise PermanentJobError("Chat session not found")
+        conversation_history = build_conversation_history(session)
+
+    summary = await llm_service.generate_response(
+        message=SUMMARY_PROMPT,
+        conversation_history=conversation_history,
+        priority=BATCH,
+    )
+    return {"session_id": session_id, "summary": summary}
@@ -0,0 +1,282 @@
+"""Tiered storage for chat history.
+
+Sessions untouched for ``CHAT_ARCHIVE_AFTER_DAYS`` have their messages moved
+out of ``chat_messages`` into one compressed blob per session in
+``chat_session_archives`` (zstd when ``zstandard`` is installed, zlib
+otherwise). Reading or continuing such a session moves the messages back
+first, with their original ids and timestamps.
+
+Run it from the API process (``start()``, every
+``CHAT_ARCHIVE_INTERVAL_SECONDS``) or from cron::
+
+    python -m app.services.chat_archive archive
+    python -m app.services.chat_archive stats
+"""
+import asyncio
+import logging
+import time
+import zlib
+from datetime import datetime, timedelta, timezone
+from typing import Optional
+
+from sqlalchemy import delete, exists, func, insert, or_, select, update
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.core.config import settings
+from app.core.database import async_session_maker
+from app.core.serialization import dumps, loads
+from app.models.chat import ChatMessage, ChatSession, ChatSessionArchive, MessageRole
+
+logger = logging.getLogger(__name__)
+
+try:
+    import zstandard
+except ImportError:  # pragma: no cover - optional dependency
+    zstandard = None
+
+
+def compress(data: bytes) -> tuple[str, bytes]:
+    if zstandard is not None:
+        return "zstd", zstandard.ZstdCompressor(level=10).compress(data)
+    return "zlib", zlib.compress(data, 9)
+
+
+def decompress(codec: str, data: bytes) -> bytes:
+    if codec == "zstd":
+        if zstandard is None:
+            raise RuntimeError("zstandard is required to read zstd chat archives")
+        return zstandard.ZstdDecompressor().decompress(data)
+    if codec == "zlib":
+        return zlib.decompress(data)
+    raise ValueError(f"Unknown archive codec: {codec}")
+
+
+async def archive_session(db: AsyncSession, session_id: int) -> Optional[ChatSessionArchive]:
+    """Move one session's messages into its archive row. Commits."""
+    result = await db.execute(
+        select(ChatMessage.id, ChatMessage.role, ChatMessage.content, ChatMessage.created_at)
+        .where(ChatMessage.session_id == session_id)
+        .order_by(ChatMessage.created_at, ChatMessage.id)
+    )
+    rows = [
+        [id_, role.value, content, created_at.isoformat() if created_at else None]
+        for id_, role, content, created_at in result.all()
+    ]
+    if not rows:
+        return None
+
+    raw = dumps(rows)
+    codec, payload = compress(raw)
+
+    archive = await db.get(ChatSessionArchive, session_id)
+    if archive is None:
+        archive = ChatSessionArchive(session_id=session_id)
+        db.add(archive)
+    archive.codec = codec
+    archive.payload = payload
+    archive.message_count = len(rows)
+    archive.raw_bytes = len(raw)
+    archive.compressed_bytes = len(payload)
+    archive.archived_at = datetime.now(timezone.utc)
+    archive.rehydrated_at = None
+
+    # Only what went into the payload: a message saved since the SELECT
+    # stays in chat_messages (and the session reads as a mix of both).
+    await db.execute(
+        delete(ChatMessage).where(
+            ChatMessage.session_id == session_id,
+            ChatMessage.id <= max(row[0] for row in rows),
+        )
+    )
+    await db.commit()
+    return archive
+
+
+async def rehydrate_session(db: AsyncSession, session_id: int) -> bool:
+    """Move an archived session's messages back into ``chat_messages``.
+
+    A no-op (one primary-key lookup) for sessions that are not archived.
+    Clearing ``payload`` claims the archive, the way ``job_queue.claim``
+    claims a job: when two requests open the same session only the one
+    whose conditional update matched re-inserts the messages. Commits
+    unless the session was not archived.
+    """
+    archived = (ChatSessionArchive.session_id == session_id, ChatSessionArchive.payload.is_not(None))
+    result = await db.execute(
+        select(ChatSessionArchive.codec, ChatSessionArchive.payload).where(*archived).with_for_update()
+    )
+    found = result.one_or_none()
+    if found is None:
+        return False
+
+    claimed = await db.execute(
+        update(ChatSessionArchive)
+        .where(*archived)
+        .values(payload=None, rehydrated_at=datetime.now(timezone.utc))
+    )
+    if claimed.rowcount != 1:
+        # Another request restored it between our SELECT and UPDATE
+        await db.commit()
+        return False
+
+    codec, payload = found
+    rows = loads(decompress(codec, payload))
+    await db.execute(
+        insert(ChatMessage),
+        [
+            {
+                "id": id_,
+                "session_id": session_id,
+                "role": MessageRole(role),
+                "content": content,
+                "created_at": datetime.fromisoformat(created_at) if created_at else None,
+            }
+            for id_, role, content, created_at in rows
+        ],
+    )
+    await db.commit()
+    logger.info(f"Rehydrated {len(rows)} messages for chat session {session_id}")
+    return True
+
+
+async def archive_cold_sessions(
+    db: AsyncSession,
+    older_than_days: Optional[int] = None,
+    batch_size: Optional[int] = None,
+) -> int:
+    """Archive up to ``batch_size`` cold sessions; returns how many."""
+    older_than_days = older_than_days if older_than_days is not None else settings.CHAT_ARCHIVE_AFTER_DAYS
+    batch_size = batch_size or settings.CHAT_ARCHIVE_BATCH_SIZE
+    cutoff = datetime.now(timezone.utc) - timedelta(days=older_than_days)
+
+    # Skip sessions already archived, or rehydrated since the cutoff
+    # (someone is reading them again).
+    already_handled = exists().where(
+        ChatSessionArchive.session_id == ChatSession.id,
+        or_(
+            ChatSessionArchive.payload.is_not(None),
+            ChatSessionArchive.rehydrated_at >= cutoff,
+        ),
+    )
+    has_messages = exists().where(ChatMessage.session_id == ChatSession.id)
+    result = await db.execute(
+        select(ChatSession.id)
+        .where(ChatSession.updated_at < cutoff, ~already_handled, has_messages)
+        .order_by(ChatSession.updated_at)
+        .limit(batch_size)
+    )
+
+    archived = 0
+    for session_id in result.scalars().all():
+        try:
+            if await archive_session(db, session_id):
+                archived += 1
+        except Exception as e:
+            # Another worker may be archiving the same session
+            await db.rollback()
+            logger.warning(f"Could not archive chat session {session_id}: {e}")
+    return archived
+
+
+async def storage_stats(db: AsyncSession) -> dict:
+    hot = (await db.execute(
+        select(func.count(ChatMessage.id), func.coalesce(func.sum(func.length(ChatMessage.content)), 0))
+    )).one()
+    archived = (await db.execute(
+        select(
+            func.count(ChatSessionArchive.session_id),
+            func.coalesce(func.sum(ChatSessionArchive.message_count), 0),
+            func.coalesce(func.sum(ChatSessionArchive.raw_bytes), 0),
+            func.coalesce(func.sum(ChatSessionArchive.compressed_bytes), 0),
+        ).where(ChatSessionArchive.payload.is_not(None))
+    )).one()
+
+    hot_messages, hot_bytes = hot
+    archived_sessions, archived_messages, raw_bytes, compressed_bytes = archived
+    total_messages = hot_messages + archived_messages
+    return {
+        "hot_messages": hot_messages,
+        "hot_content_chars": hot_bytes,
+        "archived_sessions": archived_sessions,
+        "archived_messages": archived_messages,
+        "archived_raw_bytes": raw_bytes,
+        "archived_compressed_bytes": compressed_bytes,
+        "archived_fraction": round(archived_messages / total_messages, 4) if total_messages else 0.0,
+        "compression_ratio": round(raw_bytes / compressed_bytes, 2) if compressed_bytes else None,
+    }
+
+
+class ChatArchiver:
+    def __init__(self):
+        self._task: Optional[asyncio.Task] = None
+        self._stats: Optional[dict] = None
+        self._stats_at = 0.0
+        self._stats_lock = asyncio.Lock()
+
+    async def cached_stats(self) -> dict:
+        """``storage_stats``, recomputed at most every ``CHAT_STORAGE_STATS_TTL_SECONDS``.
+
+        ``storage_stats`` scans all of ``chat_messages``; concurrent callers
+        after expiry share one scan.
+        """
+        async with self._stats_lock:
+            age = time.monotonic() - self._stats_at
+            if self._stats is None or age >= settings.CHAT_STORAGE_STATS_TTL_SECONDS:
+                async with async_session_maker() as db:
+                    self._stats = await storage_stats(db)
+                self._stats_at = time.monotonic()
+            return self._stats
+
+    async def run(self) -> None:
+        while True:
+            try:
+                async with async_session_maker() as db:
+                    while True:
+                        archived = await archive_cold_sessions(db)
+                        if archived:
+                            logger.info(f"Archived {archived} cold chat sessions")
+                        if archived < settings.CHAT_ARCHIVE_BATCH_SIZE:
+                            break
+            except Exception as e:
+                logger.error(f"Chat archiving failed: {e}")
+            await asyncio.sleep(settings.CHAT_ARCHIVE_INTERVAL_SECONDS)
+
+    def start(self) -> None:
+        if settings.CHAT_ARCHIVE_INTERVAL_SECONDS <= 0 or self._task is not None:
+            return
+        self._task = asyncio.create_task(self.run())
+
+    async def stop(self) -> None:
+        if self._task is None:
+            return
+        self._task.cancel()
+        try:
+            await self._task
+        except asyncio.CancelledError:
+            pass
+        self._task = None
+
+
+# Singleton instance
+chat_archiver = ChatArchiver()
+
+
+async def _main(command: str) -> None:
+    async with async_session_maker() as db:
+        if command == "archive":
+            total = 0
+            while True:
+                archived = await archive_cold_sessions(db)
+                total += archived
+                if archived < settings.CHAT_ARCHIVE_BATCH_SIZE:
+                    break
+            print(f"Archived {total} sessions")
+        print(dumps(await storage_stats(db)).decode("utf-8"))
+
+
+if __name__ == "__main__":
+    import argparse
+
+    parser = argparse.ArgumentParser(description="Archive cold chat sessions")
+    parser.add_argument("command", choices=["archive", "stats"])
+    asyncio.run(_main(parser.parse_args().command))
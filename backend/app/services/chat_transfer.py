@@ -0,0 +1,218 @@
+"""Bulk export and import of a user's chat history as NDJSON.
+
+Export streams rows from a server-side cursor (``yield_per``) and emits
+them in ~64 KiB chunks, so memory stays flat however long the history is.
+Archived sessions are decompressed one at a time. Import first receives the
+whole body into a temporary file, so its transaction is not held open while
+the client uploads, then parses it and inserts messages with batched
+``executemany`` statements in a single transaction.
+
+The line format is described by ``ExportSessionLine`` / ``ExportMessageLine``
+in ``app.schemas.chat``.
+"""
+from datetime import datetime
+from typing import AsyncIterable, AsyncIterator, Optional
+
+from pydantic import ValidationError
+from sqlalchemy import and_, insert, select
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.core.config import settings
+from app.core.database import async_session_maker
+from app.core.serialization import dumps, loads
+from app.core.uploads import spooled
+from app.models.chat import ChatMessage, ChatSession, ChatSessionArchive, MessageRole
+from app.schemas.chat import ExportLine, ExportSessionLine
+from app.services.chat_archive import decompress
+
+CHUNK_SIZE = 64 * 1024
+
+
+class HistoryImportError(ValueError):
+    """Malformed import input; ``line`` is 1-based."""
+
+    def __init__(self, line: int, detail: str):
+        super().__init__(f"Line {line}: {detail}")
+        self.line = line
+
+
+def _iso(value: Optional[datetime]) -> Optional[str]:
+    return value.isoformat() if value is not None else None
+
+
+async def export_user_history(user_id: int) -> AsyncIterator[bytes]:
+    stmt = (
+        select(
+            ChatSession.id,
+            ChatSession.title,
+            ChatSession.created_at,
+            ChatSession.updated_at,
+            ChatSessionArchive.codec,
+            ChatSessionArchive.payload,
+            ChatMessage.role,
+            ChatMessage.content,
+            ChatMessage.created_at,
+        )
+        .outerjoin(ChatMessage, ChatMessage.session_id == ChatSession.id)
+        .outerjoin(
+            ChatSessionArchive,
+            and_(
+                ChatSessionArchive.session_id == ChatSession.id,
+                ChatSessionArchive.payload.is_not(None),
+            ),
+        )
+        .where(ChatSession.user_id == user_id)
+        .order_by(ChatSession.id, ChatMessage.created_at, ChatMessage.id)
+        .execution_options(yield_per=settings.CHAT_EXPORT_YIELD_PER)
+    )
+
+    buffer = bytearray()
+    current_session = None
+    # Own DB session: the request's one is closed before the body streams
+    async with async_session_maker() as db:
+        result = await db.stream(stmt)
+        async for partition in result.partitions():
+            for (
+                session_id, title, session_created, session_updated,
+                codec, payload, role, content, message_created,
+            ) in partition:
+                if session_id != current_session:
+                    current_session = session_id
+                    buffer += dumps({
+                        "type": "session",
+                        "id": session_id,
+                        "title": title,
+                        "created_at": _iso(session_created),
+                        "updated_at": _iso(session_updated),
+                    }) + b"\n"
+                    if payload is not None:
+                        for _, archived_role, archived_content, archived_created in loads(
+                            decompress(codec, payload)
+                        ):
+                            buffer += dumps({
+                                "type": "message",
+                                "session_id": session_id,
+                                "role": archived_role,
+                                "content": archived_content,
+                                "created_at": archived_created,
+                            }) + b"\n"
+
+                if role is not None:
+                    buffer += dumps({
+                        "type": "message",
+                        "session_id": session_id,
+                        "role": role.value,
+                        "content": content,
+                        "created_at": _iso(message_created),
+                    }) + b"\n"
+
+                if len(buffer) >= CHUNK_SIZE:
+                    yield bytes(buffer)
+                    buffer.clear()
+
+    if buffer:
+        yield bytes(buffer)
+
+
+async def _iter_lines(chunks: AsyncIterable[bytes]) -> AsyncIterator[bytes]:
+    remainder = b""
+    async for chunk in chunks:
+        lines = (remainder + chunk).split(b"\n")
+        remainder = lines.pop()
+        for line in lines:
+            yield line
+    if remainder:
+        yield remainder
+
+
+async def import_user_history(
+    db: AsyncSession,
+    user_id: int,
+    chunks: AsyncIterable[bytes],
+    batch_size: Optional[int] = None,
+) -> dict:
+    """Import NDJSON history for ``user_id``; all or nothing.
+
+    Sessions get new ids; message lines are re-pointed at them.
+    """
+    batch_size = batch_size or settings.CHAT_IMPORT_BATCH_SIZE
+    session_ids: dict[int, int] = {}
+    seen_sessions: set[int] = set()
+    pending_sessions: list[ExportSessionLine] = []
+    pending_messages: list[dict] = []
+    sessions = messages = 0
+
+    async def flush_sessions():
+        nonlocal sessions
+        if not pending_sessions:
+            return
+        new_ids = await db.scalars(
+            insert(ChatSession).returning(ChatSession.id, sort_by_parameter_order=True),
+            [
+                {
+                    "user_id": user_id,
+                    "title": line.title or "New Chat",
+                    **({"created_at": line.created_at} if line.created_at else {}),
+                    **({"updated_at": line.updated_at} if line.updated_at else {}),
+                }
+                for line in pending_sessions
+            ],
+        )
+        for line, new_id in zip(pending_sessions, new_ids.all()):
+            session_ids[line.id] = new_id
+        sessions += len(pending_sessions)
+        pending_sessions.clear()
+
+    async def flush_messages():
+        nonlocal messages
+        if not pending_messages:
+            return
+        await db.execute(insert(ChatMessage), pending_messages)
+        messages += len(pending_messages)
+        pending_messages.clear()
+
+    async with spooled(chunks) as body:
+        try:
+            line_number = 0
+            async for raw in _iter_lines(body):
+                line_number += 1
+                if not raw.strip():
+                    continue
+                try:
+                    line = ExportLine.validate_json(raw)
+                except ValidationError as e:
+                    raise HistoryImportError(line_number, e.errors()[0]["msg"])
+
+                if isinstance(line, ExportSessionLine):
+                    if line.id in seen_sessions:
+                        raise HistoryImportError(line_number, f"duplicate session id {line.id}")
+                    seen_sessions.add(line.id)
+                    pending_sessions.append(line)
+                    if len(pending_sessions) >= batch_size:
+                        await flush_sessions()
+                    continue
+
+                if line.session_id not in session_ids:
+                    await flush_sessions()
+                    if line.session_id not in session_ids:
+                        raise HistoryImportError(line_number, f"unknown session id {line.session_id}")
+
+                message = {
+                    "session_id": session_ids[line.session_id],
+                    "role": MessageRole(line.role),
+                    "content": line.content,
+                }
+                if line.created_at:
+                    message["created_at"] = line.created_at
+                pending_messages.append(message)
+                if len(pending_messages) >= batch_size:
+                    await flush_messages()
+
+            await flush_sessions()
+            await flush_messages()
+            await db.commit()
+        except Exception:
+            await db.rollback()
+            raise
+
+    return {"sessions": sessions, "messages": messages}
@@ -0,0 +1,358 @@
+"""Durable background job queue backed by the application database.
+
+No broker: jobs are rows in ``jobs``. Workers claim the highest-priority due
+job with a conditional ``UPDATE`` (plus ``FOR UPDATE SKIP LOCKED`` on
+databases that support it), so any number of worker processes can share
+the table. Failed jobs are retried with exponential backoff up to
+``max_attempts``; jobs whose worker died are requeued once their lock is
+older than ``JOB_LOCK_TIMEOUT_SECONDS``. A live worker refreshes the lock of
+each job it holds, including jobs still waiting for an LLM slot, every
+quarter of that timeout.
+
+Handlers are registered with ``@job_handler("kind")`` (see
+``app.services.batch_jobs``) and return a JSON-serializable dict that is
+stored as the job's result.
+
+Run workers with::
+
+    python -m app.services.job_queue --processes 2 --concurrency 4
+"""
+import asyncio
+import logging
+import os
+import random
+import socket
+from datetime import datetime, timedelta, timezone
+from typing import Any, Awaitable, Callable, Optional
+
+from sqlalchemy import select, update
+from sqlalchemy.exc import IntegrityError
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm.attributes import set_committed_value
+
+from app.core.config import settings
+from app.core.database import async_session_maker
+from app.models.job import Job, JobPriority, JobStatus
+
+logger = logging.getLogger(__name__)
+
+JobHandler = Callable[[Job], Awaitable[dict[str, Any]]]
+
+_handlers: dict[str, JobHandler] = {}
+
+
+class PermanentJobError(Exception):
+    """Raised by a handler when retrying cannot help (e.g. bad payload)."""
+
+
+def job_handler(kind: str):
+    def register(fn: JobHandler) -> JobHandler:
+        _handlers[kind] = fn
+        return fn
+    return register
+
+
+def registered_kinds() -> list[str]:
+    return sorted(_handlers)
+
+
+async def enqueue(
+    db: AsyncSession,
+    kind: str,
+    payload: Optional[dict[str, Any]] = None,
+    *,
+    user_id: Optional[int] = None,
+    priority: int = JobPriority.LOW,
+    idempotency_key: Optional[str] = None,
+    max_attempts: int = 3,
+    run_at: Optional[datetime] = None,
+) -> Job:
+    """Add a job, or return the existing one with the same idempotency key."""
+    if idempotency_key:
+        result = await db.execute(select(Job).where(Job.idempotency_key == idempotency_key))
+        existing = result.scalar_one_or_none()
+        if existing:
+            return existing
+
+    job = Job(
+        kind=kind,
+        payload=payload or {},
+        user_id=user_id,
+        priority=int(priority),
+        idempotency_key=idempotency_key,
+        max_attempts=max_attempts,
+        run_at=run_at or datetime.now(timezone.utc),
+    )
+    db.add(job)
+    try:
+        await db.commit()
+    except IntegrityError:
+        # Lost a race with another enqueue of the same key
+        await db.rollback()
+        result = await db.execute(select(Job).where(Job.idempotency_key == idempotency_key))
+        return result.scalar_one()
+    await db.refresh(job)
+    return job
+
+
+async def claim(db: AsyncSession, worker_id: str) -> Optional[Job]:
+    now = datetime.now(timezone.utc)
+    result = await db.execute(
+        select(Job.id)
+        .where(Job.status == JobStatus.QUEUED, Job.run_at <= now)
+        .order_by(Job.priority.desc(), Job.run_at, Job.id)
+        .limit(5)
+        .with_for_update(skip_locked=True)
+    )
+    for job_id in result.scalars().all():
+        # Only one worker can flip a given row from queued to running
+        claimed = await db.execute(
+            update(Job)
+            .where(Job.id == job_id, Job.status == JobStatus.QUEUED)
+            .values(
+                status=JobStatus.RUNNING,
+                locked_by=worker_id,
+                locked_at=now,
+                attempts=Job.attempts + 1,
+            )
+        )
+        if claimed.rowcount == 1:
+            await db.commit()
+            return await db.get(Job, job_id, populate_existing=True)
+    await db.commit()
+    return None
+
+
+def retry_delay(attempts: int) -> float:
+    delay = min(settings.JOB_RETRY_BASE_SECONDS * 2 ** (attempts - 1), settings.JOB_RETRY_MAX_SECONDS)
+    return delay * random.uniform(0.9, 1.1)
+
+
+def _owned(job: Job) -> tuple:
+    """Conditions that hold while ``job`` is still locked by the claim that loaded it.
+
+    ``attempts`` tells apart two claims of the same job by the same worker.
+    """
+    return (
+        Job.id == job.id,
+        Job.status == JobStatus.RUNNING,
+        Job.locked_by == job.locked_by,
+        Job.attempts == job.attempts,
+    )
+
+
+async def _finish(db: AsyncSession, job: Job, **values: Any) -> bool:
+    finished = await db.execute(
+        update(Job)
+        .where(*_owned(job))
+        .values(locked_by=None, **values)
+        .execution_options(synchronize_session=False)
+    )
+    await db.commit()
+    if finished.rowcount != 1:
+        # ``job`` keeps describing this claim, so it cannot match the new one
+        logger.warning(f"Job {job.id} attempt {job.attempts} lost its lock; outcome dropped")
+        return False
+    for key, value in {"locked_by": None, **values}.items():
+        set_committed_value(job, key, value)
+    return True
+
+
+async def complete(db: AsyncSession, job: Job, result: dict[str, Any]) -> bool:
+    """Store ``result``; returns False, storing nothing, if the job's lock was lost."""
+    return await _finish(
+        db, job,
+        status=JobStatus.SUCCEEDED,
+        result=result,
+        error=None,
+        finished_at=datetime.now(timezone.utc),
+    )
+
+
+async def fail(db: AsyncSession, job: Job, error: str, retry: bool = True) -> bool:
+    """Retry later or give up; returns False, changing nothing, if the job's lock was lost."""
+    if retry and job.attempts < job.max_attempts:
+        outcome = {
+            "status": JobStatus.QUEUED,
+            "run_at": datetime.now(timezone.utc) + timedelta(seconds=retry_delay(job.attempts)),
+        }
+    else:
+        outcome = {"status": JobStatus.FAILED, "finished_at": datetime.now(timezone.utc)}
+    return await _finish(db, job, error=error, **outcome)
+
+
+async def requeue_stale(db: AsyncSession) -> int:
+    """Requeue running jobs whose lock expired; fail those out of attempts.
+
+    ``claim`` already counted the attempt that died, so a job that keeps
+    killing its worker stops after ``max_attempts``. Returns the number
+    requeued.
+    """
+    now = datetime.now(timezone.utc)
+    cutoff = now - timedelta(seconds=settings.JOB_LOCK_TIMEOUT_SECONDS)
+    stale = (Job.status == JobStatus.RUNNING, Job.locked_at < cutoff)
+    failed = await db.execute(
+        update(Job)
+        .where(*stale, Job.attempts >= Job.max_attempts)
+        .values(status=JobStatus.FAILED, locked_by=None, error="Worker lock expired", finished_at=now)
+        .execution_options(synchronize_session=False)
+    )
+    if failed.rowcount:
+        logger.warning(f"Failed {failed.rowcount} jobs whose last attempt lost its worker")
+    result = await db.execute(
+        update(Job)
+        .where(*stale, Job.attempts < Job.max_attempts)
+        .values(status=JobStatus.QUEUED, locked_by=None, error="Worker lock expired")
+        .execution_options(synchronize_session=False)
+    )
+    await db.commit()
+    return result.rowcount
+
+
+class JobLockLost(Exception):
+    """The job was requeued (and possibly re-claimed) while this worker ran it."""
+
+
+async def heartbeat(job: Job) -> None:
+    """Keep ``job``'s lock fresh; returns once the lock has been lost."""
+    while True:
+        await asyncio.sleep(settings.JOB_LOCK_TIMEOUT_SECONDS / 4)
+        try:
+            async with async_session_maker() as db:
+                refreshed = await db.execute(
+                    update(Job)
+                    .where(*_owned(job))
+                    .values(locked_at=datetime.now(timezone.utc))
+                    .execution_options(synchronize_session=False)
+                )
+                await db.commit()
+        except Exception as e:
+            # Try again next beat; the lock only expires after four misses
+            logger.warning(f"Could not refresh the lock of job {job.id}: {e}")
+            continue
+        if refreshed.rowcount != 1:
+            return
+
+
+async def _run_holding_lock(job: Job, handler: JobHandler) -> dict[str, Any]:
+    work = asyncio.create_task(handler(job))
+    beat = asyncio.create_task(heartbeat(job))
+    try:
+        done, _ = await asyncio.wait({work, beat}, return_when=asyncio.FIRST_COMPLETED)
+    finally:
+        beat.cancel()
+        if not work.done():
+            work.cancel()
+    if work not in done:
+        raise JobLockLost(f"Job {job.id} attempt {job.attempts} lost its lock")
+    return work.result()
+
+
+async def run_job(job_id: int) -> None:
+    async with async_session_maker() as db:
+        job = await db.get(Job, job_id)
+        handler = _handlers.get(job.kind)
+        if handler is None:
+            await fail(db, job, f"No handler for job kind {job.kind!r}", retry=False)
+            return
+        try:
+            result = await _run_holding_lock(job, handler)
+        except JobLockLost as e:
+            # Whoever requeued the job owns it now
+            logger.warning(f"{e}; abandoned")
+            return
+        except PermanentJobError as e:
+            await fail(db, job, str(e), retry=False)
+            return
+        except Exception as e:
+            logger.warning(f"Job {job.id} ({job.kind}) attempt {job.attempts} failed: {e}")
+            await fail(db, job, f"{type(e).__name__}: {e}")
+            return
+        await complete(db, job, result)
+
+
+class Worker:
+    def __init__(self, concurrency: Optional[int] = None, worker_id: Optional[str] = None):
+        self.concurrency = concurrency or settings.JOB_WORKER_CONCURRENCY
+        self.worker_id = worker_id or f"{socket.gethostname()}:{os.getpid()}"
+        self._running: set[asyncio.Task] = set()
+
+    async def run(self) -> None:
+        import app.services.batch_jobs  # noqa: F401  (register handlers)
+
+        logger.info(f"Job worker {self.worker_id} started ({self.concurrency} slots)")
+        last_stale_check = 0.0
+        loop = asyncio.get_running_loop()
+        while True:
+            if loop.time() - last_stale_check > settings.JOB_LOCK_TIMEOUT_SECONDS / 4:
+                async with async_session_maker() as db:
+                    if requeued := await requeue_stale(db):
+                        logger.warning(f"Requeued {requeued} jobs with expired locks")
+                last_stale_check = loop.time()
+
+            job = None
+            if len(self._running) < self.concurrency:
+                async with async_session_maker() as db:
+                    job = await claim(db, self.worker_id)
+            if job is None:
+                await asyncio.sleep(settings.JOB_POLL_SECONDS)
+                continue
+
+            task = asyncio.create_task(run_job(job.id))
+            self._running.add(task)
+            task.add_done_callback(self._finished)
+
+    def _finished(self, task: asyncio.Task) -> None:
+        self._running.discard(task)
+        if not task.cancelled() and task.exception():
+            # The job stays "running" and is requeued once its lock expires
+            logger.error(f"Job worker error: {task.exception()}")
+
+
+def _worker_process(index: int, concurrency: int) -> None:
+    logging.basicConfig(level=logging.INFO, format=f"%(asctime)s [worker {index}] %(name)s: %(message)s")
+    if settings.JOB_WORKER_NICE and hasattr(os, "nice"):
+        # Leave CPU to the API processes serving interactive chat
+        os.nice(settings.JOB_WORKER_NICE)
+    worker = Worker(concurrency)
+    try:
+        asyncio.run(worker.run())
+    except KeyboardInterrupt:
+        pass
+
+
+def main():
+    import argparse
+    import multiprocessing
+
+    parser = argparse.ArgumentParser(description="Run background job workers")
+    parser.add_argument("--processes", type=int, default=1)
+    parser.add_argument("--concurrency", type=int, default=settings.JOB_WORKER_CONCURRENCY,
+                        help="Jobs in flight per process")
+    args = parser.parse_args()
+
+    if args.processes == 1:
+        _worker_process(0, args.concurrency)
+        return
+
+    context = multiprocessing.get_context("spawn")
+    processes = [
+        context.Process(target=_worker_process, args=(i, args.concurrency))
+        for i in range(args.processes)
+    ]
+    for process in processes:
+        process.start()
+    try:
+        for process in processes:
+            process.join()
+    except KeyboardInterrupt:
+        for process in processes:
+            process.terminate()
+
+
+if __name__ == "__main__":
+    # Run through the importable module so handlers registered by
+    # app.services.batch_jobs land in the registry the workers read.
+    from app.services.job_queue import main as _main
+
+    _main()
@@ -1,9 +1,19 @@
-import httpx
+import asyncio
+import os
+import socket
+from contextlib import asynccontextmanager
+from datetime import datetime, timedelta, timezone
 from typing import AsyncGenerator, Optional
-import json
 import logging
 
+from sqlalchemy import delete, select
+
 from app.core.config import settings
+from app.core.database import async_session_maker
+from app.core.serialization import JSONDecodeError, loads
+from app.models.chat import ChatSession
+from app.models.job import InteractiveGeneration
+from app.services.model_residency import model_residency
 
 logger = logging.getLogger(__name__)
 
@@ -19,13 +29,126 @@ remind users to consult with a certified financial advisor for personalized advi
 Always be accurate about Canadian tax rules and contribution limits."""
 
 
+def system_prompt(user_context: Optional[str] = None) -> str:
+    """``SYSTEM_PROMPT`` followed by facts about the user, e.g. ``spending_summary``."""
+    if not user_context:
+        return SYSTEM_PROMPT
+    return f"{SYSTEM_PROMPT}\n\n{user_context}"
+
+
+def build_conversation_history(session: ChatSession) -> list[dict]:
+    """The session's messages as Ollama chat messages; ``session.messages`` must be loaded."""
+    return [
+        {"role": msg.role.value, "content": msg.content}
+        for msg in session.messages
+    ]
+
+
+INTERACTIVE = "interactive"
+BATCH = "batch"
+
+
+class LLMPriorityGate:
+    """Keeps batch generations from competing with interactive chat.
+
+    Interactive generations always start immediately. Batch generations
+    (background jobs) share ``JOB_LLM_CONCURRENCY`` slots per process and
+    only start once no interactive generation is running in this process.
+    With ``LLM_INTERACTIVE_LEASES`` on, interactive generations are also
+    recorded in ``llm_interactive_generations`` while they run, and batch
+    generations wait for those of every other process too; this costs
+    chat two small writes per reply, so it is only worth it when job
+    workers run. A batch generation that has started runs to completion.
+    """
+
+    def __init__(self):
+        self._interactive = 0
+        self._idle = asyncio.Event()
+        self._idle.set()
+        self._batch_slots: Optional[asyncio.Semaphore] = None
+        self._holder = f"{socket.gethostname()}:{os.getpid()}"
+
+    @asynccontextmanager
+    async def slot(self, priority: str):
+        if priority == INTERACTIVE:
+            self._interactive += 1
+            self._idle.clear()
+            lease_id = await self._acquire_lease() if settings.LLM_INTERACTIVE_LEASES else None
+            try:
+                yield
+            finally:
+                self._interactive -= 1
+                if not self._interactive:
+                    self._idle.set()
+                await self._release_lease(lease_id)
+            return
+
+        if self._batch_slots is None:
+            self._batch_slots = asyncio.Semaphore(settings.JOB_LLM_CONCURRENCY)
+        async with self._batch_slots:
+            while True:
+                await self._idle.wait()
+                if not settings.LLM_INTERACTIVE_LEASES or not await self._interactive_elsewhere():
+                    break
+                await asyncio.sleep(settings.JOB_LLM_WAIT_POLL_SECONDS)
+            yield
+
+    # The lease is advisory: if the database is unavailable chat still runs,
+    # batch work just stops deferring to it.
+
+    async def _acquire_lease(self) -> Optional[int]:
+        now = datetime.now(timezone.utc)
+        try:
+            async with async_session_maker() as db:
+                lease = InteractiveGeneration(
+                    holder=self._holder,
+                    started_at=now,
+                    expires_at=now + timedelta(seconds=settings.LLM_INTERACTIVE_LEASE_SECONDS),
+                )
+                db.add(lease)
+                await db.commit()
+                return lease.id
+        except Exception as e:
+            logger.warning(f"Could not record interactive generation: {e}")
+            return None
+
+    async def _release_lease(self, lease_id: Optional[int]) -> None:
+        if lease_id is None:
+            return
+        try:
+            async with async_session_maker() as db:
+                await db.execute(delete(InteractiveGeneration).where(InteractiveGeneration.id == lease_id))
+                await db.commit()
+        except Exception as e:
+            logger.warning(f"Could not clear interactive generation {lease_id}: {e}")
+
+    async def _interactive_elsewhere(self) -> bool:
+        try:
+            async with async_session_maker() as db:
+                running = await db.scalar(
+                    select(InteractiveGeneration.id)
+                    .where(InteractiveGeneration.expires_at > datetime.now(timezone.utc))
+                    .limit(1)
+                )
+        except Exception as e:
+            logger.warning(f"Could not check for interactive generations: {e}")
+            return False
+        return running is not None
+
+
 class LLMService:
     def __init__(self):
         self.base_url = settings.OLLAMA_BASE_URL
         self.model = settings.OLLAMA_MODEL
         self.mock_mode = settings.LLM_MOCK_MODE
+        self.gate = LLMPriorityGate()
+
+    # httpx is imported inside the methods that talk to Ollama: it is the
+    # single most expensive import of a worker and mock mode never needs it.
 
     async def _check_ollama_available(self) -> bool:
+        import httpx
+
         try:
             async with httpx.AsyncClient(timeout=5.0) as client:
                 response = await client.get(f"{self.base_url}/api/tags")
@@ -37,25 +160,29 @@ class LLMService:
         self,
         message: str,
         conversation_history: Optional[list[dict]] = None,
+        priority: str = INTERACTIVE,
+        user_context: Optional[str] = None,
     ) -> str:
         # Check if we should use mock mode
         if self.mock_mode:
             return await self._generate_mock_response(message)
 
-        # Try Ollama first
-        ollama_available = await self._check_ollama_available()
-        if not ollama_available:
-            logger.warning("Ollama not available, falling back to mock response")
-            return await self._generate_mock_response(message)
+        async with self.gate.slot(priority):
+            # Try Ollama first
+            ollama_available = await self._check_ollama_available()
+            if not ollama_available:
+                logger.warning("Ollama not available, falling back to mock response")
+                return await self._generate_mock_response(message)
 
-        return await self._generate_ollama_response(message, conversation_history)
+            return await self._generate_ollama_response(message, conversation_history, user_context)
 
     async def _generate_ollama_response(
         self,
         message: str,
         conversation_history: Optional[list[dict]] = None,
+        user_context: Optional[str] = None,
     ) -> str:
-        messages = [{"role": "system", "content": SYSTEM_PROMPT}]
+        messages = [{"role": "system", "content": system_prompt(user_context)}]
 
         # Add conversation history if provided
         if conversation_history:
@@ -64,6 +191,8 @@ class LLMService:
         # Add current message
         messages.append({"role": "user", "content": message})
 
+        import httpx
+
         try:
             async with httpx.AsyncClient(timeout=120.0) as client:
                 response = await client.post(
@@ -72,10 +201,12 @@ class LLMService:
                         "model": self.model,
                         "messages": messages,
                         "stream": False,
+                        **model_residency.request_params(self.model),
                     },
                 )
                 response.raise_for_status()
-                data = response.json()
+                data = loads(response.content)
+                model_residency.observe(self.model, data)
                 return data.get("message", {}).get("content", "I apologize, but I couldn't generate a response.")
         except httpx.TimeoutException:
             logger.error("Ollama request timed out")
@@ -88,6 +219,8 @@ class LLMService:
         self,
         message: str,
         conversation_history: Optional[list[dict]] = None,
+        priority: str = INTERACTIVE,
+        user_context: Optional[str] = None,
     ) -> AsyncGenerator[str, None]:
         # Check if we should use mock mode
         if self.mock_mode:
@@ -95,6 +228,16 @@ class LLMService:
                 yield chunk
             return
 
+        async with self.gate.slot(priority):
+            async for chunk in self._generate_ollama_response_stream(message, conversation_history, user_context):
+                yield chunk
+
+    async def _generate_ollama_response_stream(
+        self,
+        message: str,
+        conversation_history: Optional[list[dict]] = None,
+        user_context: Optional[str] = None,
+    ) -> AsyncGenerator[str, None]:
         # Try Ollama first
         ollama_available = await self._check_ollama_available()
         if not ollama_available:
@@ -103,11 +246,13 @@ class LLMService:
                 yield chunk
             return
 
-        messages = [{"role": "system", "content": SYSTEM_PROMPT}]
+        messages = [{"role": "system", "content": system_prompt(user_context)}]
         if conversation_history:
             messages.extend(conversation_history)
         messages.append({"role": "user", "content": message})
 
+        import httpx
+
         try:
             async with httpx.AsyncClient(timeout=120.0) as client:
                 async with client.stream(
@@ -117,16 +262,20 @@ class LLMService:
                         "model": self.model,
                         "messages": messages,
                         "stream": True,
+                        **model_residency.request_params(self.model),
                     },
                 ) as response:
+                    response.raise_for_status()
                     async for line in response.aiter_lines():
                         if line:
                             try:
-                                data = json.loads(line)
+                                data = loads(line)
+                                if data.get("done"):
+                                    model_residency.observe(self.model, data)
                                 content = data.get("message", {}).get("content", "")
                                 if content:
                                     yield content
-                            except json.JSONDecodeError:
+                            except JSONDecodeError:
                                 continue
         except Exception as e:
             logger.error(f"Ollama streaming error: {e}")
@@ -0,0 +1,502 @@
+"""Stock quotes served from an in-memory cache in front of a pluggable provider.
+
+Providers (``@market_data_provider("name")``, selected with
+``MARKET_DATA_PROVIDER``) fetch quotes for many symbols in one upstream
+request. None is selected by default: a deployment has to choose its quote
+source, and until it does every lookup raises ``MarketDataNotConfigured``. ``QuoteCache`` sits in front of the provider:
+
+- each symbol is fresh for its TTL (``MARKET_DATA_TTL_SECONDS``, overridable
+  per symbol with ``MARKET_DATA_TTL_OVERRIDES``) and is served from memory
+- after that it is served stale for up to ``MARKET_DATA_STALE_SECONDS``
+  while a refresh runs in the background (stale-while-revalidate)
+- misses and refreshes from all concurrent callers are collected for
+  ``MARKET_DATA_BATCH_WINDOW_MS`` and fetched in batches of at most
+  ``MARKET_DATA_BATCH_SIZE`` symbols; a symbol already being fetched is
+  never requested twice
+- every fetched quote is written to ``price_history_cache``, which also
+  warms the cache after a restart
+
+``ReplayProvider`` plays back a JSON Lines recording, for offline tests
+and ``bench.market_data``.
+"""
+import asyncio
+import logging
+import time
+from abc import ABC, abstractmethod
+from collections import OrderedDict
+from dataclasses import asdict, dataclass
+from datetime import datetime, timedelta, timezone
+from decimal import Decimal
+from pathlib import Path
+from typing import Any, Callable, Iterable, Optional
+
+from sqlalchemy import and_, func, select
+
+from app.core.config import settings
+from app.core.database import async_session_maker, insert_ignoring_conflicts
+from app.core.serialization import loads
+from app.models.market import MarketDataCache
+
+logger = logging.getLogger(__name__)
+
+
+def normalize_symbol(symbol: str) -> str:
+    return symbol.strip().upper()
+
+
+def _utc(value: datetime) -> datetime:
+    # SQLite hands back naive datetimes
+    return value if value.tzinfo else value.replace(tzinfo=timezone.utc)
+
+
+def _decimal(value: Any) -> Optional[Decimal]:
+    # Through str() so floats in a recording keep their printed digits
+    return None if value is None else Decimal(str(value))
+
+
+@dataclass(frozen=True)
+class Quote:
+    symbol: str
+    price: Decimal
+    change: Optional[Decimal]
+    change_percent: Optional[Decimal]
+    volume: Optional[int]
+    updated_at: datetime
+    source: str
+
+    @classmethod
+    def from_record(cls, record: dict, source: str) -> "Quote":
+        updated_at = record.get("updated_at")
+        return cls(
+            symbol=normalize_symbol(record["symbol"]),
+            price=_decimal(record["price"]),
+            change=_decimal(record.get("change")),
+            change_percent=_decimal(record.get("change_percent")),
+            volume=record.get("volume"),
+            updated_at=(
+                _utc(datetime.fromisoformat(updated_at)) if updated_at
+                else datetime.now(timezone.utc)
+            ),
+            source=record.get("source", source),
+        )
+
+    @classmethod
+    def from_row(cls, row: MarketDataCache) -> "Quote":
+        return cls(
+            symbol=row.symbol,
+            price=row.price,
+            change=row.change,
+            change_percent=row.change_percent,
+            volume=row.volume,
+            updated_at=_utc(row.updated_at),
+            source=row.source,
+        )
+
+
+class MarketDataError(Exception):
+    """Quotes could not be fetched and no usable cached quote exists."""
+
+    def __init__(self, symbols: list[str], quotes: dict[str, Quote]):
+        super().__init__(f"Quotes unavailable for {', '.join(symbols)}")
+        self.symbols = symbols
+        self.quotes = quotes  # Everything that was available
+
+
+class MarketDataNotConfigured(Exception):
+    """``MARKET_DATA_PROVIDER`` is not set and no provider was passed in."""
+
+    def __init__(self):
+        super().__init__("No market data provider is configured (MARKET_DATA_PROVIDER)")
+
+
+# Providers
+
+class MarketDataProvider(ABC):
+    """Fetches the latest quotes for a batch of symbols.
+
+    ``fetch_quotes`` leaves out symbols the provider does not know and
+    raises on upstream failure.
+    """
+
+    name = "base"
+    max_batch_size = 50
+
+    @abstractmethod
+    async def fetch_quotes(self, symbols: list[str]) -> dict[str, Quote]:
+        """The quotes the provider has for ``symbols``, keyed by symbol."""
+
+    async def close(self) -> None:
+        pass
+
+
+_providers: dict[str, Callable[[], MarketDataProvider]] = {}
+
+
+def market_data_provider(name: str):
+    def register(factory):
+        _providers[name] = factory
+        return factory
+    return register
+
+
+def create_provider(name: str) -> MarketDataProvider:
+    try:
+        return _providers[name]()
+    except KeyError:
+        raise ValueError(
+            f"Unknown market data provider {name!r}. Available: {', '.join(sorted(_providers))}"
+        ) from None
+
+
+@market_data_provider("replay")
+class ReplayProvider(MarketDataProvider):
+    """Plays back quotes recorded in a JSON Lines file, one quote per line::
+
+        {"symbol": "RY.TO", "price": "142.31", "change": "0.84", "change_percent": "0.59",
+         "volume": 3120400, "updated_at": "2024-06-03T14:30:00+00:00"}
+
+    Each fetch of a symbol returns its next recorded quote, wrapping around
+    at the end. ``latency`` simulates the upstream round trip.
+    """
+
+    name = "replay"
+
+    def __init__(
+        self,
+        path: Optional[str] = None,
+        latency: float = 0.0,
+        max_batch_size: Optional[int] = None,
+    ):
+        self.path = Path(path or settings.MARKET_DATA_REPLAY_PATH)
+        self.latency = latency
+        self.max_batch_size = max_batch_size or settings.MARKET_DATA_BATCH_SIZE
+        self._tapes: Optional[dict[str, list[Quote]]] = None
+        self._load_lock = asyncio.Lock()
+        self._cursor: dict[str, int] = {}
+        self.requests = 0
+        self.symbols_requested = 0
+
+    def _load(self) -> dict[str, list[Quote]]:
+        tapes: dict[str, list[Quote]] = {}
+        with self.path.open("rb") as f:
+            for line in f:
+                if line.strip():
+                    quote = Quote.from_record(loads(line), self.name)
+                    tapes.setdefault(quote.symbol, []).append(quote)
+        for tape in tapes.values():
+            tape.sort(key=lambda quote: quote.updated_at)
+        return tapes
+
+    async def fetch_quotes(self, symbols: list[str]) -> dict[str, Quote]:
+        if self._tapes is None:
+            async with self._load_lock:
+                if self._tapes is None:
+                    self._tapes = await asyncio.to_thread(self._load)
+        self.requests += 1
+        self.symbols_requested += len(symbols)
+        if self.latency:
+            await asyncio.sleep(self.latency)
+
+        quotes = {}
+        for symbol in symbols:
+            tape = self._tapes.get(symbol)
+            if not tape:
+                continue
+            position = self._cursor.get(symbol, 0)
+            self._cursor[symbol] = (position + 1) % len(tape)
+            quotes[symbol] = tape[position]
+        return quotes
+
+
+# Cache
+
+# Result of a fetch that failed upstream (as opposed to None: unknown symbol)
+_FETCH_FAILED = object()
+
+
+@dataclass
+class _Entry:
+    quote: Optional[Quote]  # None caches "provider does not know this symbol"
+    fetched_at: float  # time.monotonic()
+
+
+@dataclass
+class CacheStats:
+    hits: int = 0
+    stale_hits: int = 0
+    misses: int = 0
+    coalesced: int = 0
+    stale_fallbacks: int = 0
+    upstream_requests: int = 0
+    upstream_symbols: int = 0
+    upstream_errors: int = 0
+    rows_written: int = 0
+
+
+class QuoteCache:
+    def __init__(
+        self,
+        provider: Optional[MarketDataProvider] = None,
+        *,
+        ttl: Optional[float] = None,
+        ttl_overrides: Optional[dict[str, float]] = None,
+        stale: Optional[float] = None,
+        batch_window_ms: Optional[float] = None,
+        max_size: Optional[int] = None,
+        write_through: Optional[bool] = None,
+    ):
+        self._provider = provider
+        self.ttl = settings.MARKET_DATA_TTL_SECONDS if ttl is None else ttl
+        self.ttl_overrides = {
+            normalize_symbol(symbol): value
+            for symbol, value in (
+                settings.MARKET_DATA_TTL_OVERRIDES if ttl_overrides is None else ttl_overrides
+            ).items()
+        }
+        self.stale = settings.MARKET_DATA_STALE_SECONDS if stale is None else stale
+        self.batch_window = (
+            settings.MARKET_DATA_BATCH_WINDOW_MS if batch_window_ms is None else batch_window_ms
+        ) / 1000
+        self.max_size = settings.MARKET_DATA_CACHE_SIZE if max_size is None else max_size
+        self.write_through = (
+            settings.MARKET_DATA_WRITE_THROUGH if write_through is None else write_through
+        )
+        self.stats = CacheStats()
+        self._entries: OrderedDict[str, _Entry] = OrderedDict()
+        self._inflight: dict[str, asyncio.Future] = {}
+        self._pending: list[str] = []
+        self._flush_handle: Optional[asyncio.TimerHandle] = None
+        self._tasks: set[asyncio.Task] = set()
+
+    @property
+    def configured(self) -> bool:
+        return self._provider is not None or bool(settings.MARKET_DATA_PROVIDER)
+
+    @property
+    def provider(self) -> MarketDataProvider:
+        # Created on first use so importing this module never touches the provider
+        if self._provider is None:
+            self._provider = create_provider(settings.MARKET_DATA_PROVIDER)
+        return self._provider
+
+    def ttl_for(self, symbol: str) -> float:
+        return self.ttl_overrides.get(symbol, self.ttl)
+
+    async def get_quote(self, symbol: str) -> Optional[Quote]:
+        return (await self.get_quotes([symbol])).get(normalize_symbol(symbol))
+
+    async def get_quotes(self, symbols: Iterable[str]) -> dict[str, Quote]:
+        """Quotes keyed by normalized symbol; unknown symbols are left out.
+
+        Raises ``MarketDataError`` if the provider failed for a symbol that
+        has no cached quote at all.
+        """
+        if not self.configured:
+            raise MarketDataNotConfigured()
+        now = time.monotonic()
+        requested = list(dict.fromkeys(normalize_symbol(s) for s in symbols))
+        quotes: dict[str, Quote] = {}
+        waiting: dict[str, asyncio.Future] = {}
+        fallbacks: dict[str, Quote] = {}
+
+        for symbol in requested:
+            entry = self._entries.get(symbol)
+            if entry is not None:
+                age = now - entry.fetched_at
+                ttl = self.ttl_for(symbol)
+                if age < ttl:
+                    self.stats.hits += 1
+                    self._entries.move_to_end(symbol)
+                    if entry.quote is not None:
+                        quotes[symbol] = entry.quote
+                    continue
+                if entry.quote is not None:
+                    if age < ttl + self.stale:
+                        self.stats.stale_hits += 1
+                        self._entries.move_to_end(symbol)
+                        quotes[symbol] = entry.quote
+                        self._request(symbol)  # Refresh without waiting for it
+                        continue
+                    fallbacks[symbol] = entry.quote
+            self.stats.misses += 1
+            waiting[symbol] = self._request(symbol)
+
+        failed = []
+        if waiting:
+            # Shielded: a cancelled caller must not cancel a fetch other callers share
+            results = await asyncio.gather(*(asyncio.shield(f) for f in waiting.values()))
+            for symbol, result in zip(waiting, results):
+                if result is _FETCH_FAILED:
+                    if symbol in fallbacks:
+                        self.stats.stale_fallbacks += 1
+                        quotes[symbol] = fallbacks[symbol]
+                    else:
+                        failed.append(symbol)
+                elif result is not None:
+                    quotes[symbol] = result
+
+        ordered = {symbol: quotes[symbol] for symbol in requested if symbol in quotes}
+        if failed:
+            raise MarketDataError(failed, ordered)
+        return ordered
+
+    def _request(self, symbol: str) -> asyncio.Future:
+        future = self._inflight.get(symbol)
+        if future is not None:
+            self.stats.coalesced += 1
+            return future
+
+        loop = asyncio.get_running_loop()
+        future = loop.create_future()
+        self._inflight[symbol] = future
+        self._pending.append(symbol)
+        if len(self._pending) >= self.provider.max_batch_size:
+            self._flush()
+        elif self._flush_handle is None:
+            self._flush_handle = loop.call_later(self.batch_window, self._flush)
+        return future
+
+    def _flush(self) -> None:
+        if self._flush_handle is not None:
+            self._flush_handle.cancel()
+            self._flush_handle = None
+        symbols, self._pending = self._pending, []
+        size = self.provider.max_batch_size
+        for start in range(0, len(symbols), size):
+            self._spawn(self._fetch_batch(symbols[start:start + size]))
+
+    def _spawn(self, coro) -> None:
+        task = asyncio.create_task(coro)
+        self._tasks.add(task)
+        task.add_done_callback(self._tasks.discard)
+
+    async def _fetch_batch(self, symbols: list[str]) -> None:
+        self.stats.upstream_requests += 1
+        self.stats.upstream_symbols += len(symbols)
+        quotes: dict[str, Quote] = {}
+        ok = False
+        try:
+            quotes = await self.provider.fetch_quotes(symbols)
+            ok = True
+            fetched_at = time.monotonic()
+            for symbol in symbols:
+                self._store(symbol, quotes.get(symbol), fetched_at)
+        except Exception as e:
+            self.stats.upstream_errors += 1
+            logger.error(f"Market data provider {self.provider.name} failed for {len(symbols)} symbols: {e}")
+        finally:
+            for symbol in symbols:
+                future = self._inflight.pop(symbol, None)
+                if future is not None and not future.done():
+                    future.set_result(quotes.get(symbol) if ok else _FETCH_FAILED)
+
+        # Written after waiters are released so callers never wait on the database
+        if ok and quotes and self.write_through:
+            await self._persist(list(quotes.values()))
+
+    def _store(self, symbol: str, quote: Optional[Quote], fetched_at: float) -> None:
+        self._entries[symbol] = _Entry(quote, fetched_at)
+        self._entries.move_to_end(symbol)
+        while len(self._entries) > self.max_size:
+            self._entries.popitem(last=False)
+
+    async def _persist(self, quotes: list[Quote]) -> None:
+        rows = [
+            {
+                "symbol": quote.symbol,
+                "price": quote.price,
+                "change": quote.change,
+                "change_percent": quote.change_percent,
+                "volume": quote.volume,
+                "updated_at": quote.updated_at,
+                "source": quote.source,
+            }
+            for quote in quotes
+        ]
+        try:
+            async with async_session_maker() as db:
+                await db.execute(
+                    insert_ignoring_conflicts(MarketDataCache, ["symbol", "updated_at"]), rows
+                )
+                await db.commit()
+            self.stats.rows_written += len(rows)
+        except Exception as e:
+            logger.error(f"Writing {len(rows)} quotes to price_history_cache failed: {e}")
+
+    async def warm_from_db(self) -> int:
+        """Load the latest stored quote of recently fetched symbols."""
+        horizon = max([self.ttl, *self.ttl_overrides.values()]) + self.stale
+        now = datetime.now(timezone.utc)
+        # Read through the fetched_at index. The ORDER BY keeps SQLite from
+        # merging this into the GROUP BY below, which it would rather serve
+        # by scanning the whole (symbol, updated_at) index
+        recent = (
+            select(MarketDataCache.symbol, MarketDataCache.updated_at)
+            .where(MarketDataCache.fetched_at >= now - timedelta(seconds=horizon))
+            .order_by(MarketDataCache.fetched_at)
+            .subquery()
+        )
+        latest = (
+            select(recent.c.symbol, func.max(recent.c.updated_at).label("updated_at"))
+            .group_by(recent.c.symbol)
+            .subquery()
+        )
+        async with async_session_maker() as db:
+            result = await db.execute(
+                select(MarketDataCache)
+                .join(latest, and_(
+                    MarketDataCache.symbol == latest.c.symbol,
+                    MarketDataCache.updated_at == latest.c.updated_at,
+                ))
+                .order_by(MarketDataCache.fetched_at.desc())
+                .limit(self.max_size)
+            )
+            rows = result.scalars().all()
+
+        monotonic_now = time.monotonic()
+        loaded = 0
+        # Oldest first, so the most recently fetched end up least likely to be evicted
+        for row in reversed(rows):
+            if row.symbol in self._entries:
+                continue
+            age = (now - _utc(row.fetched_at)).total_seconds()
+            self._store(row.symbol, Quote.from_row(row), monotonic_now - age)
+            loaded += 1
+        return loaded
+
+    async def _warm(self) -> None:
+        try:
+            loaded = await self.warm_from_db()
+            if loaded:
+                logger.info(f"Warmed quote cache with {loaded} symbols from price_history_cache")
+        except Exception as e:
+            logger.error(f"Quote cache warm-up failed: {e}")
+
+    def start(self) -> None:
+        if self.configured:
+            self._spawn(self._warm())
+
+    async def stop(self, timeout: float = 5.0) -> None:
+        # Let in-flight fetches finish their write-through before shutting down
+        if self._pending:
+            self._flush()
+        if self._tasks:
+            _, pending = await asyncio.wait(set(self._tasks), timeout=timeout)
+            for task in pending:
+                task.cancel()
+            if pending:
+                await asyncio.gather(*pending, return_exceptions=True)
+        if self._provider is not None:
+            await self._provider.close()
+
+    def snapshot(self) -> dict:
+        return {
+            "provider": (settings.MARKET_DATA_PROVIDER or None) if self._provider is None else self._provider.name,
+            "symbols": len(self._entries),
+            "inflight": len(self._inflight),
+            **asdict(self.stats),
+        }
+
+
+# Singleton instance
+market_data = QuoteCache()
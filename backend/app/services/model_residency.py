@@ -0,0 +1,228 @@
+"""Keeps Ollama models loaded so users don't pay for cold loads.
+
+Ollama unloads a model once its ``keep_alive`` expires, and the next chat
+then waits seconds for the weights to load. The residency manager:
+
+- preloads the configured models at startup (``/api/generate`` with no
+  prompt loads a model without generating anything)
+- picks ``keep_alive`` per request from recent traffic: long while a model is
+  in use, short for the first request after a quiet spell
+- shortens ``keep_alive`` once a model goes quiet, so memory is given back
+  even though the last request asked for the long one
+- watches ``/api/ps`` and reloads a model that was evicted while it still
+  has traffic, so the reload happens off the request path
+- counts loads, evictions and cold requests per model
+"""
+import asyncio
+import logging
+import time
+from dataclasses import asdict, dataclass, field
+from typing import Optional
+
+from app.core.config import settings
+from app.core.serialization import loads
+
+logger = logging.getLogger(__name__)
+
+
+def _normalize(model: str) -> str:
+    return model if ":" in model else f"{model}:latest"
+
+
+@dataclass
+class ModelStats:
+    resident: bool = False
+    expires_at: Optional[str] = None
+    loads: int = 0
+    evictions: int = 0
+    requests: int = 0
+    cold_requests: int = 0
+    last_load_ms: Optional[float] = None
+    last_request_at: Optional[float] = None
+    keep_alive: Optional[str] = None  # Last keep_alive sent to Ollama
+    keep_alive_at: Optional[float] = field(default=None, repr=False)
+
+
+class ModelResidencyManager:
+    def __init__(self):
+        self.base_url = settings.OLLAMA_BASE_URL
+        self.preload_models = settings.OLLAMA_PRELOAD_MODELS or [settings.OLLAMA_MODEL]
+        self.models: dict[str, ModelStats] = {}
+        self._task: Optional[asyncio.Task] = None
+
+    def _stats(self, model: str) -> ModelStats:
+        return self.models.setdefault(_normalize(model), ModelStats())
+
+    def _is_active(self, stats: ModelStats, now: float) -> bool:
+        return (
+            stats.last_request_at is not None
+            and now - stats.last_request_at < settings.OLLAMA_TRAFFIC_WINDOW_SECONDS
+        )
+
+    def _sent_keep_alive(self, stats: ModelStats, keep_alive: str, now: float) -> None:
+        stats.keep_alive = keep_alive
+        stats.keep_alive_at = now
+
+    # Per-request hooks used by LLMService
+
+    def keep_alive(self, model: str) -> str:
+        stats = self._stats(model)
+        if self._is_active(stats, time.monotonic()):
+            return settings.OLLAMA_KEEP_ALIVE_ACTIVE
+        return settings.OLLAMA_KEEP_ALIVE_IDLE
+
+    def options(self) -> dict:
+        options = {}
+        if settings.OLLAMA_NUM_CTX is not None:
+            options["num_ctx"] = settings.OLLAMA_NUM_CTX
+        if settings.OLLAMA_NUM_PREDICT is not None:
+            options["num_predict"] = settings.OLLAMA_NUM_PREDICT
+        return options
+
+    def request_params(self, model: str) -> dict:
+        """Extra ``/api/chat`` fields for a user request, counted as traffic."""
+        stats = self._stats(model)
+        now = time.monotonic()
+        # Decided from the traffic before this request
+        keep_alive = self.keep_alive(model)
+        stats.requests += 1
+        stats.last_request_at = now
+        self._sent_keep_alive(stats, keep_alive, now)
+
+        params = {"keep_alive": keep_alive}
+        options = self.options()
+        if options:
+            params["options"] = options
+        return params
+
+    def observe(self, model: str, data: dict, user_facing: bool = True) -> None:
+        """Record timing from a final Ollama response (``done: true``)."""
+        load_ms = data.get("load_duration", 0) / 1e6
+        stats = self._stats(model)
+        if load_ms >= settings.OLLAMA_COLD_LOAD_THRESHOLD_MS:
+            stats.loads += 1
+            stats.last_load_ms = round(load_ms, 1)
+            if user_facing:
+                stats.cold_requests += 1
+                logger.warning(f"Cold load of {model} took {load_ms:.0f} ms on a user request")
+        stats.resident = True
+
+    # Background work
+
+    async def warm(self, model: str) -> bool:
+        import httpx
+
+        started = time.perf_counter()
+        try:
+            async with httpx.AsyncClient(timeout=settings.OLLAMA_WARMUP_TIMEOUT) as client:
+                response = await client.post(
+                    f"{self.base_url}/api/generate",
+                    # Preloaded models get the in-use keep_alive so they are
+                    # still resident when the first users arrive.
+                    json={"model": model, "keep_alive": settings.OLLAMA_KEEP_ALIVE_ACTIVE},
+                )
+                response.raise_for_status()
+                self.observe(model, loads(response.content), user_facing=False)
+        except Exception as e:
+            logger.error(f"Warm-up of {model} failed: {e}")
+            return False
+        self._sent_keep_alive(self._stats(model), settings.OLLAMA_KEEP_ALIVE_ACTIVE, time.monotonic())
+
+        logger.info(f"Warmed {model} in {(time.perf_counter() - started) * 1000:.0f} ms")
+        return True
+
+    async def poll(self) -> None:
+        import httpx
+
+        try:
+            async with httpx.AsyncClient(timeout=5.0) as client:
+                response = await client.get(f"{self.base_url}/api/ps")
+                response.raise_for_status()
+                loaded = {
+                    _normalize(m.get("name", "")): m
+                    for m in loads(response.content).get("models", [])
+                }
+        except Exception as e:
+            logger.debug(f"Ollama /api/ps unavailable: {e}")
+            return
+
+        now = time.monotonic()
+        for model, info in loaded.items():
+            stats = self._stats(model)
+            stats.resident = True
+            stats.expires_at = info.get("expires_at")
+
+        for model, stats in self.models.items():
+            if model in loaded or not stats.resident:
+                continue
+            stats.resident = False
+            stats.expires_at = None
+            stats.evictions += 1
+            logger.info(f"{model} was evicted by Ollama")
+            if self._is_active(stats, now):
+                await self.warm(model)
+
+        for model, stats in self.models.items():
+            if (
+                stats.resident
+                and stats.keep_alive == settings.OLLAMA_KEEP_ALIVE_ACTIVE
+                and now - stats.keep_alive_at >= settings.OLLAMA_TRAFFIC_WINDOW_SECONDS
+            ):
+                await self.release(model)
+
+    async def release(self, model: str) -> bool:
+        """Replace a quiet model's long ``keep_alive`` with the idle one."""
+        import httpx
+
+        try:
+            async with httpx.AsyncClient(timeout=5.0) as client:
+                response = await client.post(
+                    f"{self.base_url}/api/generate",
+                    json={"model": model, "keep_alive": settings.OLLAMA_KEEP_ALIVE_IDLE},
+                )
+                response.raise_for_status()
+        except Exception as e:
+            logger.warning(f"Could not shorten keep_alive of {model}: {e}")
+            return False
+        self._sent_keep_alive(self._stats(model), settings.OLLAMA_KEEP_ALIVE_IDLE, time.monotonic())
+        logger.info(f"{model} is idle, keep_alive set to {settings.OLLAMA_KEEP_ALIVE_IDLE}")
+        return True
+
+    async def run(self) -> None:
+        for model in self.preload_models:
+            await self.warm(model)
+        while True:
+            await self.poll()
+            await asyncio.sleep(settings.OLLAMA_RESIDENCY_POLL_SECONDS)
+
+    def start(self) -> None:
+        if settings.LLM_MOCK_MODE or self._task is not None:
+            return
+        self._task = asyncio.create_task(self.run())
+
+    async def stop(self) -> None:
+        if self._task is None:
+            return
+        self._task.cancel()
+        try:
+            await self._task
+        except asyncio.CancelledError:
+            pass
+        self._task = None
+
+    def snapshot(self) -> dict:
+        now = time.monotonic()
+        snapshot = {}
+        for model, stats in self.models.items():
+            data = asdict(stats)
+            del data["keep_alive_at"]
+            last_request_at = data.pop("last_request_at")
+            data["idle_seconds"] = (
+                round(now - last_request_at, 1) if last_request_at is not None else None
+            )
+            snapshot[model] = data
+        return snapshot
+
+
+# Singleton instance
+model_residency = ModelResidencyManager()
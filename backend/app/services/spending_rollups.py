@@ -0,0 +1,259 @@
+"""Per-user, per-month, per-category spending totals, maintained incrementally.
+
+Every write to ``transactions`` also records its effect on
+``spending_rollups``, in the same database transaction. A statement import
+adds the rows it actually inserted, an edit subtracts the old version and
+adds the new one, and a delete subtracts. The changes are collected in a
+``RollupChanges`` and applied with ``insert_or_accumulate``, which adds to
+the stored totals in the database (one upsert on SQLite and PostgreSQL), so
+concurrent writers never lose an update. Budget views
+and the chat prompt then read a few rows by ``(user_id, month)`` instead of
+aggregating the transactions table.
+
+``rebuild`` recomputes the table from ``transactions``, for backfills or
+after writes that bypassed this module::
+
+    python -m app.services.spending_rollups rebuild [--user-id N]
+    python -m app.services.spending_rollups verify [--user-id N]   # report drift only
+"""
+import asyncio
+from collections import defaultdict
+from datetime import date, datetime, timezone
+from decimal import Decimal
+from typing import Optional
+
+from sqlalchemy import delete, select, text
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.core.config import settings
+from app.core.database import async_session_maker, insert_or_accumulate
+from app.core.serialization import dumps
+from app.models.finance import SpendingRollup, Transaction
+
+# Money moving between the user's own accounts or coming in is not spending
+NON_SPENDING = ("Income", "Transfers", "Savings & Investments")
+SUMMARY_TOP_CATEGORIES = 5
+REBUILD_YIELD_PER = 10_000
+
+Totals = tuple[int, int, int]  # transaction_count, spent_cents, received_cents
+
+
+class RollupChanges:
+    """The rollup deltas of a set of transaction writes, applied in one statement."""
+
+    def __init__(self):
+        self._deltas: dict[tuple[int, date, str], list[int]] = {}
+
+    def add(self, user_id: int, posted_on: date, category: str, amount: Decimal, sign: int = 1) -> None:
+        key = (user_id, posted_on.replace(day=1), category)
+        delta = self._deltas.get(key)
+        if delta is None:
+            delta = self._deltas[key] = [0, 0, 0]
+        cents = int(amount * 100)
+        delta[0] += sign
+        if cents < 0:
+            delta[1] -= cents * sign
+        else:
+            delta[2] += cents * sign
+
+    def remove(self, user_id: int, posted_on: date, category: str, amount: Decimal) -> None:
+        self.add(user_id, posted_on, category, amount, sign=-1)
+
+    def add_transaction(self, transaction: Transaction) -> None:
+        self.add(transaction.user_id, transaction.posted_on, transaction.category, transaction.amount)
+
+    def remove_transaction(self, transaction: Transaction) -> None:
+        self.remove(transaction.user_id, transaction.posted_on, transaction.category, transaction.amount)
+
+    def totals(self) -> dict[tuple[int, date, str], Totals]:
+        return {key: tuple(delta) for key, delta in self._deltas.items() if any(delta)}
+
+    async def apply(self, db: AsyncSession) -> None:
+        """Add the collected deltas to ``spending_rollups``; the caller commits."""
+        now = datetime.now(timezone.utc)
+        rows = [
+            {
+                "user_id": user_id,
+                "month": month,
+                "category": category,
+                "transaction_count": count,
+                "spent_cents": spent,
+                "received_cents": received,
+                "updated_at": now,
+            }
+            for (user_id, month, category), (count, spent, received) in self.totals().items()
+        ]
+        self._deltas.clear()
+        await insert_or_accumulate(
+            db,
+            SpendingRollup,
+            rows,
+            ["user_id", "month", "category"],
+            add=["transaction_count", "spent_cents", "received_cents"],
+            replace=["updated_at"],
+        )
+
+
+async def _recompute(db: AsyncSession, user_id: Optional[int]) -> RollupChanges:
+    stmt = select(
+        Transaction.user_id, Transaction.posted_on, Transaction.category, Transaction.amount
+    ).execution_options(yield_per=REBUILD_YIELD_PER)
+    if user_id is not None:
+        stmt = stmt.where(Transaction.user_id == user_id)
+
+    changes = RollupChanges()
+    result = await db.stream(stmt)
+    async for partition in result.partitions():
+        for row in partition:
+            changes.add(*row)
+    return changes
+
+
+async def rebuild(db: AsyncSession, user_id: Optional[int] = None) -> int:
+    """Recompute the rollups of one user (or everyone) from ``transactions``.
+
+    Transaction writes must not commit between the scan and the rebuild's
+    commit, or their deltas are lost. On PostgreSQL the rollups table is
+    locked in EXCLUSIVE mode first: reads go on, and writers wait at their
+    rollup upsert (so before committing) and then add on top. On SQLite
+    the DELETE takes the database's only write lock, with the same effect.
+    On other databases, stop writes while rebuilding.
+    Returns the number of rollup rows written.
+    """
+    stmt = delete(SpendingRollup)
+    if user_id is not None:
+        stmt = stmt.where(SpendingRollup.user_id == user_id)
+    try:
+        if db.bind.dialect.name == "postgresql":
+            await db.execute(text(f"LOCK TABLE {SpendingRollup.__tablename__} IN EXCLUSIVE MODE"))
+        await db.execute(stmt)
+        changes = await _recompute(db, user_id)
+        written = len(changes.totals())
+        await changes.apply(db)
+        await db.commit()
+    except Exception:
+        await db.rollback()
+        raise
+    return written
+
+
+async def verify(db: AsyncSession, user_id: Optional[int] = None) -> dict:
+    """Compare the stored rollups with a fresh aggregation, without changing anything."""
+    expected = (await _recompute(db, user_id)).totals()
+    stmt = select(
+        SpendingRollup.user_id,
+        SpendingRollup.month,
+        SpendingRollup.category,
+        SpendingRollup.transaction_count,
+        SpendingRollup.spent_cents,
+        SpendingRollup.received_cents,
+    )
+    if user_id is not None:
+        stmt = stmt.where(SpendingRollup.user_id == user_id)
+    stored = {
+        (row[0], row[1], row[2]): tuple(row[3:])
+        for row in (await db.execute(stmt)).all()
+        if any(row[3:])
+    }
+    drifted = sorted(key for key in expected.keys() | stored.keys() if expected.get(key) != stored.get(key))
+    return {
+        "rollups": len(expected),
+        "drifted": len(drifted),
+        "examples": [
+            {
+                "user_id": key[0],
+                "month": key[1].isoformat(),
+                "category": key[2],
+                "stored": stored.get(key),
+                "expected": expected.get(key),
+            }
+            for key in drifted[:10]
+        ],
+    }
+
+
+def _dollars(cents: int) -> str:
+    return f"${cents / 100:,.2f}"
+
+
+async def spending_summary(db: AsyncSession, user_id: int, months: Optional[int] = None) -> Optional[str]:
+    """A few lines on the user's latest ``months`` months of spending, for the LLM prompt.
+
+    One indexed lookup on ``spending_rollups``; ``None`` when the user has
+    no transactions.
+    """
+    months = settings.SPENDING_SUMMARY_MONTHS if months is None else months
+    if months <= 0:
+        return None
+    user_rollups = (SpendingRollup.user_id == user_id, SpendingRollup.transaction_count > 0)
+    recent = (
+        select(SpendingRollup.month)
+        .where(*user_rollups)
+        .distinct()
+        .order_by(SpendingRollup.month.desc())
+        .limit(months)
+        .scalar_subquery()
+    )
+    result = await db.execute(
+        select(
+            SpendingRollup.month,
+            SpendingRollup.category,
+            SpendingRollup.spent_cents,
+            SpendingRollup.received_cents,
+        )
+        .where(*user_rollups, SpendingRollup.month.in_(recent))
+        .order_by(SpendingRollup.month.desc())
+    )
+    by_month: dict[date, dict[str, tuple[int, int]]] = defaultdict(dict)
+    for month, category, spent, received in result.all():
+        by_month[month][category] = (spent, received)
+    return format_spending_summary(by_month) if by_month else None
+
+
+def format_spending_summary(by_month: dict[date, dict[str, tuple[int, int]]]) -> str:
+    """``{month: {category: (spent_cents, received_cents)}}``, newest month first, as prompt text."""
+    lines = ["Recent spending from the user's imported bank statements (amounts in account currency):"]
+    for month, categories in by_month.items():
+        # Refunds net off against the category they came back to
+        spending = sorted(
+            (
+                (spent - received, category)
+                for category, (spent, received) in categories.items()
+                if category not in NON_SPENDING and spent > received
+            ),
+            reverse=True,
+        )
+        total = sum(cents for cents, _ in spending)
+        parts = [f"{category} {_dollars(cents)}" for cents, category in spending[:SUMMARY_TOP_CATEGORIES]]
+        other = total - sum(cents for cents, _ in spending[:SUMMARY_TOP_CATEGORIES])
+        if other:
+            parts.append(f"other {_dollars(other)}")
+        line = f"- {month:%Y-%m}: spent {_dollars(total)}"
+        if parts:
+            line += f" ({', '.join(parts)})"
+        income = categories.get("Income", (0, 0))[1]
+        if income:
+            line += f"; income {_dollars(income)}"
+        saved = categories.get("Savings & Investments", (0, 0))[0]
+        if saved:
+            line += f"; saved/invested {_dollars(saved)}"
+        lines.append(line)
+    return "\n".join(lines)
+
+
+async def _main(command: str, user_id: Optional[int]) -> None:
+    async with async_session_maker() as db:
+        if command == "rebuild":
+            written = await rebuild(db, user_id)
+            print(f"Rebuilt {written} rollups")
+        print(dumps(await verify(db, user_id)).decode("utf-8"))
+
+
+if __name__ == "__main__":
+    import argparse
+
+    parser = argparse.ArgumentParser(description="Maintain spending rollups")
+    parser.add_argument("command", choices=["rebuild", "verify"])
+    parser.add_argument("--user-id", type=int, help="Only this user (default: everyone)")
+    args = parser.parse_args()
+    asyncio.run(_main(args.command, args.user_id))
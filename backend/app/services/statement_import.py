@@ -0,0 +1,540 @@
+"""Streaming import of bank and credit-card statements (CSV and OFX/QFX).
+
+The file part of the upload is extracted as it arrives and buffered in a
+temporary file (see ``app.core.uploads``); only once the client has sent it
+all does the import start its transaction. The buffered file is then read
+back in chunks: bytes are decoded incrementally, complete CSV records or
+``<STMTTRN>`` blocks are parsed as soon as they are in the buffer, and
+parsed rows are inserted in batches of ``STATEMENT_IMPORT_BATCH_SIZE``.
+Memory use depends on the batch size, not on the size of the statement.
+
+Each row is normalized (date, signed amount in cents, cleaned-up merchant
+name), categorized with the keyword rules in ``CATEGORY_RULES`` and given a
+content hash. Inserts skip rows whose hash already exists for the account
+(unique index ``uq_transactions_account_hash``), so re-uploading a
+statement, or uploading overlapping ones, never duplicates a transaction.
+The hash is the OFX ``FITID`` when there is one, otherwise date, amount,
+merchant and how many times that triple already occurred in the file, so
+two identical purchases on the same day stay two transactions.
+
+Like the chat history import, a statement is imported in a single
+transaction: a malformed file leaves nothing behind. Rows that cannot be
+parsed are counted as rejected and skipped. The inserted rows are added to
+the spending rollups in the same transaction.
+"""
+import codecs
+import csv
+import hashlib
+import html
+import logging
+import re
+import time
+from abc import ABC, abstractmethod
+from dataclasses import dataclass
+from datetime import date, datetime
+from decimal import Decimal, InvalidOperation, ROUND_HALF_EVEN
+from typing import Optional
+
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.core.config import settings
+from app.core.database import insert_ignoring_conflicts
+from app.core.uploads import UploadStream, spooled
+from app.models.finance import (
+    BankAccount,
+    ExpenseStatement,
+    StatementFormat,
+    StatementStatus,
+    Transaction,
+)
+from app.services.spending_rollups import RollupChanges
+
+logger = logging.getLogger(__name__)
+
+CENT = Decimal("0.01")
+
+# Checked in order: at the same position in the merchant name the first
+# category listed wins (so "UBER EATS" is Dining, not Transportation)
+CATEGORY_RULES: dict[str, tuple[str, ...]] = {
+    "Transfers": ("E-TRANSFER", "E-TRF", "ETRANSFER", "TRANSFER", "TFR", "CREDIT CARD PAYMENT", "PAYMENT - THANK YOU", "PAYMENT THANK YOU"),
+    "Savings & Investments": ("WEALTHSIMPLE", "QUESTRADE", "TFSA", "RRSP", "FHSA", "RESP", "MUTUAL FUND"),
+    "Income": ("PAYROLL", "SALARY", "DIRECT DEP", "PAY DEP", "CANADA FED", "CCB", "GST CREDIT", "EI CANADA"),
+    "Fees & Interest": ("SERVICE CHARGE", "MONTHLY FEE", "ACCOUNT FEE", "ANNUAL FEE", "NSF", "OVERDRAFT", "INTEREST CHARGE", "PURCHASE INTEREST"),
+    "Health": ("SHOPPERS DRUG", "PHARMA", "REXALL", "LONDON DRUGS", "JEAN COUTU", "DENTAL", "CLINIC", "OPTOMETR", "PHYSIO"),
+    "Dining": ("UBER EATS", "DOORDASH", "SKIP THE DISHES", "SKIPTHEDISHES", "TIM HORTONS", "STARBUCKS", "MCDONALD", "A&W", "SUBWAY", "HARVEY", "PIZZA", "SUSHI", "RESTAURANT", "CAFE", "COFFEE", "BAR ", "PUB "),
+    "Groceries": ("LOBLAWS", "NO FRILLS", "NOFRILLS", "SUPERSTORE", "SOBEYS", "SAFEWAY", "METRO", "FRESHCO", "FOOD BASICS", "FARM BOY", "T&T", "WHOLE FOODS", "IGA", "PROVIGO", "MAXI", "SAVE ON FOODS", "GROCERY"),
+    "Gas": ("PETRO-CANADA", "PETRO CANADA", "SHELL", "ESSO", "HUSKY", "ULTRAMAR", "PIONEER", "CHEVRON", "CO-OP GAS"),
+    "Transportation": ("UBER", "LYFT", "PRESTO", "TTC", "STM ", "TRANSLINK", "OC TRANSPO", "GO TRANSIT", "IMPARK", "GREEN P", "PARKING"),
+    "Housing": ("RENT", "MORTGAGE", "PROPERTY TAX", "CONDO FEE"),
+    "Utilities": ("HYDRO", "ENBRIDGE", "FORTISBC", "ROGERS", "BELL CANADA", "BELL MOBILITY", "TELUS", "FIDO", "KOODO", "VIRGIN PLUS", "FREEDOM MOBILE", "VIDEOTRON", "SHAW"),
+    "Subscriptions": ("NETFLIX", "SPOTIFY", "DISNEY PLUS", "DISNEYPLUS", "CRAVE", "APPLE.COM", "AMAZON PRIME", "PRIME VIDEO", "YOUTUBE", "GOOGLE STORAGE"),
+    "Travel": ("AIR CANADA", "WESTJET", "PORTER AIR", "FLAIR", "VIA RAIL", "AIRBNB", "EXPEDIA", "HOTEL", "MARRIOTT", "HILTON"),
+    "Entertainment": ("CINEPLEX", "TICKETMASTER", "STEAM", "PLAYSTATION", "XBOX", "NINTENDO"),
+    "Shopping": ("AMAZON", "AMZN", "WALMART", "COSTCO", "CANADIAN TIRE", "BEST BUY", "IKEA", "WINNERS", "HOME DEPOT", "DOLLARAMA", "HUDSON'S BAY", "SPORT CHEK"),
+}
+CATEGORIES = (*CATEGORY_RULES, "Uncategorized")
+# One alternation group per category; ``match.lastindex`` says which
+_CATEGORY_PATTERN = re.compile("|".join(
+    "(" + "|".join(r"\b" + re.escape(keyword) for keyword in keywords) + ")"
+    for keywords in CATEGORY_RULES.values()
+))
+_CATEGORY_NAMES = list(CATEGORY_RULES)
+
+_MERCHANT_PREFIX = re.compile(
+    r"^(?:(?:POS|IDP|OPOS|APOS|FPOS|PURCHASE|VISA DEBIT|DEBIT CARD|INTERAC|RECURRING|PRE-?AUTH(?:ORIZED)?)\s+)+"
+)
+# Store numbers, card masks, reference numbers
+_MERCHANT_NOISE = re.compile(r"#\s*\d+|\b[X*]{2,}\d*|\d{4,}|\*")
+_WHITESPACE = re.compile(r"\s+")
+
+
+class StatementImportError(ValueError):
+    """The file is not a statement this importer understands."""
+
+
+class _RowError(ValueError):
+    pass
+
+
+class _AmbiguousDate(_RowError):
+    """A date the file's remaining formats read differently, e.g. ``03/04/2024``."""
+
+
+@dataclass(slots=True)
+class StatementRow:
+    posted_on: date
+    amount: int  # cents, negative = money out
+    description: str
+    fit_id: Optional[str] = None
+
+
+def normalize_merchant(description: str) -> str:
+    """Upper-cased description without card-network prefixes, store and reference numbers."""
+    text = _WHITESPACE.sub(" ", description.upper()).strip()
+    text = _MERCHANT_PREFIX.sub("", text)
+    text = _WHITESPACE.sub(" ", _MERCHANT_NOISE.sub(" ", text)).strip()
+    return text or description.strip().upper()
+
+
+def categorize(merchant: str, amount: int) -> str:
+    match = _CATEGORY_PATTERN.search(merchant)
+    if match:
+        return _CATEGORY_NAMES[match.lastindex - 1]
+    return "Income" if amount > 0 else "Uncategorized"
+
+
+def parse_cents(text: str) -> Optional[int]:
+    """``"$1,234.56"``, ``"(12.00)"``, ``"12.00 DR"`` -> signed cents; ``None`` when blank."""
+    text = text.strip().upper()
+    if not text:
+        return None
+    negative = False
+    if text.startswith("(") and text.endswith(")"):
+        negative, text = True, text[1:-1]
+    if text.endswith("DR"):
+        negative, text = True, text[:-2]
+    elif text.endswith("CR"):
+        text = text[:-2]
+    text = text.replace("CAD", "").replace("$", "").replace(",", "").replace(" ", "")
+    try:
+        cents = int(Decimal(text).quantize(CENT, ROUND_HALF_EVEN) * 100)
+    except InvalidOperation:
+        raise _RowError(f"invalid amount {text!r}")
+    return -abs(cents) if negative else cents
+
+
+class _DateParser:
+    """Parses every date of a file with the same format.
+
+    Each date narrows the formats the file can be using. A date that the
+    remaining formats read differently (``03/04/2024``) raises
+    ``_AmbiguousDate`` until a later one (``13/04/2024``) settles the day
+    and month order. Statements repeat the same few dates many times, so
+    results are memoized.
+    """
+
+    FORMATS = (
+        "%Y-%m-%d", "%m/%d/%Y", "%d/%m/%Y", "%Y/%m/%d", "%m/%d/%y",
+        "%d-%b-%Y", "%d %b %Y", "%b %d, %Y", "%b %d %Y", "%Y%m%d",
+    )
+
+    def __init__(self):
+        self.formats = list(self.FORMATS)
+        self._parsed: dict[str, date] = {}
+
+    def __call__(self, text: str) -> date:
+        parsed = self._parsed.get(text)
+        if parsed is None:
+            # Only unambiguous dates get here, and they stay unambiguous
+            # as the formats narrow further
+            parsed = self._parsed[text] = self._parse(text.strip())
+        return parsed
+
+    def _parse(self, text: str) -> date:
+        matches = {}
+        for fmt in self.formats:
+            try:
+                matches[fmt] = datetime.strptime(text, fmt).date()
+            except ValueError:
+                continue
+        if not matches:
+            raise _RowError(f"invalid date {text!r}")
+        if len(matches) < len(self.formats):
+            self.formats = list(matches)
+        dates = set(matches.values())
+        if len(dates) > 1:
+            raise _AmbiguousDate(f"ambiguous date {text!r}: day/month order unknown")
+        return dates.pop()
+
+
+class _Parser(ABC):
+    def __init__(self):
+        self.rejected = 0
+        self.first_error: Optional[str] = None
+
+    def _reject(self, where: str, error: Exception) -> None:
+        self.rejected += 1
+        if self.first_error is None:
+            self.first_error = f"{where}: {error}"
+
+    @abstractmethod
+    def feed(self, text: str) -> list[StatementRow]:
+        """Rows completed by ``text``, the next piece of the decoded file."""
+
+    @abstractmethod
+    def close(self) -> list[StatementRow]:
+        """Rows still buffered once the file has ended."""
+
+
+class CSVStatementParser(_Parser):
+    """CSV exports with a header row, or the headerless date/description/debit/credit layout.
+
+    Lines before the header (account number, date range, ...) are skipped.
+    Rows with an ambiguous date are held until a later date settles the
+    file's day/month order, and rejected if none does.
+    """
+
+    HEADER_ALIASES = {
+        "date": ("date", "transaction date", "trans. date", "trans date", "posted date", "posting date", "post date"),
+        "description": ("description", "description 1", "payee", "merchant", "name", "details", "transaction details", "memo"),
+        "description2": ("description 2",),
+        "amount": ("amount", "cad$", "amount (cad)", "transaction amount"),
+        "debit": ("debit", "debits", "withdrawal", "withdrawals", "money out", "debit amount"),
+        "credit": ("credit", "credits", "deposit", "deposits", "money in", "credit amount"),
+    }
+    MAX_PREAMBLE = 20
+    MAX_UNDECIDED = 10_000  # Ambiguous-date rows held at once; more are rejected
+
+    def __init__(self):
+        super().__init__()
+        self.parse_date = _DateParser()
+        self.columns: Optional[dict[str, int]] = None
+        self.record = 0
+        self._buffer = ""
+        self._open_record: list[str] = []  # Lines of a record with a quoted newline
+        self._undecided: list[tuple[int, list[str]]] = []  # (record, fields) with an ambiguous date
+        self._undecided_formats = 0  # len(parse_date.formats) when they were last tried
+
+    def feed(self, text: str) -> list[StatementRow]:
+        *lines, self._buffer = (self._buffer + text).split("\n")
+        return self._parse_lines(lines)
+
+    def close(self) -> list[StatementRow]:
+        lines = [self._buffer] if self._buffer else []
+        self._buffer = ""
+        rows = self._parse_lines(lines)
+        if self._open_record:
+            self._reject(f"Row {self.record + 1}", _RowError("unterminated quoted field"))
+        rows.extend(self._retry_undecided(final=True))
+        return rows
+
+    def _parse_lines(self, lines: list[str]) -> list[StatementRow]:
+        # A record continues onto the next line while it has an odd number of quotes
+        records = []
+        for line in lines:
+            if self._open_record:
+                self._open_record.append(line)
+                if line.count('"') % 2:
+                    records.append("\n".join(self._open_record))
+                    self._open_record = []
+            elif line.count('"') % 2:
+                self._open_record = [line]
+            else:
+                records.append(line)
+
+        rows = []
+        for fields in csv.reader(records):
+            self.record += 1
+            if not any(field.strip() for field in fields):
+                continue
+            if self.columns is None:
+                self.columns, is_header = self._detect_columns(fields)
+                if self.columns is None or is_header:
+                    continue
+            try:
+                rows.append(self._row(fields))
+            except _AmbiguousDate as e:
+                if len(self._undecided) >= self.MAX_UNDECIDED:
+                    self._reject(f"Row {self.record}", e)
+                else:
+                    self._undecided.append((self.record, fields))
+                    self._undecided_formats = len(self.parse_date.formats)
+            except (_RowError, IndexError) as e:
+                self._reject(f"Row {self.record}", e)
+        if self._undecided and len(self.parse_date.formats) < self._undecided_formats:
+            rows.extend(self._retry_undecided())
+        return rows
+
+    def _retry_undecided(self, final: bool = False) -> list[StatementRow]:
+        """Parse held rows again now that fewer date formats remain; at the end, reject the rest."""
+        held, self._undecided = self._undecided, []
+        self._undecided_formats = len(self.parse_date.formats)
+        rows = []
+        for record, fields in held:
+            try:
+                rows.append(self._row(fields))
+            except _AmbiguousDate as e:
+                if final:
+                    self._reject(f"Row {record}", e)
+                else:
+                    self._undecided.append((record, fields))
+            except (_RowError, IndexError) as e:
+                self._reject(f"Row {record}", e)
+        return rows
+
+    def _detect_columns(self, fields: list[str]) -> tuple[Optional[dict[str, int]], bool]:
+        """(columns, whether ``fields`` is the header); no columns while still in the preamble."""
+        names = [field.strip().lower() for field in fields]
+        columns = {}
+        for role, aliases in self.HEADER_ALIASES.items():
+            for i, name in enumerate(names):
+                if name in aliases and i not in columns.values():
+                    columns[role] = i
+                    break
+        if "date" in columns and "description" in columns and (
+            "amount" in columns or "debit" in columns or "credit" in columns
+        ):
+            return columns, True
+
+        try:
+            self.parse_date(fields[0])
+        except _AmbiguousDate:
+            pass
+        except _RowError:
+            if self.record >= self.MAX_PREAMBLE:
+                raise StatementImportError("No header row with date, description and amount columns")
+            return None, False
+        # No header: date, description, then either amount or debit and credit
+        if len(fields) >= 4:
+            return {"date": 0, "description": 1, "debit": 2, "credit": 3}, False
+        if len(fields) == 3:
+            return {"date": 0, "description": 1, "amount": 2}, False
+        raise StatementImportError("Expected date, description and amount columns")
+
+    def _row(self, fields: list[str]) -> StatementRow:
+        columns = self.columns
+        posted_on = self.parse_date(fields[columns["date"]])
+        description = fields[columns["description"]].strip()
+        if "description2" in columns and fields[columns["description2"]].strip():
+            description = f"{description} {fields[columns['description2']].strip()}"
+        if not description:
+            raise _RowError("missing description")
+
+        if "amount" in columns:
+            amount = parse_cents(fields[columns["amount"]])
+        else:
+            # Debit and credit columns hold magnitudes, whatever their sign
+            debit = parse_cents(fields[columns["debit"]]) if "debit" in columns else None
+            credit = parse_cents(fields[columns["credit"]]) if "credit" in columns else None
+            amount = None if debit is None and credit is None else abs(credit or 0) - abs(debit or 0)
+        if amount is None:
+            raise _RowError("missing amount")
+        return StatementRow(posted_on, amount, description[:255])
+
+
+class OFXStatementParser(_Parser):
+    """``<STMTTRN>`` blocks of OFX 1.x (SGML) and 2.x (XML) files; QFX is OFX."""
+
+    FIELD = re.compile(r"<(DTPOSTED|TRNAMT|FITID|NAME|MEMO)>([^<\r\n]*)")
+
+    def __init__(self):
+        super().__init__()
+        self.record = 0
+        self._buffer = ""
+
+    def feed(self, text: str) -> list[StatementRow]:
+        buffer = self._buffer + text
+        rows = []
+        position = 0
+        while (end := buffer.find("</STMTTRN>", position)) != -1:
+            start = buffer.rfind("<STMTTRN>", position, end)
+            if start != -1:
+                self.record += 1
+                try:
+                    rows.append(self._row(buffer[start:end]))
+                except _RowError as e:
+                    self._reject(f"Transaction {self.record}", e)
+            position = end + len("</STMTTRN>")
+        # Keep only a block that is still open (or a tag split across chunks)
+        start = buffer.find("<STMTTRN>", position)
+        self._buffer = buffer[start:] if start != -1 else buffer[max(position, len(buffer) - 16):]
+        return rows
+
+    def close(self) -> list[StatementRow]:
+        if "<STMTTRN>" in self._buffer:
+            self._reject(f"Transaction {self.record + 1}", _RowError("unterminated <STMTTRN>"))
+        self._buffer = ""
+        return []
+
+    def _row(self, block: str) -> StatementRow:
+        fields = {}
+        for tag, value in self.FIELD.findall(block):
+            fields.setdefault(tag, html.unescape(value.strip()))
+        posted = fields.get("DTPOSTED", "")[:8]
+        try:
+            posted_on = datetime.strptime(posted, "%Y%m%d").date()
+        except ValueError:
+            raise _RowError(f"invalid DTPOSTED {posted!r}")
+        amount = parse_cents(fields.get("TRNAMT", ""))
+        if amount is None:
+            raise _RowError("missing TRNAMT")
+        name, memo = fields.get("NAME", ""), fields.get("MEMO", "")
+        description = f"{name} {memo}" if name and memo and memo != name else name or memo
+        if not description:
+            raise _RowError("missing NAME and MEMO")
+        return StatementRow(posted_on, amount, description[:255], fields.get("FITID") or None)
+
+
+def _sniff_format(text: str) -> StatementFormat:
+    head = text.lstrip()[:64].upper()
+    if head.startswith(("OFXHEADER", "<?XML", "<OFX")):
+        return StatementFormat.OFX
+    return StatementFormat.CSV
+
+
+class _Decoder:
+    """UTF-8 (with or without BOM); switches to Windows-1252 if the bytes are not UTF-8."""
+
+    def __init__(self):
+        self._decoder = codecs.getincrementaldecoder("utf-8-sig")()
+
+    def decode(self, data: bytes, final: bool = False) -> str:
+        try:
+            return self._decoder.decode(data, final)
+        except UnicodeDecodeError:
+            # The UTF-8 decoder may be holding the start of a multi-byte
+            # sequence from the previous chunk; those bytes belong to this text
+            buffered, _ = self._decoder.getstate()
+            self._decoder = codecs.getincrementaldecoder("cp1252")(errors="replace")
+            return self._decoder.decode(buffered + data, final)
+
+
+def content_hash(row: StatementRow, merchant: str, occurrence: int) -> str:
+    if row.fit_id:
+        key = f"fitid|{row.fit_id}"
+    else:
+        key = f"{row.posted_on.isoformat()}|{row.amount}|{merchant}|{occurrence}"
+    return hashlib.blake2b(key.encode(), digest_size=16).hexdigest()
+
+
+async def import_statement(
+    db: AsyncSession,
+    account: BankAccount,
+    upload: UploadStream,
+    batch_size: Optional[int] = None,
+) -> ExpenseStatement:
+    """Receive ``upload``, then parse it and insert its new transactions into ``account``."""
+    batch_size = batch_size or settings.STATEMENT_IMPORT_BATCH_SIZE
+    started = time.perf_counter()
+    statement = ExpenseStatement(
+        user_id=account.user_id, account_id=account.id, rows_parsed=0, rows_inserted=0
+    )
+    table = Transaction.__table__
+    insert_rows = insert_ignoring_conflicts(table, ["account_id", "content_hash"]).returning(
+        table.c.user_id, table.c.posted_on, table.c.category, table.c.amount
+    )
+    rollups = RollupChanges()
+    decoder = _Decoder()
+    parser: Optional[_Parser] = None
+    sniffed = ""
+    occurrences: dict[tuple, int] = {}
+    pending: list[dict] = []
+
+    def add(rows: list[StatementRow]) -> None:
+        ids = {"user_id": account.user_id, "account_id": account.id, "statement_id": statement.id}
+        for row in rows:
+            merchant = normalize_merchant(row.description)
+            key = (row.posted_on, row.amount, merchant)
+            occurrence = occurrences[key] = occurrences.get(key, -1) + 1
+            pending.append({
+                **ids,
+                "posted_on": row.posted_on,
+                "amount": Decimal(row.amount).scaleb(-2),
+                "description": row.description,
+                "merchant": merchant[:255],
+                "category": categorize(merchant, row.amount),
+                "fit_id": row.fit_id,
+                "content_hash": content_hash(row, merchant, occurrence),
+            })
+
+    async def flush() -> None:
+        if not pending:
+            return
+        result = await db.execute(insert_rows, pending)
+        statement.rows_parsed += len(pending)
+        for inserted in result.all():
+            statement.rows_inserted += 1
+            rollups.add(*inserted)
+        pending.clear()
+
+    def feed(text: str) -> None:
+        nonlocal parser, sniffed
+        if parser is None:
+            # Wait for enough of the file to tell CSV from OFX
+            sniffed += text
+            if len(sniffed.lstrip()) < 16:
+                return
+            statement.format = _sniff_format(sniffed)
+            parser = OFXStatementParser() if statement.format == StatementFormat.OFX else CSVStatementParser()
+            text, sniffed = sniffed, ""
+        add(parser.feed(text))
+
+    async with spooled(upload) as chunks:
+        if upload.filename:
+            statement.filename = upload.filename[:255]
+        try:
+            db.add(statement)
+            await db.flush()
+
+            async for chunk in chunks:
+                feed(decoder.decode(chunk))
+                if len(pending) >= batch_size:
+                    await flush()
+            feed(decoder.decode(b"", final=True))
+            if parser is None:
+                if not sniffed.strip():
+                    raise StatementImportError("The file is empty")
+                statement.format = _sniff_format(sniffed)
+                parser = OFXStatementParser() if statement.format == StatementFormat.OFX else CSVStatementParser()
+                add(parser.feed(sniffed))
+            add(parser.close())
+            await flush()
+            await rollups.apply(db)
+
+            statement.rows_duplicate = statement.rows_parsed - statement.rows_inserted
+            statement.rows_rejected = parser.rejected
+            statement.first_error = parser.first_error
+            statement.bytes_read = upload.bytes_read
+            statement.duration_ms = round((time.perf_counter() - started) * 1000)
+            statement.status = StatementStatus.COMPLETED
+            await db.commit()
+        except Exception:
+            await db.rollback()
+            raise
+
+    logger.info(
+        f"Imported statement {statement.id} into account {account.id}: "
+        f"{statement.rows_inserted} new, {statement.rows_duplicate} duplicate, "
+        f"{statement.rows_rejected} rejected in {statement.duration_ms} ms ({statement.rows_per_sec:.0f} rows/s)"
+    )
+    return statement
@@ -0,0 +1,122 @@
+"""Throughput of streaming chat history export and bulk import.
+
+Seeds one user with ``--messages`` messages (default one million) spread
+over ``--sessions`` sessions on a throwaway SQLite database, exports them
+to a file through ``export_user_history`` and imports that file for a
+second user through ``import_user_history``. Reports rows/sec, MB/sec and
+process peak RSS after each phase; flat RSS between seeding and export
+shows the export does not hold the history in memory.
+
+Usage (from ``backend/``)::
+
+    python -m bench.chat_transfer --messages 1000000 --sessions 2000
+"""
+import argparse
+import asyncio
+import os
+import resource
+import sys
+import tempfile
+import time
+from datetime import datetime, timedelta, timezone
+
+
+def peak_rss_mb() -> float:
+    usage = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # ru_maxrss is KiB on Linux, bytes on macOS
+    return round(usage / (1024 * 1024 if sys.platform == "darwin" else 1024), 1)
+
+
+async def seed(user_id: int, n_messages: int, n_sessions: int, batch: int = 10_000) -> None:
+    from sqlalchemy import insert
+
+    from app.core.database import async_session_maker
+    from app.models.chat import ChatMessage, ChatSession, MessageRole
+
+    start = datetime.now(timezone.utc) - timedelta(days=30)
+    per_session = max(1, n_messages // n_sessions)
+    async with async_session_maker() as db:
+        session_ids = (await db.scalars(
+            insert(ChatSession).returning(ChatSession.id, sort_by_parameter_order=True),
+            [{"user_id": user_id, "title": f"Session {i}"} for i in range(n_sessions)],
+        )).all()
+
+        rows = []
+        for i in range(n_messages):
+            rows.append({
+                "session_id": session_ids[min(i // per_session, n_sessions - 1)],
+                "role": MessageRole.USER if i % 2 == 0 else MessageRole.ASSISTANT,
+                "content": f"Message {i}: what is my TFSA contribution room for this year?",
+                "created_at": start + timedelta(seconds=i),
+            })
+            if len(rows) == batch:
+                await db.execute(insert(ChatMessage), rows)
+                rows = []
+        if rows:
+            await db.execute(insert(ChatMessage), rows)
+        await db.commit()
+
+
+async def read_file(path: str, chunk_size: int = 64 * 1024):
+    with open(path, "rb") as f:
+        while chunk := f.read(chunk_size):
+            yield chunk
+
+
+async def run(args) -> None:
+    from app.core.database import async_session_maker, engine, init_db
+    from app.models.user import User
+    from app.services.chat_transfer import export_user_history, import_user_history
+
+    await init_db()
+    async with async_session_maker() as db:
+        source, target = User(email="export@example.com", hashed_password="x"), User(email="import@example.com", hashed_password="x")
+        db.add_all([source, target])
+        await db.commit()
+        source_id, target_id = source.id, target.id
+
+    started = time.perf_counter()
+    await seed(source_id, args.messages, args.sessions)
+    print(f"seed:   {args.messages:,} messages in {time.perf_counter() - started:.1f}s, peak RSS {peak_rss_mb()} MB")
+
+    export_path = os.path.join(args.workdir, "export.ndjson")
+    started = time.perf_counter()
+    size = 0
+    with open(export_path, "wb") as f:
+        async for chunk in export_user_history(source_id):
+            size += len(chunk)
+            f.write(chunk)
+    elapsed = time.perf_counter() - started
+    rows = args.messages + args.sessions
+    print(
+        f"export: {rows / elapsed:,.0f} rows/s, {size / elapsed / 1e6:.1f} MB/s "
+        f"({size / 1e6:.1f} MB in {elapsed:.1f}s), peak RSS {peak_rss_mb()} MB"
+    )
+
+    started = time.perf_counter()
+    async with async_session_maker() as db:
+        result = await import_user_history(db, target_id, read_file(export_path))
+    elapsed = time.perf_counter() - started
+    print(
+        f"import: {(result['messages'] + result['sessions']) / elapsed:,.0f} rows/s "
+        f"({result['messages']:,} messages in {elapsed:.1f}s), peak RSS {peak_rss_mb()} MB"
+    )
+    await engine.dispose()
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Chat history export/import throughput")
+    parser.add_argument("--messages", type=int, default=1_000_000)
+    parser.add_argument("--sessions", type=int, default=2_000)
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as workdir:
+        args.workdir = workdir
+        # Must be set before app.core.config is imported
+        os.environ["DATABASE_URL"] = f"sqlite+aiosqlite:///{workdir}/transfer.db"
+        os.environ["DEBUG"] = "false"
+        asyncio.run(run(args))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,249 @@
+"""Standalone fake Ollama server for load tests.
+
+Implements the endpoints ``LLMService`` talks to, with realistic timing:
+
+- ``GET  /api/tags`` and ``GET /api/ps``
+- ``POST /api/chat`` (streaming NDJSON and non-streaming)
+- ``POST /api/generate`` (model preload only: no prompt support)
+- ``POST /api/embeddings`` and ``POST /api/embed``
+
+Every chat waits ``--prefill-delay`` seconds before the first token, then
+emits ``--tokens`` tokens at ``--tokens-per-sec``. A model that is not
+resident first pays ``--load-delay``; it then stays loaded for the
+request's ``keep_alive`` (default ``--keep-alive`` seconds). ``--failure-rate`` makes
+that fraction of chat requests fail with HTTP 500, and ``--drop-rate`` cuts
+that fraction of streams off halfway through.
+
+Usage (from ``backend/``)::
+
+    python -m bench.fake_ollama --port 11435 --prefill-delay 0.3 --tokens-per-sec 40
+"""
+import argparse
+import asyncio
+import hashlib
+import json
+import random
+import time
+from dataclasses import dataclass
+from datetime import datetime, timezone
+
+import uvicorn
+from starlette.applications import Starlette
+from starlette.requests import Request
+from starlette.responses import JSONResponse, StreamingResponse
+from starlette.routing import Route
+
+WORDS = (
+    "TFSA RRSP contribution room budget savings tax credit deduction income "
+    "retirement investment portfolio expense planning goal interest rate"
+).split()
+
+
+@dataclass
+class FakeOllamaConfig:
+    model: str = "llama3.2"
+    prefill_delay: float = 0.2
+    tokens_per_sec: float = 50.0
+    tokens: int = 64
+    failure_rate: float = 0.0
+    drop_rate: float = 0.0
+    embedding_dim: int = 768
+    load_delay: float = 0.0
+    keep_alive: float = 300.0
+    seed: int = 0
+
+
+def _now() -> str:
+    return datetime.now(timezone.utc).isoformat()
+
+
+def _embedding(text: str, dim: int) -> list[float]:
+    # Deterministic per input so repeated runs are comparable
+    rng = random.Random(hashlib.sha256(text.encode("utf-8")).digest())
+    return [rng.uniform(-1.0, 1.0) for _ in range(dim)]
+
+
+def parse_keep_alive(value, default: float) -> float:
+    """Seconds to stay loaded; negative means forever (Ollama semantics)."""
+    if value is None:
+        return default
+    if isinstance(value, (int, float)):
+        return float(value)
+    units = {"ms": 0.001, "s": 1, "m": 60, "h": 3600}
+    for suffix in ("ms", "s", "m", "h"):
+        if value.endswith(suffix):
+            return float(value[: -len(suffix)]) * units[suffix]
+    return float(value)
+
+
+def create_app(config: FakeOllamaConfig) -> Starlette:
+    rng = random.Random(config.seed)
+    token_interval = 1.0 / config.tokens_per_sec if config.tokens_per_sec > 0 else 0.0
+    # model -> monotonic expiry (inf when kept forever)
+    resident: dict[str, float] = {}
+
+    async def load(model: str, keep_alive) -> int:
+        """Load ``model`` if needed; returns load_duration in ns."""
+        now = time.monotonic()
+        expires = resident.get(model)
+        duration = 0
+        if expires is None or expires < now:
+            await asyncio.sleep(config.load_delay)
+            duration = int(config.load_delay * 1e9)
+        seconds = parse_keep_alive(keep_alive, config.keep_alive)
+        if seconds == 0:
+            resident.pop(model, None)
+        else:
+            resident[model] = float("inf") if seconds < 0 else time.monotonic() + seconds
+        return duration
+
+    def tokens() -> list[str]:
+        return [f"{rng.choice(WORDS)} " for _ in range(config.tokens)]
+
+    async def tags(request: Request):
+        return JSONResponse({
+            "models": [{
+                "name": f"{config.model}:latest",
+                "model": f"{config.model}:latest",
+                "modified_at": _now(),
+                "size": 2_019_393_189,
+            }]
+        })
+
+    async def chat(request: Request):
+        body = await request.json()
+        if rng.random() < config.failure_rate:
+            return JSONResponse({"error": "injected failure"}, status_code=500)
+
+        model = body.get("model", config.model)
+        started = time.perf_counter_ns()
+        load_duration = await load(model, body.get("keep_alive"))
+        await asyncio.sleep(config.prefill_delay)
+        prompt_tokens = sum(len(m.get("content", "").split()) for m in body.get("messages", []))
+        output = tokens()
+
+        def final(content: str) -> dict:
+            return {
+                "model": model,
+                "created_at": _now(),
+                "message": {"role": "assistant", "content": content},
+                "done": True,
+                "total_duration": time.perf_counter_ns() - started,
+                "load_duration": load_duration,
+                "prompt_eval_count": prompt_tokens,
+                "eval_count": len(output),
+            }
+
+        if not body.get("stream", True):
+            await asyncio.sleep(token_interval * len(output))
+            return JSONResponse(final("".join(output)))
+
+        drop_at = len(output) // 2 if rng.random() < config.drop_rate else None
+
+        async def stream():
+            for i, token in enumerate(output):
+                if i == drop_at:
+                    raise ConnectionResetError("injected stream drop")
+                yield json.dumps({
+                    "model": model,
+                    "created_at": _now(),
+                    "message": {"role": "assistant", "content": token},
+                    "done": False,
+                }) + "\n"
+                await asyncio.sleep(token_interval)
+            yield json.dumps(final("")) + "\n"
+
+        return StreamingResponse(stream(), media_type="application/x-ndjson")
+
+    async def generate(request: Request):
+        body = await request.json()
+        model = body.get("model", config.model)
+        load_duration = await load(model, body.get("keep_alive"))
+        return JSONResponse({
+            "model": model,
+            "created_at": _now(),
+            "response": "",
+            "done": True,
+            "load_duration": load_duration,
+        })
+
+    async def ps(request: Request):
+        now = time.monotonic()
+        models = []
+        for model, expires in list(resident.items()):
+            if expires < now:
+                del resident[model]
+                continue
+            remaining = None if expires == float("inf") else expires - now
+            models.append({
+                "name": model,
+                "model": model,
+                "size": 2_019_393_189,
+                "expires_at": (
+                    datetime.fromtimestamp(time.time() + remaining, timezone.utc).isoformat()
+                    if remaining is not None else "2318-01-01T00:00:00Z"
+                ),
+            })
+        return JSONResponse({"models": models})
+
+    async def embeddings(request: Request):
+        body = await request.json()
+        return JSONResponse({"embedding": _embedding(body.get("prompt", ""), config.embedding_dim)})
+
+    async def embed(request: Request):
+        body = await request.json()
+        inputs = body.get("input", "")
+        if isinstance(inputs, str):
+            inputs = [inputs]
+        return JSONResponse({
+            "model": body.get("model", config.model),
+            "embeddings": [_embedding(text, config.embedding_dim) for text in inputs],
+        })
+
+    return Starlette(routes=[
+        Route("/api/tags", tags, methods=["GET"]),
+        Route("/api/ps", ps, methods=["GET"]),
+        Route("/api/chat", chat, methods=["POST"]),
+        Route("/api/generate", generate, methods=["POST"]),
+        Route("/api/embeddings", embeddings, methods=["POST"]),
+        Route("/api/embed", embed, methods=["POST"]),
+    ])
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Fake Ollama server for load tests")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=11435)
+    parser.add_argument("--model", default=FakeOllamaConfig.model)
+    parser.add_argument("--prefill-delay", type=float, default=FakeOllamaConfig.prefill_delay,
+                        help="Seconds before the first token")
+    parser.add_argument("--tokens-per-sec", type=float, default=FakeOllamaConfig.tokens_per_sec)
+    parser.add_argument("--tokens", type=int, default=FakeOllamaConfig.tokens,
+                        help="Tokens per response")
+    parser.add_argument("--failure-rate", type=float, default=FakeOllamaConfig.failure_rate,
+                        help="Fraction of chat requests answered with HTTP 500")
+    parser.add_argument("--drop-rate", type=float, default=FakeOllamaConfig.drop_rate,
+                        help="Fraction of streams cut off halfway")
+    parser.add_argument("--load-delay", type=float, default=FakeOllamaConfig.load_delay,
+                        help="Seconds to load a model that is not resident")
+    parser.add_argument("--keep-alive", type=float, default=FakeOllamaConfig.keep_alive,
+                        help="Default seconds a model stays loaded")
+    parser.add_argument("--seed", type=int, default=FakeOllamaConfig.seed)
+    args = parser.parse_args()
+
+    config = FakeOllamaConfig(
+        model=args.model,
+        prefill_delay=args.prefill_delay,
+        tokens_per_sec=args.tokens_per_sec,
+        tokens=args.tokens,
+        failure_rate=args.failure_rate,
+        drop_rate=args.drop_rate,
+        load_delay=args.load_delay,
+        keep_alive=args.keep_alive,
+        seed=args.seed,
+    )
+    uvicorn.run(create_app(config), host=args.host, port=args.port, log_level="warning")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,117 @@
+"""Compare JSON backends on the chat hot paths.
+
+Measures CPU time (``time.process_time``) for:
+
+- rendering a ``get_session`` payload (``ChatSessionWithMessages``) after
+  FastAPI's pydantic serialization step, with stdlib ``json`` vs. the
+  configured backend
+- parsing an Ollama NDJSON chat stream
+
+Usage (from ``backend/``)::
+
+    python -m bench.json_backends --messages 10 1000 5000 --repeat 50
+"""
+import argparse
+import json
+import time
+from datetime import datetime, timezone
+
+from fastapi.responses import JSONResponse
+
+from app.core.serialization import JSON_BACKEND, FastJSONResponse, loads
+from app.models.chat import MessageRole
+from app.schemas.chat import ChatMessageResponse, ChatSessionWithMessages
+
+
+def make_session(n_messages: int) -> dict:
+    now = datetime.now(timezone.utc)
+    session = ChatSessionWithMessages(
+        id=1,
+        user_id=1,
+        title="Benchmark session",
+        created_at=now,
+        updated_at=now,
+        messages=[
+            ChatMessageResponse(
+                id=i,
+                session_id=1,
+                role=MessageRole.USER if i % 2 == 0 else MessageRole.ASSISTANT,
+                content=f"Message {i}: how much can I put in my TFSA this year? " * 4,
+                created_at=now,
+            )
+            for i in range(n_messages)
+        ],
+    )
+    # What FastAPI hands to the response class after field.serialize()
+    return session.model_dump(mode="json")
+
+
+def make_ollama_stream(n_tokens: int) -> list[str]:
+    return [
+        json.dumps({
+            "model": "llama3.2",
+            "created_at": "2024-01-01T00:00:00Z",
+            "message": {"role": "assistant", "content": f" token{i}"},
+            "done": False,
+        })
+        for i in range(n_tokens)
+    ]
+
+
+def cpu_time(fn, repeat: int) -> float:
+    start = time.process_time()
+    for _ in range(repeat):
+        fn()
+    return (time.process_time() - start) / repeat
+
+
+def bench_render(n_messages: int, repeat: int) -> dict:
+    content = make_session(n_messages)
+    stdlib = cpu_time(lambda: JSONResponse(content), repeat)
+    fast = cpu_time(lambda: FastJSONResponse(content), repeat)
+    return {
+        "case": f"render get_session ({n_messages} messages)",
+        "stdlib_us": stdlib * 1e6,
+        "backend_us": fast * 1e6,
+    }
+
+
+def bench_stream_parse(n_tokens: int, repeat: int) -> dict:
+    lines = make_ollama_stream(n_tokens)
+
+    def parse(decode):
+        for line in lines:
+            decode(line).get("message", {}).get("content", "")
+
+    stdlib = cpu_time(lambda: parse(json.loads), repeat)
+    fast = cpu_time(lambda: parse(loads), repeat)
+    return {
+        "case": f"parse Ollama stream ({n_tokens} lines)",
+        "stdlib_us": stdlib * 1e6,
+        "backend_us": fast * 1e6,
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--messages", type=int, nargs="+", default=[10, 1000, 5000])
+    parser.add_argument("--tokens", type=int, default=500)
+    parser.add_argument("--repeat", type=int, default=50)
+    args = parser.parse_args()
+
+    results = [bench_render(n, args.repeat) for n in args.messages]
+    results.append(bench_stream_parse(args.tokens, args.repeat))
+
+    print(f"JSON backend: {JSON_BACKEND}")
+    print(f"{'case':<42} {'stdlib us':>12} {'backend us':>12} {'saved us':>12} {'speedup':>8}")
+    for r in results:
+        saved = r["stdlib_us"] - r["backend_us"]
+        speedup = r["stdlib_us"] / r["backend_us"] if r["backend_us"] else float("inf")
+        print(
+            f"{r['case']:<42} {r['stdlib_us']:>12.1f} {r['backend_us']:>12.1f} "
+            f"{saved:>12.1f} {speedup:>7.1f}x"
+        )
+
+
+if __name__ == "__main__":
+    main()
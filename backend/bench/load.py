@@ -0,0 +1,289 @@
+"""Load driver for the chat API.
+
+Each virtual user registers, logs in and sends ``--messages`` chat messages
+through ``/chat/send/stream`` (or ``/chat/send`` with ``--mode send``),
+keeping ``--concurrency`` users active at once. Latency percentiles, time to
+first token (TTFT) and throughput are written as JSON for regression
+tracking. The backend answers 200 even when Ollama fails, with an apology
+as (the end of) the reply; such replies, and streams with no content, are
+counted as errors rather than as completed requests.
+
+With ``--spawn`` the driver starts a fake Ollama (``bench.fake_ollama``) and
+a backend on a throwaway SQLite database, so a run needs nothing else::
+
+    python -m bench.load --spawn --users 50 --concurrency 10 --output load.json
+
+Without ``--spawn`` it targets ``--base-url``, which must already be running.
+"""
+import argparse
+import asyncio
+import json
+import math
+import os
+import platform
+import subprocess
+import sys
+import tempfile
+import time
+import uuid
+from collections import defaultdict
+from contextlib import contextmanager
+from datetime import datetime, timezone
+from typing import Optional
+
+import httpx
+
+API = "/api/v1"
+# Start of the replies LLMService substitutes when Ollama fails
+ERROR_REPLY_PREFIX = "I apologize, but"
+
+
+def percentile(values: list[float], pct: float) -> Optional[float]:
+    if not values:
+        return None
+    ordered = sorted(values)
+    # Nearest-rank method
+    index = max(0, min(len(ordered) - 1, math.ceil(pct / 100 * len(ordered)) - 1))
+    return ordered[index]
+
+
+def summarize(samples: list[float]) -> dict:
+    return {
+        "count": len(samples),
+        "mean_ms": _ms(sum(samples) / len(samples) if samples else None),
+        "p50_ms": _ms(percentile(samples, 50)),
+        "p95_ms": _ms(percentile(samples, 95)),
+        "p99_ms": _ms(percentile(samples, 99)),
+        "max_ms": _ms(max(samples) if samples else None),
+    }
+
+
+def _ms(seconds: Optional[float]) -> Optional[float]:
+    return None if seconds is None else round(seconds * 1000, 3)
+
+
+class Recorder:
+    def __init__(self):
+        self.latencies: dict[str, list[float]] = defaultdict(list)
+        self.ttft: list[float] = []
+        self.errors: dict[str, int] = defaultdict(int)
+        self.chunks = 0
+
+    def error(self, phase: str, reason: str) -> None:
+        self.errors[f"{phase}: {reason}"] += 1
+
+
+async def run_user(
+    client: httpx.AsyncClient,
+    recorder: Recorder,
+    messages: int,
+    mode: str,
+) -> None:
+    email = f"load-{uuid.uuid4().hex[:12]}@example.com"
+    password = "load-test-password"
+
+    start = time.perf_counter()
+    r = await client.post(f"{API}/auth/register", json={"email": email, "password": password})
+    if r.status_code != 201:
+        recorder.error("register", str(r.status_code))
+        return
+    recorder.latencies["register"].append(time.perf_counter() - start)
+
+    start = time.perf_counter()
+    r = await client.post(f"{API}/auth/login", json={"email": email, "password": password})
+    if r.status_code != 200:
+        recorder.error("login", str(r.status_code))
+        return
+    recorder.latencies["login"].append(time.perf_counter() - start)
+    headers = {"Authorization": f"Bearer {r.json()['access_token']}"}
+
+    session_id = None
+    for i in range(messages):
+        payload = {"message": f"Question {i}: how should I split savings between TFSA and RRSP?", "session_id": session_id}
+        start = time.perf_counter()
+        try:
+            if mode == "send":
+                r = await client.post(f"{API}/chat/send", json=payload, headers=headers)
+                if r.status_code != 200:
+                    recorder.error("send", str(r.status_code))
+                    continue
+                session_id = r.json()["session_id"]
+                if r.json()["assistant_message"]["content"].startswith(ERROR_REPLY_PREFIX):
+                    recorder.error("send", "error reply")
+                    continue
+                recorder.latencies["send"].append(time.perf_counter() - start)
+                continue
+
+            first_chunk = None
+            failed = False
+            async with client.stream("POST", f"{API}/chat/send/stream", json=payload, headers=headers) as r:
+                if r.status_code != 200:
+                    recorder.error("stream", str(r.status_code))
+                    continue
+                session_id = int(r.headers["X-Session-ID"])
+                async for line in r.aiter_lines():
+                    if not line.startswith("data: ") or line == "data: [DONE]":
+                        continue
+                    if first_chunk is None:
+                        first_chunk = time.perf_counter()
+                    # A stream cut off partway ends with the apology as its last chunk
+                    failed = failed or line[len("data: "):].startswith(ERROR_REPLY_PREFIX)
+                    recorder.chunks += 1
+            if first_chunk is None:
+                recorder.error("stream", "empty reply")
+                continue
+            if failed:
+                recorder.error("stream", "error reply")
+                continue
+            recorder.latencies["stream"].append(time.perf_counter() - start)
+            recorder.ttft.append(first_chunk - start)
+        except httpx.HTTPError as e:
+            recorder.error(mode, type(e).__name__)
+
+
+async def run_load(args) -> dict:
+    recorder = Recorder()
+    semaphore = asyncio.Semaphore(args.concurrency)
+    limits = httpx.Limits(max_connections=args.concurrency * 2)
+
+    async with httpx.AsyncClient(base_url=args.base_url, timeout=args.timeout, limits=limits) as client:
+        async def limited():
+            async with semaphore:
+                await run_user(client, recorder, args.messages, args.mode)
+
+        started = time.perf_counter()
+        await asyncio.gather(*(limited() for _ in range(args.users)))
+        elapsed = time.perf_counter() - started
+
+    chat_phase = "send" if args.mode == "send" else "stream"
+    completed = len(recorder.latencies[chat_phase])
+    failed = sum(count for key, count in recorder.errors.items() if key.startswith(f"{chat_phase}:"))
+    return {
+        "timestamp": datetime.now(timezone.utc).isoformat(),
+        "host": platform.node(),
+        "python": platform.python_version(),
+        "config": {
+            "mode": args.mode,
+            "users": args.users,
+            "concurrency": args.concurrency,
+            "messages_per_user": args.messages,
+            "fake_ollama": fake_ollama_args(args) if args.spawn else None,
+        },
+        "elapsed_s": round(elapsed, 3),
+        "throughput": {
+            "chat_requests_per_s": round(completed / elapsed, 3) if elapsed else None,
+            "chunks_per_s": round(recorder.chunks / elapsed, 3) if elapsed else None,
+        },
+        "latency": {phase: summarize(samples) for phase, samples in recorder.latencies.items()},
+        "ttft": summarize(recorder.ttft) if chat_phase == "stream" else None,
+        "chat_errors": {
+            "count": failed,
+            "rate": round(failed / (completed + failed), 4) if completed + failed else None,
+        },
+        "errors": dict(recorder.errors),
+    }
+
+
+def fake_ollama_args(args) -> dict:
+    return {
+        "prefill_delay": args.prefill_delay,
+        "tokens_per_sec": args.tokens_per_sec,
+        "tokens": args.tokens,
+        "failure_rate": args.failure_rate,
+        "drop_rate": args.drop_rate,
+        "load_delay": args.load_delay,
+    }
+
+
+def _wait_for(url: str, timeout: float = 30.0) -> None:
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        try:
+            if httpx.get(url, timeout=1.0).status_code < 500:
+                return
+        except httpx.HTTPError:
+            pass
+        time.sleep(0.2)
+    raise RuntimeError(f"{url} did not come up within {timeout}s")
+
+
+@contextmanager
+def spawned_stack(args):
+    """Start a fake Ollama and a backend wired to it on a temp database."""
+    backend_dir = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+    ollama_port, api_port = args.ollama_port, args.api_port
+    processes = []
+    with tempfile.TemporaryDirectory() as tmp:
+        env = {
+            **os.environ,
+            "DATABASE_URL": f"sqlite+aiosqlite:///{tmp}/load.db",
+            "OLLAMA_BASE_URL": f"http://127.0.0.1:{ollama_port}",
+            "LLM_MOCK_MODE": "false",
+            "DEBUG": "false",
+        }
+        try:
+            processes.append(subprocess.Popen(
+                [sys.executable, "-m", "bench.fake_ollama", "--port", str(ollama_port),
+                 "--prefill-delay", str(args.prefill_delay),
+                 "--tokens-per-sec", str(args.tokens_per_sec),
+                 "--tokens", str(args.tokens),
+                 "--failure-rate", str(args.failure_rate),
+                 "--drop-rate", str(args.drop_rate),
+                 "--load-delay", str(args.load_delay)],
+                cwd=backend_dir, env=env,
+            ))
+            processes.append(subprocess.Popen(
+                [sys.executable, "-m", "uvicorn", "app.main:app", "--port", str(api_port),
+                 "--workers", str(args.workers), "--log-level", "warning"],
+                cwd=backend_dir, env=env,
+            ))
+            _wait_for(f"http://127.0.0.1:{ollama_port}/api/tags")
+            _wait_for(f"http://127.0.0.1:{api_port}/health")
+            yield f"http://127.0.0.1:{api_port}"
+        finally:
+            for process in processes:
+                process.terminate()
+            for process in processes:
+                process.wait(timeout=10)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Load test the chat API")
+    parser.add_argument("--base-url", default="http://127.0.0.1:8000")
+    parser.add_argument("--mode", choices=["stream", "send"], default="stream")
+    parser.add_argument("--users", type=int, default=20)
+    parser.add_argument("--concurrency", type=int, default=10)
+    parser.add_argument("--messages", type=int, default=3, help="Chat messages per user")
+    parser.add_argument("--timeout", type=float, default=120.0)
+    parser.add_argument("--output", help="Write the JSON report here as well as stdout")
+
+    spawn = parser.add_argument_group("spawned stack")
+    spawn.add_argument("--spawn", action="store_true", help="Start fake Ollama + backend")
+    spawn.add_argument("--api-port", type=int, default=8765)
+    spawn.add_argument("--ollama-port", type=int, default=11435)
+    spawn.add_argument("--workers", type=int, default=1)
+    spawn.add_argument("--prefill-delay", type=float, default=0.2)
+    spawn.add_argument("--tokens-per-sec", type=float, default=50.0)
+    spawn.add_argument("--tokens", type=int, default=64)
+    spawn.add_argument("--failure-rate", type=float, default=0.0)
+    spawn.add_argument("--drop-rate", type=float, default=0.0, help="Fraction of streams cut off halfway")
+    spawn.add_argument("--load-delay", type=float, default=0.0,
+                       help="Fake model load time when not resident")
+    args = parser.parse_args()
+
+    if args.spawn:
+        with spawned_stack(args) as base_url:
+            args.base_url = base_url
+            report = asyncio.run(run_load(args))
+    else:
+        report = asyncio.run(run_load(args))
+
+    output = json.dumps(report, indent=2)
+    print(output)
+    if args.output:
+        with open(args.output, "w") as f:
+            f.write(output + "\n")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,134 @@
+"""Quote cache vs. calling the market data provider directly.
+
+Writes a replay recording for ``--symbols`` symbols, then runs
+``--clients`` concurrent clients that each look up a portfolio-sized set
+of symbols (popularity is Zipf-like, as with real watchlists) for
+``--duration`` seconds, once straight against a ``ReplayProvider`` with
+``--latency`` per upstream request and once through ``QuoteCache``.
+Reports lookups/sec, p50/p99 lookup latency, upstream requests and the
+cache counters.
+
+Usage (from ``backend/``)::
+
+    python -m bench.market_data --symbols 2000 --clients 200 --duration 10
+    python -m bench.market_data --write-through   # include price_history_cache inserts
+"""
+import argparse
+import asyncio
+import itertools
+import json
+import os
+import random
+import tempfile
+import time
+from datetime import datetime, timedelta, timezone
+
+
+def write_replay(path: str, symbols: list[str], ticks: int, seed: int = 0) -> None:
+    """Random-walk quotes, ``ticks`` per symbol one minute apart."""
+    rng = random.Random(seed)
+    start = datetime(2024, 6, 3, 13, 30, tzinfo=timezone.utc)
+    with open(path, "w") as f:
+        for symbol in symbols:
+            open_price = price = rng.uniform(5, 500)
+            for tick in range(ticks):
+                price = max(0.01, price * (1 + rng.gauss(0, 0.002)))
+                f.write(json.dumps({
+                    "symbol": symbol,
+                    "price": f"{price:.4f}",
+                    "change": f"{price - open_price:.4f}",
+                    "change_percent": f"{(price / open_price - 1) * 100:.4f}",
+                    "volume": rng.randint(10_000, 5_000_000),
+                    "updated_at": (start + timedelta(minutes=tick)).isoformat(),
+                }) + "\n")
+
+
+def percentile(samples: list[float], pct: float) -> float:
+    ordered = sorted(samples)
+    return ordered[min(len(ordered) - 1, int(len(ordered) * pct / 100))]
+
+
+async def drive(lookup, symbols: list[str], args) -> dict:
+    cum_weights = list(itertools.accumulate(1 / (rank + 1) for rank in range(len(symbols))))
+    latencies: list[float] = []
+    deadline = time.perf_counter() + args.duration
+
+    async def client(seed: int) -> None:
+        rng = random.Random(seed)
+        while time.perf_counter() < deadline:
+            wanted = set(rng.choices(symbols, cum_weights=cum_weights, k=args.per_lookup))
+            started = time.perf_counter()
+            await lookup(list(wanted))
+            latencies.append(time.perf_counter() - started)
+            await asyncio.sleep(rng.uniform(0, 2 * args.think))
+
+    started = time.perf_counter()
+    await asyncio.gather(*(client(i) for i in range(args.clients)))
+    elapsed = time.perf_counter() - started
+    return {
+        "lookups": len(latencies),
+        "lookups_per_sec": round(len(latencies) / elapsed, 1),
+        "p50_ms": round(percentile(latencies, 50) * 1000, 2),
+        "p99_ms": round(percentile(latencies, 99) * 1000, 2),
+    }
+
+
+async def run(args) -> dict:
+    from app.core.database import engine, init_db
+    from app.services.market_data import QuoteCache, ReplayProvider
+
+    symbols = [f"SYM{i:05d}" for i in range(args.symbols)]
+    replay_path = os.path.join(args.workdir, "quotes.jsonl")
+    write_replay(replay_path, symbols, args.ticks)
+    if args.write_through:
+        await init_db()
+
+    direct = ReplayProvider(replay_path, latency=args.latency)
+    report = {"direct": await drive(direct.fetch_quotes, symbols, args)}
+    report["direct"]["upstream_requests"] = direct.requests
+
+    provider = ReplayProvider(replay_path, latency=args.latency)
+    cache = QuoteCache(
+        provider,
+        ttl=args.ttl,
+        ttl_overrides={},
+        stale=args.stale,
+        write_through=args.write_through,
+    )
+    report["cached"] = await drive(cache.get_quotes, symbols, args)
+    await cache.stop()
+    report["cached"].update(cache.snapshot())
+    await engine.dispose()
+    return report
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Quote cache vs. direct provider calls")
+    parser.add_argument("--symbols", type=int, default=2000)
+    parser.add_argument("--ticks", type=int, default=30, help="Recorded quotes per symbol")
+    parser.add_argument("--clients", type=int, default=200)
+    parser.add_argument("--per-lookup", type=int, default=15, help="Symbols per lookup")
+    parser.add_argument("--duration", type=float, default=10.0)
+    parser.add_argument("--think", type=float, default=0.05, help="Mean pause between a client's lookups (s)")
+    parser.add_argument("--latency", type=float, default=0.08, help="Simulated upstream round trip (s)")
+    parser.add_argument("--ttl", type=float, default=2.0)
+    parser.add_argument("--stale", type=float, default=30.0)
+    parser.add_argument("--write-through", action="store_true")
+    parser.add_argument("--output", help="Also write the JSON report here")
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as workdir:
+        args.workdir = workdir
+        # Must be set before app.core.config is imported
+        os.environ["DATABASE_URL"] = f"sqlite+aiosqlite:///{workdir}/market.db"
+        os.environ["DEBUG"] = "false"
+        report = asyncio.run(run(args))
+
+    print(json.dumps(report, indent=2))
+    if args.output:
+        with open(args.output, "w") as f:
+            json.dump(report, f, indent=2)
+
+
+if __name__ == "__main__":
+    main()
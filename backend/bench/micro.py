@@ -0,0 +1,157 @@
+"""Micro-benchmarks for hot-path functions, with regression checks.
+
+Each case is timed with ``timeit`` (auto-ranged loop count, best of
+``--repeat`` runs) and reported as nanoseconds per call.
+
+Usage (from ``backend/``)::
+
+    python -m bench.micro                     # run and print
+    python -m bench.micro --save-baseline     # run and overwrite the baseline
+    python -m bench.micro --check             # exit 1 if any case regressed
+    python -m bench.micro --check --tolerance 0.25 -k serialize
+
+Timings are machine specific: regenerate ``bench/baseline.json`` on the
+machine that runs ``--check`` (e.g. the CI runner) before relying on it.
+"""
+import argparse
+import json
+import os
+import platform
+import sys
+import timeit
+from datetime import datetime, timezone
+from typing import Callable
+
+from app.api.v1.chat import sse_event
+from app.core.security import (
+    create_access_token,
+    decode_token,
+    get_password_hash,
+    verify_password,
+)
+from app.models.chat import ChatMessage, ChatSession, MessageRole
+from app.schemas.chat import ChatSessionWithMessages
+from app.services.llm_service import build_conversation_history
+
+BASELINE_PATH = os.path.join(os.path.dirname(__file__), "baseline.json")
+
+
+def make_session(n_messages: int) -> ChatSession:
+    now = datetime.now(timezone.utc)
+    return ChatSession(
+        id=1,
+        user_id=1,
+        title="Benchmark session",
+        created_at=now,
+        updated_at=now,
+        messages=[
+            ChatMessage(
+                id=i,
+                session_id=1,
+                role=MessageRole.USER if i % 2 == 0 else MessageRole.ASSISTANT,
+                content=f"Message {i}: how much can I put in my TFSA this year? " * 4,
+                created_at=now,
+            )
+            for i in range(n_messages)
+        ],
+    )
+
+
+def build_cases() -> dict[str, Callable[[], object]]:
+    token = create_access_token({"sub": "1"})
+    password_hash = get_password_hash("correct horse battery staple")
+    history_session = make_session(100)
+    chunks = [f"token{i} " for i in range(500)]
+
+    cases = {
+        "security.create_access_token": lambda: create_access_token({"sub": "1"}),
+        "security.decode_token": lambda: decode_token(token),
+        "security.verify_password": lambda: verify_password("correct horse battery staple", password_hash),
+        "chat.build_conversation_history[100]": lambda: build_conversation_history(history_session),
+        "chat.sse_event[500 chunks]": lambda: [sse_event(chunk) for chunk in chunks],
+    }
+
+    for n in (10, 1_000, 10_000):
+        session = make_session(n)
+        cases[f"schemas.ChatSessionWithMessages.serialize[{n}]"] = (
+            lambda session=session: ChatSessionWithMessages.model_validate(session).model_dump_json()
+        )
+
+    return cases
+
+
+def run(cases: dict[str, Callable[[], object]], repeat: int) -> dict[str, float]:
+    results = {}
+    for name, fn in cases.items():
+        timer = timeit.Timer(fn)
+        number, _ = timer.autorange()
+        best = min(timer.repeat(repeat=repeat, number=number))
+        results[name] = best / number * 1e9
+        print(f"{name:<52} {results[name]:>16,.0f} ns", file=sys.stderr)
+    return results
+
+
+def load_baseline(path: str) -> dict:
+    with open(path) as f:
+        return json.load(f)
+
+
+def save_baseline(path: str, results: dict[str, float]) -> None:
+    baseline = {
+        "created_at": datetime.now(timezone.utc).isoformat(),
+        "machine": platform.machine(),
+        "python": platform.python_version(),
+        "results_ns": {name: round(ns, 1) for name, ns in results.items()},
+    }
+    with open(path, "w") as f:
+        json.dump(baseline, f, indent=2)
+        f.write("\n")
+
+
+def compare(results: dict[str, float], baseline: dict, tolerance: float) -> list[str]:
+    regressions = []
+    for name, ns in results.items():
+        base = baseline["results_ns"].get(name)
+        if base is None:
+            print(f"{name:<52} {'(no baseline)':>16}")
+            continue
+        change = ns / base - 1
+        flag = "REGRESSION" if change > tolerance else ""
+        print(f"{name:<52} {base:>14,.0f} -> {ns:>14,.0f} ns  {change:>+7.1%}  {flag}")
+        if flag:
+            regressions.append(name)
+    return regressions
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Hot-path micro-benchmarks")
+    parser.add_argument("-k", "--filter", help="Only run cases whose name contains this")
+    parser.add_argument("--repeat", type=int, default=5)
+    parser.add_argument("--baseline", default=BASELINE_PATH)
+    parser.add_argument("--save-baseline", action="store_true")
+    parser.add_argument("--check", action="store_true", help="Fail on regressions against the baseline")
+    parser.add_argument("--tolerance", type=float, default=0.20,
+                        help="Allowed slowdown before a case counts as regressed (0.20 = 20%%)")
+    args = parser.parse_args()
+
+    cases = build_cases()
+    if args.filter:
+        cases = {name: fn for name, fn in cases.items() if args.filter in name}
+
+    results = run(cases, args.repeat)
+
+    if args.save_baseline:
+        save_baseline(args.baseline, results)
+        print(f"Baseline written to {args.baseline}")
+        return
+
+    if args.check:
+        regressions = compare(results, load_baseline(args.baseline), args.tolerance)
+        if regressions:
+            print(f"{len(regressions)} case(s) regressed by more than {args.tolerance:.0%}")
+            sys.exit(1)
+        print("No regressions")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,210 @@
+"""Portfolios/sec of the vectorized valuation engine vs. a per-row Decimal loop.
+
+Generates ``--portfolios`` synthetic portfolios, each trading ``--symbols``
+of a ``--universe`` of random-walk stocks ``--trades`` times over
+``--days`` days (buys, partial sells and full closes, with fees). Times
+``value_portfolios`` and ``performance_curves`` over the whole book, then
+values the first ``--reference`` portfolios with a straightforward
+``Decimal`` loop and checks that both agree to the cent.
+
+Usage (from ``backend/``)::
+
+    python -m bench.portfolio --portfolios 10000
+"""
+import argparse
+import json
+import random
+import time
+from collections import defaultdict
+from decimal import ROUND_HALF_EVEN, Decimal
+
+import numpy as np
+
+from app.services.portfolio_analytics import (
+    MICRO,
+    PortfolioBook,
+    daily_closes,
+    performance_curves,
+    value_portfolios,
+)
+
+
+def generate_book(args) -> PortfolioBook:
+    rng = random.Random(0)
+    np_rng = np.random.default_rng(0)
+    walks = 100 * np.exp(np.cumsum(np_rng.normal(0, 0.015, (args.universe, args.days)), axis=1))
+    walks = np.round(walks, 2)
+    start = np.datetime64("2024-01-01T14:30:00", "s")
+
+    portfolio, symbol, quantity, price, value, fees, executed_at = ([] for _ in range(7))
+    for p in range(args.portfolios):
+        for s in rng.sample(range(args.universe), args.symbols):
+            held = 0
+            # Seconds since the first market open, in trading order
+            times = sorted(
+                rng.randrange(args.days) * 86400 + rng.randrange(23400)
+                for _ in range(args.trades // args.symbols)
+            )
+            for at in times:
+                px = float(walks[s, at // 86400])
+                if held and rng.random() < 0.4:
+                    # Sell part of the position, sometimes all of it
+                    q = held if rng.random() < 0.25 else max(1, held * rng.randint(1, 9) // 10)
+                    q = -q
+                else:
+                    q = rng.randint(1, 200) * MICRO // 4  # quarter shares
+                held += q
+                portfolio.append(p)
+                symbol.append(s)
+                quantity.append(q)
+                price.append(px)
+                value.append(int((Decimal(abs(q)) / MICRO * Decimal(str(px)) * 100).to_integral_value(ROUND_HALF_EVEN)))
+                fees.append(rng.choice((0, 495, 995)))
+                executed_at.append(start + np.timedelta64(at, "s"))
+
+    initial = np.full(args.portfolios, 100_000_00, dtype=np.int64)
+    return PortfolioBook(
+        portfolio_ids=np.arange(1, args.portfolios + 1, dtype=np.int64),
+        names=[f"Portfolio {p}" for p in range(args.portfolios)],
+        initial_cash=initial,
+        stored_cash=initial.copy(),
+        symbols=[f"SYM{s:04d}" for s in range(args.universe)],
+        portfolio=np.array(portfolio, dtype=np.int64),
+        symbol=np.array(symbol, dtype=np.int64),
+        quantity=np.array(quantity, dtype=np.int64),
+        price=np.array(price),
+        value=np.array(value, dtype=np.int64),
+        fees=np.array(fees, dtype=np.int64),
+        executed_at=np.array(executed_at, dtype="datetime64[s]"),
+    )
+
+
+def reference_valuation(book: PortfolioBook, prices: np.ndarray, n: int) -> list[tuple[int, ...]]:
+    """(cash, holdings value, cost basis, realized, unrealized) in cents, one Decimal step per trade.
+
+    Uses the engine's convention: each position's remaining cost basis is
+    rounded to the cent and realized P&L is net cash flow + that cost
+    basis, so realized + unrealized foots to the change in total value.
+    """
+    cent = Decimal("0.01")
+    rows = defaultdict(list)
+    for i in np.flatnonzero(book.portfolio < n):
+        rows[int(book.portfolio[i])].append(i)
+
+    results = []
+    for p in range(n):
+        trades = sorted(rows[p], key=lambda i: (book.symbol[i], book.executed_at[i]))
+        cash = Decimal(int(book.initial_cash[p])) / 100
+        positions = {}
+        for i in trades:
+            qty, cost, flows = positions.get(book.symbol[i], (Decimal(0), Decimal(0), Decimal(0)))
+            q = Decimal(int(book.quantity[i])) / MICRO
+            amount = Decimal(int(book.value[i])) / 100
+            fee = Decimal(int(book.fees[i])) / 100
+            if q > 0:
+                flows -= amount + fee
+                qty, cost = qty + q, cost + amount + fee
+            else:
+                flows += amount - fee
+                qty, cost = qty + q, cost * (qty + q) / qty
+            positions[book.symbol[i]] = (qty, cost, flows)
+
+        holdings = cost_basis = realized = unrealized = Decimal(0)
+        for s, (qty, cost, flows) in positions.items():
+            cash += flows
+            cost = cost.quantize(cent, ROUND_HALF_EVEN) if qty else Decimal(0)
+            market_value = (qty * Decimal(str(prices[s]))).quantize(cent, ROUND_HALF_EVEN)
+            holdings += market_value
+            cost_basis += cost
+            realized += flows + cost
+            unrealized += market_value - cost
+        results.append(tuple(int(x * 100) for x in (cash, holdings, cost_basis, realized, unrealized)))
+    return results
+
+
+def best_of(repeat: int, fn):
+    best = float("inf")
+    for _ in range(repeat):
+        started = time.perf_counter()
+        result = fn()
+        best = min(best, time.perf_counter() - started)
+    return best, result
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Portfolio valuation engine throughput")
+    parser.add_argument("--portfolios", type=int, default=10_000)
+    parser.add_argument("--universe", type=int, default=500)
+    parser.add_argument("--symbols", type=int, default=10, help="Symbols per portfolio")
+    parser.add_argument("--trades", type=int, default=60, help="Trades per portfolio")
+    parser.add_argument("--days", type=int, default=365)
+    parser.add_argument("--reference", type=int, default=500, help="Portfolios checked with the Decimal loop")
+    parser.add_argument("--repeat", type=int, default=3)
+    parser.add_argument("--output", help="Also write the JSON report here")
+    args = parser.parse_args()
+
+    started = time.perf_counter()
+    book = generate_book(args)
+    print(f"generated {len(book):,} portfolios, {len(book.quantity):,} trades in {time.perf_counter() - started:.1f}s")
+
+    days = np.arange(np.datetime64("2024-01-01"), np.datetime64("2024-01-01") + args.days)
+    closes = daily_closes(book, days)
+    prices = closes[:, -1]
+
+    valuation_s, valuation = best_of(args.repeat, lambda: value_portfolios(book, prices))
+    curves_s, curves = best_of(args.repeat, lambda: performance_curves(book, days, closes))
+
+    # Reconciliation: realized + unrealized must equal total value - initial cash exactly
+    identity_breaks = int(np.count_nonzero(
+        valuation.total_realized + valuation.total_unrealized != valuation.total_pnl
+    ))
+    curve_breaks = int(np.count_nonzero(curves.values[:, -1] != valuation.total_value))
+
+    n = min(args.reference, len(book))
+    started = time.perf_counter()
+    reference = reference_valuation(book, prices, n)
+    reference_s = time.perf_counter() - started
+    engine = list(zip(
+        valuation.cash[:n].tolist(),
+        valuation.holdings_value[:n].tolist(),
+        valuation.total_cost_basis[:n].tolist(),
+        valuation.total_realized[:n].tolist(),
+        valuation.total_unrealized[:n].tolist(),
+    ))
+    mismatches = [
+        (i, engine[i], reference[i]) for i in range(n) if engine[i] != reference[i]
+    ]
+
+    report = {
+        "portfolios": len(book),
+        "trades": len(book.quantity),
+        "valuation": {
+            "seconds": round(valuation_s, 4),
+            "portfolios_per_sec": round(len(book) / valuation_s),
+            "trades_per_sec": round(len(book.quantity) / valuation_s),
+        },
+        "performance_curves": {
+            "days": args.days,
+            "seconds": round(curves_s, 4),
+            "portfolios_per_sec": round(len(book) / curves_s),
+        },
+        "decimal_reference": {
+            "portfolios": n,
+            "seconds": round(reference_s, 4),
+            "portfolios_per_sec": round(n / reference_s),
+            "speedup": round((n / reference_s and (len(book) / valuation_s) / (n / reference_s)), 1),
+            "mismatched_portfolios": len(mismatches),
+        },
+        "pnl_identity_breaks": identity_breaks,
+        "curve_end_vs_valuation_breaks": curve_breaks,
+    }
+    print(json.dumps(report, indent=2))
+    for i, got, expected in mismatches[:5]:
+        print(f"portfolio {i}: engine {got} vs Decimal {expected} (cash, holdings, cost basis, realized, unrealized)")
+    if args.output:
+        with open(args.output, "w") as f:
+            json.dump(report, f, indent=2)
+
+
+if __name__ == "__main__":
+    main()
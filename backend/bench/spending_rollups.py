@@ -0,0 +1,169 @@
+"""Spending summary from the maintained rollups vs. aggregating transactions.
+
+Loads ``--users`` users with ``--years`` of generated transactions each
+(see ``bench.statements``) straight into ``transactions``, times a full
+``rebuild`` of ``spending_rollups``, then builds the chat prompt's
+spending summary for ``--lookups`` random users two ways: with
+``spending_summary`` (one indexed lookup on the rollups) and with a
+``GROUP BY`` over the user's transactions. Reports p50/p99 latency of
+both and checks that they produce the same text.
+
+Usage (from ``backend/``)::
+
+    python -m bench.spending_rollups --users 50 --years 3
+"""
+import argparse
+import asyncio
+import json
+import os
+import random
+import tempfile
+import time
+from collections import defaultdict
+from datetime import date
+
+
+def percentile(samples: list[float], pct: float) -> float:
+    ordered = sorted(samples)
+    return ordered[min(len(ordered) - 1, int(len(ordered) * pct / 100))]
+
+
+async def load_transactions(args) -> int:
+    from decimal import Decimal
+
+    from sqlalchemy import insert
+
+    from app.core.database import async_session_maker
+    from app.models.finance import BankAccount, Transaction
+    from app.models.user import User
+    from app.services.statement_import import categorize, normalize_merchant
+
+    from bench.statements import generate_rows
+
+    total = 0
+    async with async_session_maker() as db:
+        for u in range(args.users):
+            user = User(email=f"user{u}@example.com", hashed_password="-")
+            db.add(user)
+            await db.flush()
+            account = BankAccount(user_id=user.id, name="Chequing")
+            db.add(account)
+            await db.flush()
+            rows = [
+                {
+                    "user_id": user.id,
+                    "account_id": account.id,
+                    "posted_on": day,
+                    "amount": Decimal(cents).scaleb(-2),
+                    "description": description,
+                    "merchant": normalize_merchant(description),
+                    "category": categorize(normalize_merchant(description), cents),
+                    "content_hash": f"{u}:{i}",
+                }
+                for i, (day, description, cents) in enumerate(generate_rows(args.years, args.per_day, seed=u))
+            ]
+            await db.execute(insert(Transaction.__table__), rows)
+            total += len(rows)
+        await db.commit()
+    return total
+
+
+async def summary_from_transactions(db, user_id: int, months: int):
+    """What the prompt summary would cost without rollups."""
+    from sqlalchemy import Integer, case, cast, func, select
+
+    from app.models.finance import Transaction
+    from app.services.spending_rollups import format_spending_summary
+
+    cents = cast(func.round(Transaction.amount * 100), Integer)
+    month = func.strftime("%Y-%m-01", Transaction.posted_on)
+    result = await db.execute(
+        select(
+            month,
+            Transaction.category,
+            func.sum(case((cents < 0, -cents), else_=0)),
+            func.sum(case((cents > 0, cents), else_=0)),
+        )
+        .where(Transaction.user_id == user_id)
+        .group_by(month, Transaction.category)
+        .order_by(month.desc())
+    )
+    by_month = defaultdict(dict)
+    for month_start, category, spent, received in result.all():
+        if month_start in by_month or len(by_month) < months:
+            by_month[month_start][category] = (spent, received)
+    if not by_month:
+        return None
+    return format_spending_summary({date.fromisoformat(key): value for key, value in by_month.items()})
+
+
+async def run(args) -> dict:
+    from app.core.database import async_session_maker, engine, init_db
+    from app.services.spending_rollups import rebuild, spending_summary, verify
+
+    await init_db()
+    started = time.perf_counter()
+    transactions = await load_transactions(args)
+    report = {
+        "users": args.users,
+        "transactions": transactions,
+        "load_seconds": round(time.perf_counter() - started, 1),
+    }
+
+    async with async_session_maker() as db:
+        started = time.perf_counter()
+        rollups = await rebuild(db)
+        elapsed = time.perf_counter() - started
+        report["rebuild"] = {
+            "rollups": rollups,
+            "seconds": round(elapsed, 3),
+            "transactions_per_sec": round(transactions / elapsed),
+            "drifted": (await verify(db))["drifted"],
+        }
+
+        rng = random.Random(0)
+        users = [rng.randint(1, args.users) for _ in range(args.lookups)]
+        mismatches = 0
+        for name, summarize in (("rollups", spending_summary), ("group_by", summary_from_transactions)):
+            latencies = []
+            for user_id in users:
+                started = time.perf_counter()
+                text = await summarize(db, user_id, args.months)
+                latencies.append(time.perf_counter() - started)
+                if name == "group_by" and text != await spending_summary(db, user_id, args.months):
+                    mismatches += 1
+            report[name] = {
+                "p50_ms": round(percentile(latencies, 50) * 1000, 3),
+                "p99_ms": round(percentile(latencies, 99) * 1000, 3),
+            }
+        report["speedup_p50"] = round(report["group_by"]["p50_ms"] / report["rollups"]["p50_ms"], 1)
+        report["summary_mismatches"] = mismatches
+        report["example"] = await spending_summary(db, users[0], args.months)
+    await engine.dispose()
+    return report
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Spending rollups vs. GROUP BY over transactions")
+    parser.add_argument("--users", type=int, default=50)
+    parser.add_argument("--years", type=int, default=3)
+    parser.add_argument("--per-day", type=int, default=8, help="Mean card transactions per day")
+    parser.add_argument("--months", type=int, default=3, help="Months in the summary")
+    parser.add_argument("--lookups", type=int, default=200)
+    parser.add_argument("--output", help="Also write the JSON report here")
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as workdir:
+        # Must be set before app.core.config is imported
+        os.environ["DATABASE_URL"] = f"sqlite+aiosqlite:///{workdir}/rollups.db"
+        os.environ["DEBUG"] = "false"
+        report = asyncio.run(run(args))
+
+    print(json.dumps(report, indent=2))
+    if args.output:
+        with open(args.output, "w") as f:
+            json.dump(report, f, indent=2)
+
+
+if __name__ == "__main__":
+    main()
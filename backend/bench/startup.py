@@ -0,0 +1,131 @@
+"""Worker boot-time report.
+
+Runs ``python -X importtime -c "import app.main"`` in a fresh interpreter and
+breaks the import time down by top-level package, then times ``init_db`` on
+a fresh and on an up-to-date database in each ``DB_SCHEMA_INIT`` mode.
+
+Usage (from ``backend/``)::
+
+    python -m bench.startup --top 15 --output startup.json
+"""
+import argparse
+import asyncio
+import json
+import os
+import re
+import subprocess
+import sys
+import tempfile
+import time
+from collections import defaultdict
+
+IMPORTTIME_LINE = re.compile(r"^import time:\s+(\d+)\s+\|\s+(\d+)\s+\|(\s*)(\S+)$")
+BACKEND_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+
+def import_breakdown(module: str, runs: int) -> dict:
+    totals = []
+    per_package: dict[str, list[int]] = defaultdict(list)
+    heavy_modules: dict[str, list[int]] = defaultdict(list)
+
+    for _ in range(runs):
+        proc = subprocess.run(
+            [sys.executable, "-X", "importtime", "-c", f"import {module}"],
+            cwd=BACKEND_DIR,
+            env={**os.environ, "DEBUG": "false"},
+            capture_output=True,
+            text=True,
+            check=True,
+        )
+        packages: dict[str, int] = defaultdict(int)
+        total = 0
+        for line in proc.stderr.splitlines():
+            match = IMPORTTIME_LINE.match(line)
+            if not match:
+                continue
+            self_us, cumulative_us, indent, name = match.groups()
+            packages[name.split(".")[0]] += int(self_us)
+            total += int(self_us)
+            if len(indent) <= 3:
+                heavy_modules[name].append(int(cumulative_us))
+        totals.append(total)
+        for package, us in packages.items():
+            per_package[package].append(us)
+
+    def ms(samples: list[int]) -> float:
+        # Median across runs; first run also pays for cold .pyc / disk cache
+        return round(sorted(samples)[len(samples) // 2] / 1000, 2)
+
+    return {
+        "module": module,
+        "runs": runs,
+        "total_ms": ms(totals),
+        "by_package_ms": dict(sorted(
+            ((package, ms(samples)) for package, samples in per_package.items()),
+            key=lambda item: item[1],
+            reverse=True,
+        )),
+        "top_level_cumulative_ms": dict(sorted(
+            ((name, ms(samples)) for name, samples in heavy_modules.items()),
+            key=lambda item: item[1],
+            reverse=True,
+        )),
+    }
+
+
+async def schema_init_timings() -> dict:
+    from app.core import database
+    from app.core.config import settings
+    from sqlalchemy.ext.asyncio import create_async_engine
+
+    timings = {}
+    original_engine, original_mode = database.engine, settings.DB_SCHEMA_INIT
+    try:
+        for mode in ("always", "auto"):
+            with tempfile.TemporaryDirectory() as tmp:
+                database.engine = create_async_engine(f"sqlite+aiosqlite:///{tmp}/startup.db")
+                settings.DB_SCHEMA_INIT = mode
+                for phase in ("fresh", "warm"):
+                    started = time.perf_counter()
+                    outcome = await database.init_db()
+                    timings[f"{mode}/{phase}"] = {
+                        "outcome": outcome,
+                        "ms": round((time.perf_counter() - started) * 1000, 2),
+                    }
+                await database.engine.dispose()
+    finally:
+        database.engine, settings.DB_SCHEMA_INIT = original_engine, original_mode
+    return timings
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Worker boot-time report")
+    parser.add_argument("--module", default="app.main")
+    parser.add_argument("--runs", type=int, default=5)
+    parser.add_argument("--top", type=int, default=15)
+    parser.add_argument("--output", help="Write the full JSON report here")
+    args = parser.parse_args()
+
+    os.environ.setdefault("DEBUG", "false")
+    report = import_breakdown(args.module, args.runs)
+    report["schema_init"] = asyncio.run(schema_init_timings())
+
+    print(f"import {report['module']}: {report['total_ms']} ms (median of {args.runs})")
+    print("\nSelf time by package:")
+    for package, ms in list(report["by_package_ms"].items())[: args.top]:
+        print(f"  {package:<30} {ms:>9.2f} ms")
+    print("\nCumulative time of top-level imports:")
+    for name, ms in list(report["top_level_cumulative_ms"].items())[: args.top]:
+        print(f"  {name:<30} {ms:>9.2f} ms")
+    print("\ninit_db:")
+    for case, timing in report["schema_init"].items():
+        print(f"  {case:<30} {timing['ms']:>9.2f} ms  ({timing['outcome']})")
+
+    if args.output:
+        with open(args.output, "w") as f:
+            json.dump(report, f, indent=2)
+            f.write("\n")
+
+
+if __name__ == "__main__":
+    main()
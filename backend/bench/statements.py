@@ -0,0 +1,209 @@
+"""Rows/sec of the streaming statement import.
+
+Generates a ``--years``-long chequing statement with ``--per-day``
+transactions a day (Canadian merchants, paydays, bills, e-transfers) as
+CSV and as OFX, wraps each in a multipart body and feeds it to
+``import_statement`` in 64 KiB chunks, as the upload endpoint does. Then
+re-imports the CSV (every row is a duplicate) and, for scale, inserts the
+first ``--baseline`` rows one at a time with a SELECT-then-INSERT dedup
+check, the obvious way to write it.
+
+Usage (from ``backend/``)::
+
+    python -m bench.statements --years 5 --per-day 40
+"""
+import argparse
+import asyncio
+import json
+import os
+import random
+import tempfile
+import time
+from datetime import date, timedelta
+
+CHUNK_SIZE = 64 * 1024
+BOUNDARY = "----statementbench"
+
+MERCHANTS = [
+    ("POS TIM HORTONS #{n} TORONTO ON", 2, 12),
+    ("STARBUCKS STORE {n}", 4, 15),
+    ("UBER* EATS PENDING", 15, 60),
+    ("LOBLAWS {n}", 20, 250),
+    ("NO FRILLS #{n}", 15, 180),
+    ("COSTCO WHOLESALE W{n}", 60, 400),
+    ("PETRO-CANADA {n}", 30, 110),
+    ("PRESTO AUTOLOAD", 20, 150),
+    ("AMZN Mktp CA*{n}", 10, 200),
+    ("SHOPPERS DRUG MART #{n}", 5, 90),
+    ("CINEPLEX {n}", 12, 60),
+    ("LCBO/RAO #{n}", 15, 80),
+    ("CANADIAN TIRE #{n}", 10, 300),
+    ("INTERAC E-TRANSFER {n}", 20, 500),
+]
+BILLS = [
+    (1, "RENT PAYMENT", 2150),
+    (3, "ROGERS WIRELESS", 95),
+    (8, "TORONTO HYDRO", 80),
+    (12, "NETFLIX.COM", 21),
+    (12, "SPOTIFY P{n}", 12),
+    (20, "WEALTHSIMPLE TFSA", 500),
+    (28, "MONTHLY FEE", 17),
+]
+
+
+def generate_rows(years: int, per_day: int, seed: int = 0) -> list[tuple[date, str, int]]:
+    rng = random.Random(seed)
+    start = date(2025, 1, 1) - timedelta(days=365 * years)
+    rows = []
+    for offset in range(365 * years):
+        day = start + timedelta(days=offset)
+        if day.day in (15, 28):
+            rows.append((day, "PAYROLL ACME CORP", 312_550))
+        for bill_day, description, dollars in BILLS:
+            if day.day == bill_day:
+                rows.append((day, description.format(n=rng.randint(1000, 99999)), -dollars * 100))
+        for _ in range(max(0, round(rng.gauss(per_day, per_day / 4)))):
+            template, low, high = rng.choice(MERCHANTS)
+            rows.append((day, template.format(n=rng.randint(10, 9999)), -rng.randint(low * 100, high * 100)))
+    return rows
+
+
+def to_csv(rows) -> bytes:
+    lines = ["Date,Description,Amount"]
+    for day, description, cents in rows:
+        lines.append(f'{day.isoformat()},"{description}",{cents / 100:.2f}')
+    return ("\n".join(lines) + "\n").encode()
+
+
+def to_ofx(rows) -> bytes:
+    parts = ["OFXHEADER:100\nDATA:OFXSGML\nVERSION:102\n\n<OFX><BANKMSGSRSV1><STMTTRNRS><STMTRS><BANKTRANLIST>\n"]
+    for i, (day, description, cents) in enumerate(rows):
+        parts.append(
+            f"<STMTTRN>\n<TRNTYPE>{'CREDIT' if cents > 0 else 'DEBIT'}\n<DTPOSTED>{day:%Y%m%d}120000\n"
+            f"<TRNAMT>{cents / 100:.2f}\n<FITID>{day:%Y%m%d}{i:08d}\n<NAME>{description[:32]}\n</STMTTRN>\n"
+        )
+    parts.append("</BANKTRANLIST></STMTRS></STMTTRNRS></BANKMSGSRSV1></OFX>\n")
+    return "".join(parts).encode()
+
+
+def multipart_upload(filename: str, data: bytes):
+    from app.core.uploads import UploadStream
+
+    body = (
+        f'--{BOUNDARY}\r\nContent-Disposition: form-data; name="file"; filename="{filename}"\r\n'
+        f"Content-Type: application/octet-stream\r\n\r\n"
+    ).encode() + data + f"\r\n--{BOUNDARY}--\r\n".encode()
+
+    async def chunks():
+        for i in range(0, len(body), CHUNK_SIZE):
+            yield body[i:i + CHUNK_SIZE]
+
+    return UploadStream(f"multipart/form-data; boundary={BOUNDARY}", chunks())
+
+
+async def timed_import(account, filename: str, data: bytes, batch_size: int) -> dict:
+    from app.core.database import async_session_maker
+    from app.services.statement_import import import_statement
+
+    async with async_session_maker() as db:
+        started = time.perf_counter()
+        statement = await import_statement(db, account, multipart_upload(filename, data), batch_size)
+        elapsed = time.perf_counter() - started
+    rows = statement.rows_parsed + statement.rows_rejected
+    return {
+        "rows": rows,
+        "inserted": statement.rows_inserted,
+        "duplicate": statement.rows_duplicate,
+        "rejected": statement.rows_rejected,
+        "megabytes": round(len(data) / 1e6, 1),
+        "seconds": round(elapsed, 3),
+        "rows_per_sec": round(rows / elapsed),
+    }
+
+
+async def row_by_row(account, rows) -> dict:
+    """One SELECT and one INSERT per row, committed at the end."""
+    from decimal import Decimal
+
+    from sqlalchemy import select
+
+    from app.core.database import async_session_maker
+    from app.models.finance import Transaction
+    from app.services.statement_import import StatementRow, categorize, content_hash, normalize_merchant
+
+    occurrences = {}
+    async with async_session_maker() as db:
+        started = time.perf_counter()
+        for day, description, cents in rows:
+            merchant = normalize_merchant(description)
+            key = (day, cents, merchant)
+            occurrences[key] = occurrences.get(key, -1) + 1
+            digest = content_hash(StatementRow(day, cents, description), merchant, occurrences[key])
+            exists = await db.scalar(select(Transaction.id).where(
+                Transaction.account_id == account.id, Transaction.content_hash == digest
+            ))
+            if exists is None:
+                db.add(Transaction(
+                    user_id=account.user_id, account_id=account.id, posted_on=day,
+                    amount=Decimal(cents).scaleb(-2), description=description, merchant=merchant,
+                    category=categorize(merchant, cents), content_hash=digest,
+                ))
+                await db.flush()
+        await db.commit()
+        elapsed = time.perf_counter() - started
+    return {"rows": len(rows), "seconds": round(elapsed, 3), "rows_per_sec": round(len(rows) / elapsed)}
+
+
+async def run(args) -> dict:
+    from app.core.database import async_session_maker, engine, init_db
+    from app.models.finance import BankAccount
+    from app.models.user import User
+
+    await init_db()
+    async with async_session_maker() as db:
+        user = User(email="bench@example.com", hashed_password="-")
+        db.add(user)
+        await db.flush()
+        accounts = [BankAccount(user_id=user.id, name=name) for name in ("CSV", "OFX", "Baseline")]
+        db.add_all(accounts)
+        await db.commit()
+    csv_account, ofx_account, baseline_account = accounts
+
+    rows = generate_rows(args.years, args.per_day)
+    csv_data, ofx_data = to_csv(rows), to_ofx(rows)
+    report = {"years": args.years, "rows": len(rows), "batch_size": args.batch_size}
+    report["csv"] = await timed_import(csv_account, "statement.csv", csv_data, args.batch_size)
+    report["csv_reimport"] = await timed_import(csv_account, "statement.csv", csv_data, args.batch_size)
+    report["ofx"] = await timed_import(ofx_account, "statement.ofx", ofx_data, args.batch_size)
+    if args.baseline:
+        report["row_by_row"] = await row_by_row(baseline_account, rows[:args.baseline])
+        report["row_by_row"]["csv_speedup"] = round(
+            report["csv"]["rows_per_sec"] / report["row_by_row"]["rows_per_sec"], 1
+        )
+    await engine.dispose()
+    return report
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Streaming statement import throughput")
+    parser.add_argument("--years", type=int, default=5)
+    parser.add_argument("--per-day", type=int, default=40, help="Mean card transactions per day")
+    parser.add_argument("--batch-size", type=int, default=2000)
+    parser.add_argument("--baseline", type=int, default=5000, help="Rows for the row-by-row comparison (0 to skip)")
+    parser.add_argument("--output", help="Also write the JSON report here")
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as workdir:
+        # Must be set before app.core.config is imported
+        os.environ["DATABASE_URL"] = f"sqlite+aiosqlite:///{workdir}/statements.db"
+        os.environ["DEBUG"] = "false"
+        report = asyncio.run(run(args))
+
+    print(json.dumps(report, indent=2))
+    if args.output:
+        with open(args.output, "w") as f:
+            json.dump(report, f, indent=2)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,51 @@
+import os
+import tempfile
+
+# Must be set before app.core.config is imported
+_workdir = tempfile.TemporaryDirectory()
+os.environ["DATABASE_URL"] = f"sqlite+aiosqlite:///{_workdir.name}/test.db"
+os.environ["DEBUG"] = "false"
+os.environ["LLM_MOCK_MODE"] = "true"
+os.environ["CHAT_ARCHIVE_INTERVAL_SECONDS"] = "0"
+
+import httpx
+import pytest
+
+from app.core.database import Base, async_session_maker, engine
+import app.models  # noqa: F401  (registers every table on Base.metadata)
+from app.core.security import create_access_token
+from app.models.user import User
+
+
+@pytest.fixture
+async def db():
+    """A session on an empty database; the schema is recreated for every test."""
+    async with engine.begin() as conn:
+        await conn.run_sync(Base.metadata.drop_all)
+        await conn.run_sync(Base.metadata.create_all)
+    async with async_session_maker() as session:
+        yield session
+    # Pooled connections belong to this test's event loop
+    await engine.dispose()
+
+
+@pytest.fixture
+async def user(db):
+    user = User(email="user@example.com", hashed_password="-")
+    db.add(user)
+    await db.commit()
+    return user
+
+
+@pytest.fixture
+async def client(user):
+    """HTTP client for the app, authenticated as ``user``."""
+    from app.main import app
+
+    token = create_access_token({"sub": str(user.id)})
+    async with httpx.AsyncClient(
+        transport=httpx.ASGITransport(app=app),
+        base_url="http://test",
+        headers={"Authorization": f"Bearer {token}"},
+    ) as client:
+        yield client
@@ -0,0 +1,9 @@
+from bench.micro import compare
+
+
+def test_compare_flags_only_slowdowns_beyond_the_tolerance(capsys):
+    baseline = {"results_ns": {"steady": 1000.0, "slower": 1000.0, "faster": 1000.0}}
+    results = {"steady": 1090.0, "slower": 1200.0, "faster": 500.0, "new": 10.0}
+
+    assert compare(results, baseline, tolerance=0.10) == ["slower"]
+    assert "(no baseline)" in capsys.readouterr().out
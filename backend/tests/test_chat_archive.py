@@ -0,0 +1,95 @@
+import asyncio
+
+from sqlalchemy import func, select
+
+from app.core.database import async_session_maker
+from app.models.chat import ChatMessage, ChatSession, ChatSessionArchive, MessageRole
+from app.services.chat_archive import ChatArchiver, archive_session, rehydrate_session
+
+
+async def make_session(db, user, n_messages: int = 4) -> ChatSession:
+    session = ChatSession(user_id=user.id, title="Budget")
+    db.add(session)
+    await db.flush()
+    for i in range(n_messages):
+        role = MessageRole.USER if i % 2 == 0 else MessageRole.ASSISTANT
+        db.add(ChatMessage(session_id=session.id, role=role, content=f"message {i} " * 20))
+    await db.commit()
+    return session
+
+
+async def messages(db, session_id: int) -> list[tuple]:
+    result = await db.execute(
+        select(ChatMessage.id, ChatMessage.role, ChatMessage.content, ChatMessage.created_at)
+        .where(ChatMessage.session_id == session_id)
+        .order_by(ChatMessage.id)
+    )
+    return result.all()
+
+
+async def test_archive_and_rehydrate_round_trip(db, user):
+    session = await make_session(db, user)
+    other = await make_session(db, user, 2)
+    before = await messages(db, session.id)
+
+    archive = await archive_session(db, session.id)
+    assert archive.message_count == 4
+    assert archive.compressed_bytes < archive.raw_bytes
+    assert await messages(db, session.id) == []
+    assert len(await messages(db, other.id)) == 2
+
+    assert await rehydrate_session(db, session.id)
+    assert await messages(db, session.id) == before
+    archive = await db.get(ChatSessionArchive, session.id, populate_existing=True)
+    assert archive.payload is None
+    assert archive.rehydrated_at is not None
+
+    # Not archived any more: nothing to do
+    assert not await rehydrate_session(db, session.id)
+
+
+async def test_archive_keeps_messages_saved_while_archiving(db, user, monkeypatch):
+    session = await make_session(db, user)
+    get = db.get
+
+    async def get_after_a_reply(*args, **kwargs):
+        # Runs between the archiver's SELECT and its DELETE
+        async with async_session_maker() as other:
+            other.add(ChatMessage(session_id=session.id, role=MessageRole.USER, content="late"))
+            await other.commit()
+        return await get(*args, **kwargs)
+
+    monkeypatch.setattr(db, "get", get_after_a_reply)
+    archive = await archive_session(db, session.id)
+    monkeypatch.undo()
+
+    assert archive.message_count == 4
+    assert [row.content for row in await messages(db, session.id)] == ["late"]
+    assert await rehydrate_session(db, session.id)
+    assert len(await messages(db, session.id)) == 5
+
+
+async def test_concurrent_rehydrates_restore_once(db, user):
+    session = await make_session(db, user)
+    await archive_session(db, session.id)
+
+    async def rehydrate():
+        async with async_session_maker() as other:
+            return await rehydrate_session(other, session.id)
+
+    assert sorted(await asyncio.gather(rehydrate(), rehydrate())) == [False, True]
+    count = await db.scalar(select(func.count()).where(ChatMessage.session_id == session.id))
+    assert count == 4
+
+
+async def test_storage_stats_are_cached(db, user, monkeypatch):
+    await make_session(db, user)
+    archiver = ChatArchiver()
+    first = await archiver.cached_stats()
+    assert first["hot_messages"] == 4
+
+    await make_session(db, user)
+    assert (await archiver.cached_stats())["hot_messages"] == 4
+
+    monkeypatch.setattr("app.core.config.settings.CHAT_STORAGE_STATS_TTL_SECONDS", 0)
+    assert (await archiver.cached_stats())["hot_messages"] == 8
@@ -0,0 +1,100 @@
+import asyncio
+import json
+
+import pytest
+from sqlalchemy import func, select
+
+from app.core.database import async_session_maker
+from app.models.chat import ChatMessage, ChatSession, MessageRole
+from app.models.user import User
+from app.services.chat_archive import archive_session
+from app.services.chat_transfer import HistoryImportError, export_user_history, import_user_history
+
+
+async def chunks_of(data: bytes, size: int = 10):
+    for i in range(0, len(data), size):
+        yield data[i:i + size]
+
+
+async def export(user_id: int) -> bytes:
+    return b"".join([chunk async for chunk in export_user_history(user_id)])
+
+
+def without_ids(lines: list[dict]) -> list[dict]:
+    return [{k: v for k, v in line.items() if k not in ("id", "session_id")} for line in lines]
+
+
+async def test_export_then_import_round_trip(db, user):
+    for title, count in (("Hot", 3), ("Archived", 2), ("Empty", 0)):
+        session = ChatSession(user_id=user.id, title=title)
+        db.add(session)
+        await db.flush()
+        for i in range(count):
+            db.add(ChatMessage(session_id=session.id, role=MessageRole.USER, content=f"{title} {i}"))
+        await db.commit()
+        if title == "Archived":
+            await archive_session(db, session.id)
+
+    data = await export(user.id)
+    lines = [json.loads(line) for line in data.splitlines()]
+    assert [line["title"] for line in lines if line["type"] == "session"] == ["Hot", "Archived", "Empty"]
+    assert [line["content"] for line in lines if line["type"] == "message"] == [
+        "Hot 0", "Hot 1", "Hot 2", "Archived 0", "Archived 1",
+    ]
+
+    other = User(email="other@example.com", hashed_password="-")
+    db.add(other)
+    await db.commit()
+    result = await import_user_history(db, other.id, chunks_of(data), batch_size=2)
+    assert result == {"sessions": 3, "messages": 5}
+
+    # Re-exported under new session ids, otherwise identical
+    reexported = [json.loads(line) for line in (await export(other.id)).splitlines()]
+    assert without_ids(reexported) == without_ids(lines)
+
+
+@pytest.mark.parametrize("body, error", [
+    (b'{"type": "session", "id": 1}\n{"type": "message", "session_id": 2, "role": "user", "content": "x"}\n',
+     "Line 2: unknown session id 2"),
+    (b'{"type": "session", "id": 1}\n{"type": "session", "id": 1}\n', "Line 2: duplicate session id 1"),
+    (b'{"type": "session", "id": 1}\n\nnot json\n', "Line 3:"),
+])
+async def test_import_is_all_or_nothing(db, user, body, error):
+    with pytest.raises(HistoryImportError, match=error):
+        await import_user_history(db, user.id, chunks_of(body))
+    assert await db.scalar(select(func.count(ChatSession.id))) == 0
+
+
+async def test_import_endpoint_reports_bad_lines(client):
+    response = await client.post("/api/v1/chat/import", content=b'{"type": "bogus"}\n')
+    assert response.status_code == 400
+    assert response.json()["detail"].startswith("Line 1:")
+
+
+async def test_import_rejects_titles_longer_than_the_column(client):
+    body = json.dumps({"type": "session", "id": 1, "title": "x" * 256}).encode()
+    response = await client.post("/api/v1/chat/import", content=body)
+    assert response.status_code == 400
+    assert "255 characters" in response.json()["detail"]
+
+
+async def test_import_writes_nothing_until_the_body_is_complete(db, user):
+    data = b"".join(
+        json.dumps({"type": "session", "id": i, "title": f"Chat {i}"}).encode() + b"\n" for i in range(5)
+    )
+    received = asyncio.Event()
+    finish = asyncio.Event()
+
+    async def slow_client():
+        async for chunk in chunks_of(data, size=120):
+            yield chunk
+            received.set()
+            await finish.wait()
+
+    task = asyncio.create_task(import_user_history(db, user.id, slow_client(), batch_size=1))
+    await received.wait()
+    async with async_session_maker() as other:
+        other.add(ChatSession(user_id=user.id, title="Meanwhile"))
+        await asyncio.wait_for(other.commit(), 1)
+    finish.set()
+    assert await asyncio.wait_for(task, 1) == {"sessions": 5, "messages": 0}
@@ -0,0 +1,142 @@
+import asyncio
+import json
+
+import pytest
+from fastapi import WebSocketDisconnect
+
+from app.api.v1 import chat_ws
+from app.api.v1.chat_ws import ChatConnection
+
+
+class FakeWebSocket:
+    def __init__(self, *frames):
+        self.incoming: asyncio.Queue = asyncio.Queue()
+        for frame in frames:
+            self.push(frame)
+        self.sent: list[dict] = []
+
+    def push(self, frame) -> None:
+        if isinstance(frame, bytes):
+            self.incoming.put_nowait({"type": "websocket.receive", "bytes": frame})
+        else:
+            text = frame if isinstance(frame, str) else json.dumps(frame)
+            self.incoming.put_nowait({"type": "websocket.receive", "text": text})
+
+    def disconnect(self) -> None:
+        self.incoming.put_nowait({"type": "websocket.disconnect", "code": 1000})
+
+    async def receive(self) -> dict:
+        return await self.incoming.get()
+
+    async def send_text(self, text: str) -> None:
+        self.sent.append(json.loads(text))
+
+
+async def run_connection(connection: ChatConnection, until) -> list[dict]:
+    """Run reader and writer until ``until(sent_frames)`` holds."""
+    writer = asyncio.create_task(connection.writer())
+    reader = asyncio.create_task(connection.reader())
+    try:
+        async with asyncio.timeout(5):
+            while not until(connection.websocket.sent):
+                await asyncio.sleep(0.01)
+    finally:
+        reader.cancel()
+        await connection.close()
+        writer.cancel()
+        await asyncio.gather(reader, writer, return_exceptions=True)
+    return connection.websocket.sent
+
+
+def final_frames(sent: list[dict], request_id: str) -> list[dict]:
+    return [f for f in sent if f.get("request_id") == request_id and f["type"] in ("done", "cancelled", "error")]
+
+
+async def test_malformed_frames_get_an_error_and_the_socket_stays_open(user):
+    ws = FakeWebSocket("not json", b"\xff", "[1, 2]", {"message": "no type"}, {"type": "ping"})
+    sent = await run_connection(ChatConnection(ws, user.id), lambda sent: len(sent) == 5)
+    assert [f["type"] for f in sent] == ["error", "error", "error", "error", "pong"]
+    assert all(f["detail"] == "Malformed frame" for f in sent[:4])
+
+
+async def test_reader_stops_on_disconnect(user):
+    ws = FakeWebSocket()
+    ws.disconnect()
+    with pytest.raises(WebSocketDisconnect):
+        await ChatConnection(ws, user.id).reader()
+
+
+async def test_send_streams_and_finishes_with_done(user):
+    ws = FakeWebSocket({"type": "send", "request_id": "r1", "message": "What is a TFSA?"})
+    sent = await run_connection(ChatConnection(ws, user.id), lambda sent: final_frames(sent, "r1"))
+    types = [f["type"] for f in sent if f.get("request_id") == "r1"]
+    assert types[0] == "start"
+    assert types[-1] == "done"
+    assert "chunk" in types
+
+
+async def test_unexpected_failure_sends_error_frame(user, monkeypatch):
+    async def broken(*args, **kwargs):
+        raise RuntimeError("database went away")
+
+    monkeypatch.setattr(chat_ws, "spending_summary", broken)
+    ws = FakeWebSocket({"type": "send", "request_id": "r1", "message": "hi"})
+    sent = await run_connection(ChatConnection(ws, user.id), lambda sent: final_frames(sent, "r1"))
+    assert final_frames(sent, "r1") == [{"type": "error", "request_id": "r1", "detail": "Generation failed"}]
+
+
+async def test_cancelled_frame_waits_for_room_in_a_full_outbox(user, monkeypatch):
+    monkeypatch.setattr("app.core.config.settings.WS_SEND_QUEUE_SIZE", 2)
+    connection = ChatConnection(FakeWebSocket(), user.id)
+    frame = chat_ws.WSClientFrame(type="send", request_id="r1", message="Tell me about RRSPs")
+    connection.start_generation(frame)
+    task = connection.generations["r1"]
+
+    # No writer yet: the generation fills the outbox and blocks
+    async with asyncio.timeout(5):
+        while not connection.outbox.full():
+            await asyncio.sleep(0.01)
+    task.cancel()
+    await asyncio.sleep(0.05)
+    assert not task.done()
+
+    writer = asyncio.create_task(connection.writer())
+    await asyncio.wait_for(asyncio.gather(task, return_exceptions=True), 5)
+    await connection.outbox.put(None)
+    await writer
+    assert final_frames(connection.websocket.sent, "r1")[0]["type"] == "cancelled"
+
+
+async def test_replies_never_block_a_cancel_behind_them(user, monkeypatch):
+    monkeypatch.setattr("app.core.config.settings.WS_SEND_QUEUE_SIZE", 2)
+    ws = FakeWebSocket()
+    connection = ChatConnection(ws, user.id)
+    connection.start_generation(
+        chat_ws.WSClientFrame(type="send", request_id="r1", message="Tell me about RRSPs")
+    )
+    task = connection.generations["r1"]
+
+    # No writer: the generation fills the outbox, then the client keeps talking
+    async with asyncio.timeout(5):
+        while not connection.outbox.full():
+            await asyncio.sleep(0.01)
+    ws.push({"type": "ping"})
+    ws.push("not json")
+    ws.push({"type": "send", "request_id": "r1", "message": "again"})
+    ws.push({"type": "cancel", "request_id": "r1"})
+    reader = asyncio.create_task(connection.reader())
+    async with asyncio.timeout(5):
+        while not ws.incoming.empty():
+            await asyncio.sleep(0.01)
+    await asyncio.sleep(0.05)
+    assert not reader.done()
+    assert task.cancelling()
+
+    writer = asyncio.create_task(connection.writer())
+    await asyncio.wait_for(asyncio.gather(task, return_exceptions=True), 5)
+    reader.cancel()
+    await connection.outbox.put(None)
+    await writer
+    await asyncio.gather(reader, return_exceptions=True)
+    assert final_frames(ws.sent, "r1")[-1]["type"] == "cancelled"
+    assert not any(f["type"] == "pong" for f in ws.sent)
@@ -0,0 +1,65 @@
+import json
+
+import httpx
+import pytest
+
+from bench.fake_ollama import FakeOllamaConfig, create_app, parse_keep_alive
+from bench.load import Recorder, run_user
+
+
+@pytest.fixture
+def ollama():
+    config = FakeOllamaConfig(prefill_delay=0, tokens_per_sec=0, tokens=8)
+    return httpx.AsyncClient(transport=httpx.ASGITransport(create_app(config)), base_url="http://ollama")
+
+
+@pytest.mark.parametrize("value, seconds", [
+    (None, 300.0), (60, 60.0), ("500ms", 0.5), ("30s", 30.0), ("5m", 300.0), ("1h", 3600.0), ("-1", -1.0),
+])
+def test_parse_keep_alive(value, seconds):
+    assert parse_keep_alive(value, 300.0) == seconds
+
+
+async def test_chat_streams_tokens_then_a_final_frame(ollama):
+    async with ollama:
+        response = await ollama.post("/api/chat", json={"model": "llama3.2", "messages": [{"content": "hi there"}]})
+    frames = [json.loads(line) for line in response.text.splitlines()]
+    assert [frame["done"] for frame in frames] == [False] * 8 + [True]
+    assert frames[-1]["eval_count"] == 8
+    assert frames[-1]["prompt_eval_count"] == 2
+
+
+async def test_models_stay_resident_for_their_keep_alive(ollama):
+    async with ollama:
+        await ollama.post("/api/generate", json={"model": "llama3.2", "keep_alive": "5m"})
+        await ollama.post("/api/generate", json={"model": "mistral", "keep_alive": -1})
+        loaded = {m["name"]: m["expires_at"] for m in (await ollama.get("/api/ps")).json()["models"]}
+        assert set(loaded) == {"llama3.2", "mistral"}
+        assert loaded["mistral"].startswith("2318")
+
+        await ollama.post("/api/generate", json={"model": "llama3.2", "keep_alive": 0})
+        loaded = [m["name"] for m in (await ollama.get("/api/ps")).json()["models"]]
+    assert loaded == ["mistral"]
+
+
+@pytest.mark.parametrize("failure, errors", [
+    ({}, {}),
+    ({"failure_rate": 1.0}, {"stream: error reply": 2}),
+    ({"drop_rate": 1.0}, {"stream: error reply": 2}),
+])
+async def test_load_driver_counts_failed_generations_as_errors(db, monkeypatch, failure, errors):
+    from app.main import app
+    from app.services.llm_service import llm_service
+
+    ollama = httpx.ASGITransport(create_app(FakeOllamaConfig(prefill_delay=0, tokens_per_sec=0, tokens=4, **failure)))
+    client_class = httpx.AsyncClient
+    # The backend's own requests (no explicit transport) go to the fake Ollama
+    monkeypatch.setattr(httpx, "AsyncClient", lambda **kwargs: client_class(**{"transport": ollama, **kwargs}))
+    monkeypatch.setattr(llm_service, "mock_mode", False)
+
+    recorder = Recorder()
+    async with client_class(transport=httpx.ASGITransport(app=app), base_url="http://test") as client:
+        await run_user(client, recorder, messages=2, mode="stream")
+
+    assert dict(recorder.errors) == errors
+    assert len(recorder.ttft) == 2 - sum(errors.values())
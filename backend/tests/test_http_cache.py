@@ -0,0 +1,71 @@
+import pytest
+from starlette.requests import Request
+
+from app.core.compression import choose_encoding
+from app.core.http_cache import make_etag, matched_etag
+from app.models.chat import ChatMessage, ChatSession, MessageRole
+
+
+def request_with(if_none_match: str) -> Request:
+    return Request({"type": "http", "headers": [(b"if-none-match", if_none_match.encode())]})
+
+
+@pytest.mark.parametrize("accept_encoding, encoding", [
+    ("gzip, deflate", "gzip"),
+    ("GZIP;q=0.5", "gzip"),
+    ("gzip;q=0", None),
+    ("gzip;q=bogus", None),
+    ("identity", None),
+    ("", None),
+])
+def test_choose_encoding(accept_encoding, encoding):
+    assert choose_encoding(accept_encoding) == encoding
+
+
+def test_matched_etag_is_weak_and_keeps_the_encoded_variant():
+    etag = make_etag("session", 1, "2024-01-01")
+    gzipped = f'{etag[:-1]}-gzip"'
+    assert matched_etag(request_with(etag), etag) == etag
+    assert matched_etag(request_with(f"W/{etag}"), etag) == etag
+    assert matched_etag(request_with(f'"other", {gzipped}'), etag) == gzipped
+    assert matched_etag(request_with("*"), etag) == etag
+    assert matched_etag(request_with('"other"'), etag) is None
+    assert matched_etag(Request({"type": "http", "headers": []}), etag) is None
+
+
+async def test_session_history_is_compressed_and_revalidated(db, user, client):
+    session = ChatSession(user_id=user.id, title="Budget")
+    db.add(session)
+    await db.flush()
+    db.add_all([
+        ChatMessage(session_id=session.id, role=MessageRole.USER, content="How do I budget? " * 50)
+        for _ in range(5)
+    ])
+    await db.commit()
+
+    url = f"/api/v1/chat/sessions/{session.id}"
+    response = await client.get(url, headers={"Accept-Encoding": "gzip"})
+    assert response.status_code == 200
+    assert response.headers["content-encoding"] == "gzip"
+    etag = response.headers["etag"]
+    assert etag.endswith('-gzip"')
+    assert len(response.json()["messages"]) == 5
+
+    cached = await client.get(url, headers={"Accept-Encoding": "gzip", "If-None-Match": etag})
+    assert cached.status_code == 304
+    assert cached.headers["etag"] == etag
+    assert cached.headers["vary"] == "Accept-Encoding"
+
+    db.add(ChatMessage(session_id=session.id, role=MessageRole.USER, content="One more"))
+    await db.commit()
+    changed = await client.get(url, headers={"Accept-Encoding": "gzip", "If-None-Match": etag})
+    assert changed.status_code == 200
+    assert changed.headers["etag"] != etag
+
+
+@pytest.mark.parametrize("accept_encoding", ["gzip", "identity"])
+async def test_uncompressed_responses_still_vary_on_accept_encoding(client, accept_encoding):
+    response = await client.get("/api/v1/chat/sessions", headers={"Accept-Encoding": accept_encoding})
+    assert response.status_code == 200
+    assert "content-encoding" not in response.headers
+    assert response.headers["vary"] == "Accept-Encoding"
@@ -0,0 +1,172 @@
+import asyncio
+from datetime import datetime, timedelta, timezone
+
+from sqlalchemy import update
+
+from app.core.database import async_session_maker
+from app.models.job import Job, JobPriority, JobStatus
+from app.services.job_queue import claim, complete, enqueue, fail, job_handler, requeue_stale, run_job
+
+
+async def test_enqueue_is_idempotent(db):
+    first = await enqueue(db, "llm.generate", {"prompt": "hi"}, idempotency_key="k1")
+    second = await enqueue(db, "llm.generate", {"prompt": "other"}, idempotency_key="k1")
+    assert second.id == first.id
+    assert second.payload == {"prompt": "hi"}
+
+
+async def test_claim_takes_highest_priority_due_job(db):
+    low = await enqueue(db, "a", priority=JobPriority.LOW)
+    high = await enqueue(db, "b", priority=JobPriority.HIGH)
+    await enqueue(db, "c", priority=JobPriority.HIGH, run_at=datetime.now(timezone.utc) + timedelta(hours=1))
+
+    job = await claim(db, "w1")
+    assert job.id == high.id
+    assert job.status == JobStatus.RUNNING
+    assert job.locked_by == "w1"
+    assert job.attempts == 1
+
+    assert (await claim(db, "w2")).id == low.id
+    assert await claim(db, "w3") is None
+
+
+async def test_fail_retries_with_backoff_then_gives_up(db):
+    await enqueue(db, "a", max_attempts=2)
+
+    job = await claim(db, "w1")
+    await fail(db, job, "boom")
+    assert job.status == JobStatus.QUEUED
+    assert job.run_at > datetime.now(timezone.utc)
+    assert await claim(db, "w1") is None
+
+    job.run_at = datetime.now(timezone.utc) - timedelta(seconds=1)
+    await db.commit()
+    job = await claim(db, "w1")
+    assert job.attempts == 2
+    await fail(db, job, "boom again")
+    assert job.status == JobStatus.FAILED
+    assert job.finished_at is not None
+
+
+async def test_permanent_failure_is_not_retried(db):
+    await enqueue(db, "a")
+    job = await claim(db, "w1")
+    await fail(db, job, "bad payload", retry=False)
+    assert job.status == JobStatus.FAILED
+    assert job.attempts == 1
+
+
+async def test_complete_stores_result(db):
+    await enqueue(db, "a")
+    job = await claim(db, "w1")
+    await complete(db, job, {"ok": True})
+    assert job.status == JobStatus.SUCCEEDED
+    assert job.result == {"ok": True}
+    assert job.locked_by is None
+
+
+async def test_requeue_stale_fails_jobs_out_of_attempts(db):
+    expired = datetime.now(timezone.utc) - timedelta(days=1)
+    retryable = Job(kind="a", status=JobStatus.RUNNING, attempts=1, max_attempts=3, locked_by="dead", locked_at=expired)
+    exhausted = Job(kind="b", status=JobStatus.RUNNING, attempts=3, max_attempts=3, locked_by="dead", locked_at=expired)
+    fresh = Job(kind="c", status=JobStatus.RUNNING, attempts=1, locked_by="alive", locked_at=datetime.now(timezone.utc))
+    db.add_all([retryable, exhausted, fresh])
+    await db.commit()
+
+    assert await requeue_stale(db) == 1
+    for job in (retryable, exhausted, fresh):
+        await db.refresh(job)
+    assert retryable.status == JobStatus.QUEUED
+    assert retryable.locked_by is None
+    assert exhausted.status == JobStatus.FAILED
+    assert exhausted.finished_at is not None
+    assert fresh.status == JobStatus.RUNNING
+
+
+async def test_heartbeat_keeps_a_waiting_job_locked(db, monkeypatch):
+    monkeypatch.setattr("app.core.config.settings.JOB_LOCK_TIMEOUT_SECONDS", 0.2)
+    release = asyncio.Event()
+
+    @job_handler("test.slow")
+    async def slow(job):
+        await release.wait()
+        return {"ok": True}
+
+    await enqueue(db, "test.slow")
+    job = await claim(db, "w1")
+    runner = asyncio.create_task(run_job(job.id))
+    await asyncio.sleep(0.5)
+    assert await requeue_stale(db) == 0
+    release.set()
+    await asyncio.wait_for(runner, 1)
+
+    await db.refresh(job)
+    assert job.status == JobStatus.SUCCEEDED
+
+
+async def test_job_is_abandoned_once_its_lock_is_lost(db, monkeypatch):
+    monkeypatch.setattr("app.core.config.settings.JOB_LOCK_TIMEOUT_SECONDS", 0.2)
+    cancelled = asyncio.Event()
+
+    @job_handler("test.stuck")
+    async def stuck(job):
+        try:
+            await asyncio.Event().wait()
+        finally:
+            cancelled.set()
+
+    await enqueue(db, "test.stuck")
+    job = await claim(db, "w1")
+    runner = asyncio.create_task(run_job(job.id))
+    await asyncio.sleep(0.01)
+    await db.execute(update(Job).where(Job.id == job.id).values(locked_by="w2"))
+    await db.commit()
+
+    await asyncio.wait_for(runner, 1)
+    assert cancelled.is_set()
+    await db.refresh(job)
+    assert job.status == JobStatus.RUNNING
+    assert job.locked_by == "w2"
+
+
+async def _expire_locks(db):
+    await db.execute(
+        update(Job)
+        .values(locked_at=datetime.now(timezone.utc) - timedelta(days=1))
+        .execution_options(synchronize_session=False)
+    )
+    await db.commit()
+
+
+async def test_stale_runner_cannot_overwrite_the_new_claim(db):
+    await enqueue(db, "a")
+    async with async_session_maker() as w1, async_session_maker() as w2:
+        first = await claim(w1, "w1")
+        await _expire_locks(db)
+        assert await requeue_stale(db) == 1
+        second = await claim(w2, "w2")
+
+        assert not await complete(w1, first, {"from": "w1"})
+        assert not await fail(w1, first, "w1 gave up", retry=False)
+        await w2.refresh(second)
+        assert second.status == JobStatus.RUNNING
+        assert second.locked_by == "w2"
+        assert second.result is None
+
+        assert await complete(w2, second, {"from": "w2"})
+        assert second.status == JobStatus.SUCCEEDED
+        assert second.result == {"from": "w2"}
+
+
+async def test_same_worker_reclaiming_its_job_is_a_new_claim(db):
+    await enqueue(db, "a")
+    async with async_session_maker() as stale, async_session_maker() as fresh:
+        first = await claim(stale, "w1")
+        await _expire_locks(db)
+        await requeue_stale(db)
+        second = await claim(fresh, "w1")
+        assert second.attempts == first.attempts + 1
+
+        assert not await fail(stale, first, "late failure")
+        await fresh.refresh(second)
+        assert second.status == JobStatus.RUNNING
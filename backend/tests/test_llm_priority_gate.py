@@ -0,0 +1,68 @@
+import asyncio
+from datetime import datetime, timedelta, timezone
+
+import pytest
+from sqlalchemy import func, select
+
+from app.models.job import InteractiveGeneration
+from app.services.llm_service import BATCH, INTERACTIVE, LLMPriorityGate
+
+
+@pytest.fixture
+def leases(monkeypatch):
+    monkeypatch.setattr("app.core.config.settings.LLM_INTERACTIVE_LEASES", True)
+
+
+async def test_batch_waits_for_interactive_generation_in_same_process():
+    gate = LLMPriorityGate()
+    started = asyncio.Event()
+
+    async def batch():
+        async with gate.slot(BATCH):
+            started.set()
+
+    async with gate.slot(INTERACTIVE):
+        task = asyncio.create_task(batch())
+        await asyncio.sleep(0.05)
+        assert not started.is_set()
+    await asyncio.wait_for(task, 1)
+
+
+async def test_chat_writes_nothing_without_leases(db):
+    gate = LLMPriorityGate()
+    async with gate.slot(INTERACTIVE):
+        assert await db.scalar(select(func.count()).select_from(InteractiveGeneration)) == 0
+
+
+async def test_batch_waits_for_interactive_generation_in_another_process(db, leases, monkeypatch):
+    monkeypatch.setattr("app.core.config.settings.JOB_LLM_WAIT_POLL_SECONDS", 0.01)
+    api, worker = LLMPriorityGate(), LLMPriorityGate()
+    started = asyncio.Event()
+
+    async def batch():
+        async with worker.slot(BATCH):
+            started.set()
+
+    async with api.slot(INTERACTIVE):
+        task = asyncio.create_task(batch())
+        await asyncio.sleep(0.1)
+        assert not started.is_set()
+    await asyncio.wait_for(task, 1)
+    assert started.is_set()
+
+
+async def test_interactive_lease_is_removed_afterwards(db, leases):
+    gate = LLMPriorityGate()
+    async with gate.slot(INTERACTIVE):
+        assert await gate._interactive_elsewhere()
+    assert not await gate._interactive_elsewhere()
+
+
+async def test_expired_lease_does_not_block_batch(db, leases):
+    now = datetime.now(timezone.utc)
+    db.add(InteractiveGeneration(holder="crashed:1", started_at=now - timedelta(hours=1), expires_at=now - timedelta(minutes=1)))
+    await db.commit()
+    gate = LLMPriorityGate()
+    async with asyncio.timeout(1):
+        async with gate.slot(BATCH):
+            pass
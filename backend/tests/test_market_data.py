@@ -0,0 +1,80 @@
+from datetime import datetime, timedelta, timezone
+from decimal import Decimal
+
+import pytest
+from sqlalchemy import event
+
+from app.core.database import engine
+from app.models.market import MarketDataCache
+from app.services.market_data import MarketDataProvider, QuoteCache
+
+
+def quote_row(symbol: str, price: str, updated_minutes_ago: int, fetched_minutes_ago: int) -> MarketDataCache:
+    now = datetime.now(timezone.utc)
+    return MarketDataCache(
+        symbol=symbol,
+        price=Decimal(price),
+        updated_at=now - timedelta(minutes=updated_minutes_ago),
+        fetched_at=now - timedelta(minutes=fetched_minutes_ago),
+        source="replay",
+    )
+
+
+def test_price_history_indexes():
+    table = MarketDataCache.__table__
+    indexed = [
+        tuple(column.name for column in index.columns) for index in table.indexes
+    ] + [
+        tuple(column.name for column in constraint.columns)
+        for constraint in table.constraints
+        if constraint.__class__.__name__ == "UniqueConstraint"
+    ]
+    assert indexed.count(("symbol", "updated_at")) == 1
+    assert ("fetched_at",) in indexed
+
+
+async def test_warm_from_db_keeps_the_most_recently_fetched(db):
+    db.add_all([
+        quote_row("AAPL", "190", updated_minutes_ago=30, fetched_minutes_ago=30),
+        quote_row("AAPL", "200", updated_minutes_ago=1, fetched_minutes_ago=1),
+        quote_row("SHOP", "100", updated_minutes_ago=2, fetched_minutes_ago=2),
+        quote_row("RY.TO", "130", updated_minutes_ago=50, fetched_minutes_ago=50),
+        # Outside the stale horizon
+        quote_row("TD.TO", "80", updated_minutes_ago=5000, fetched_minutes_ago=5000),
+    ])
+    await db.commit()
+
+    cache = QuoteCache(ttl=60, stale=3600, max_size=2)
+    assert await cache.warm_from_db() == 2
+    # Most recently fetched last, so it is evicted last
+    assert list(cache._entries) == ["SHOP", "AAPL"]
+    assert cache._entries["AAPL"].quote.price == Decimal("200")
+
+
+def test_provider_must_implement_fetch_quotes():
+    class Incomplete(MarketDataProvider):
+        name = "incomplete"
+
+    with pytest.raises(TypeError):
+        Incomplete()
+
+
+async def test_quotes_are_unavailable_until_a_provider_is_configured(client):
+    response = await client.get("/api/v1/market/quotes/AAPL")
+    assert response.status_code == 503
+    assert "MARKET_DATA_PROVIDER" in response.json()["detail"]
+
+
+async def test_warm_from_db_searches_by_fetch_time(db):
+    plans = []
+
+    def explain(conn, cursor, statement, params, context, executemany):
+        if statement.lstrip().startswith("SELECT") and "price_history_cache" in statement:
+            plans.append(" | ".join(row[3] for row in conn.exec_driver_sql(f"EXPLAIN QUERY PLAN {statement}", params)))
+
+    event.listen(engine.sync_engine, "before_cursor_execute", explain)
+    try:
+        await QuoteCache(provider=None).warm_from_db()
+    finally:
+        event.remove(engine.sync_engine, "before_cursor_execute", explain)
+    assert "USING INDEX ix_price_history_cache_fetched_at (fetched_at>?)" in plans[0]
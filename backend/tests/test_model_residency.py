@@ -0,0 +1,60 @@
+import json
+
+import httpx
+import pytest
+
+from app.core.config import settings
+from app.services.model_residency import ModelResidencyManager
+
+
+@pytest.fixture
+def clock(monkeypatch):
+    now = [1000.0]
+    monkeypatch.setattr("app.services.model_residency.time.monotonic", lambda: now[0])
+    return now
+
+
+@pytest.fixture
+def ollama(monkeypatch):
+    """Requests sent to a fake Ollama that has ``llama3.2`` loaded."""
+    sent = []
+
+    def handler(request: httpx.Request) -> httpx.Response:
+        sent.append((request.url.path, json.loads(request.content) if request.content else None))
+        if request.url.path == "/api/ps":
+            return httpx.Response(200, json={"models": [{"name": "llama3.2:latest"}]})
+        return httpx.Response(200, json={"done": True, "load_duration": 0})
+
+    client = httpx.AsyncClient
+    monkeypatch.setattr(httpx, "AsyncClient", lambda **kwargs: client(transport=httpx.MockTransport(handler), **kwargs))
+    return sent
+
+
+def test_keep_alive_is_short_after_quiet_and_long_during_traffic(clock):
+    manager = ModelResidencyManager()
+    assert manager.request_params("llama3.2")["keep_alive"] == settings.OLLAMA_KEEP_ALIVE_IDLE
+    clock[0] += 60
+    assert manager.request_params("llama3.2")["keep_alive"] == settings.OLLAMA_KEEP_ALIVE_ACTIVE
+    clock[0] += settings.OLLAMA_TRAFFIC_WINDOW_SECONDS
+    assert manager.request_params("llama3.2")["keep_alive"] == settings.OLLAMA_KEEP_ALIVE_IDLE
+    assert manager.models["llama3.2:latest"].requests == 3
+
+
+async def test_poll_shortens_keep_alive_once_traffic_stops(clock, ollama):
+    manager = ModelResidencyManager()
+    manager.request_params("llama3.2")
+    clock[0] += 60
+    manager.request_params("llama3.2")
+
+    await manager.poll()
+    assert [path for path, _ in ollama] == ["/api/ps"]
+
+    clock[0] += settings.OLLAMA_TRAFFIC_WINDOW_SECONDS
+    await manager.poll()
+    assert ollama[-1] == ("/api/generate", {"model": "llama3.2:latest", "keep_alive": settings.OLLAMA_KEEP_ALIVE_IDLE})
+    assert manager.snapshot()["llama3.2:latest"]["keep_alive"] == settings.OLLAMA_KEEP_ALIVE_IDLE
+
+    # Sent once, not on every poll
+    ollama.clear()
+    await manager.poll()
+    assert [path for path, _ in ollama] == ["/api/ps"]
@@ -0,0 +1,74 @@
+import subprocess
+import sys
+from pathlib import Path
+from datetime import datetime, timedelta, timezone
+from decimal import Decimal
+
+from app.models.portfolio import Portfolio, TradeSide, TradeTransaction
+from app.services.portfolio_analytics import latest_prices, load_book, value_portfolios
+
+
+def trade(portfolio, symbol, side, quantity, price, fees, days_ago):
+    quantity, price = Decimal(quantity), Decimal(price)
+    return TradeTransaction(
+        portfolio_id=portfolio.id,
+        symbol=symbol,
+        side=side,
+        quantity=quantity,
+        price=price,
+        total_value=(quantity * price).quantize(Decimal("0.01")),
+        fees=Decimal(fees),
+        executed_at=datetime.now(timezone.utc) - timedelta(days=days_ago),
+    )
+
+
+async def make_portfolio(db, user, trades, current_cash):
+    portfolio = Portfolio(user_id=user.id, name="Learning", initial_cash=Decimal("10000"), current_cash=current_cash)
+    db.add(portfolio)
+    await db.flush()
+    db.add_all([trade(portfolio, *t) for t in trades])
+    await db.commit()
+    return portfolio
+
+
+async def test_valuation_reconciles_to_the_cent(db, user):
+    await make_portfolio(db, user, [
+        ("AAPL", TradeSide.BUY, "10", "150", "9.95", 10),
+        ("AAPL", TradeSide.BUY, "10", "170", "9.95", 8),
+        ("AAPL", TradeSide.SELL, "5", "180", "9.95", 5),
+        ("RY.TO", TradeSide.BUY, "3", "120.50", "0", 3),
+    ], current_cash=Decimal("7308.65"))
+
+    book = await load_book(db)
+    valuation = value_portfolios(book, latest_prices(book, {"AAPL": Decimal("200")}))
+    result = valuation.portfolio(0)
+
+    assert result.cash == Decimal("7308.65")
+    assert result.cash_mismatch == Decimal("0.00")
+    assert not result.oversold
+    positions = {p.symbol: p for p in result.positions}
+    assert positions["AAPL"].quantity == Decimal("15")
+    # Average cost: three quarters of the 3,219.90 paid, banker's rounded
+    assert positions["AAPL"].cost_basis == Decimal("2414.92")
+    assert positions["AAPL"].market_value == Decimal("3000.00")
+    # No quote: priced at the last trade
+    assert positions["RY.TO"].market_value == Decimal("361.50")
+
+    assert result.total_value == result.cash + result.holdings_value
+    assert result.total_pnl == result.total_value - result.initial_cash
+    assert result.realized_pnl + result.unrealized_pnl == result.total_pnl
+    assert sum(p.realized_pnl for p in result.positions) == result.realized_pnl
+
+
+async def test_oversold_portfolio_is_flagged(db, user):
+    await make_portfolio(db, user, [
+        ("SHOP", TradeSide.BUY, "1", "100", "0", 3),
+        ("SHOP", TradeSide.SELL, "2", "110", "0", 1),
+    ], current_cash=Decimal("10120"))
+    book = await load_book(db)
+    assert value_portfolios(book, latest_prices(book, {})).portfolio(0).oversold
+
+
+def test_importing_the_app_does_not_load_numpy():
+    code = "import sys, app.main; sys.exit('numpy' in sys.modules)"
+    assert subprocess.run([sys.executable, "-c", code], cwd=Path(__file__).parents[1]).returncode == 0
@@ -0,0 +1,49 @@
+import json
+
+import pytest
+from fastapi.responses import JSONResponse
+
+from app.core.serialization import FastJSONResponse, _load_backend
+
+PAYLOAD = {
+    "id": 1,
+    "title": "Épargne – TFSA 🇨🇦",
+    "messages": [{"role": "user", "content": "line\nbreak \"quoted\"", "tokens": 12.5}, None],
+    "archived": False,
+}
+
+
+def available_backends() -> list[str]:
+    names = ["json"]
+    for name in ("orjson", "msgspec"):
+        try:
+            __import__(name)
+        except ImportError:
+            continue
+        names.append(name)
+    return names
+
+
+@pytest.mark.parametrize("name", available_backends())
+def test_backends_agree_with_stdlib(name):
+    backend, dumps, loads, decode_error = _load_backend(name)
+    assert backend == name
+    assert json.loads(dumps(PAYLOAD)) == PAYLOAD
+    assert loads(dumps(PAYLOAD)) == PAYLOAD
+    assert loads(b'{"message": {"content": "hi"}, "done": false}') == {"message": {"content": "hi"}, "done": False}
+    with pytest.raises(decode_error):
+        loads(b'{"truncated": ')
+
+
+def test_stdlib_backend_renders_like_starlette():
+    _, dumps, _, _ = _load_backend("json")
+    assert dumps(PAYLOAD) == JSONResponse(PAYLOAD).body
+
+
+def test_fast_response_body():
+    assert json.loads(FastJSONResponse(PAYLOAD).body) == PAYLOAD
+
+
+def test_unknown_backend():
+    with pytest.raises(ValueError):
+        _load_backend("yaml")
@@ -0,0 +1,117 @@
+from datetime import date
+from decimal import Decimal
+
+from sqlalchemy import select
+
+from app.models.finance import BankAccount, SpendingRollup, Transaction
+from app.services.spending_rollups import RollupChanges, rebuild, spending_summary, verify
+
+MARCH = date(2024, 3, 1)
+
+
+def test_rollup_changes_net_out():
+    changes = RollupChanges()
+    changes.add(1, date(2024, 3, 5), "Dining", Decimal("-12.50"))
+    changes.add(1, date(2024, 3, 20), "Dining", Decimal("-7.50"))
+    changes.add(1, date(2024, 3, 21), "Dining", Decimal("3.00"))  # refund
+    changes.add(1, date(2024, 4, 1), "Income", Decimal("3000"))
+    changes.remove(1, date(2024, 4, 2), "Income", Decimal("3000"))
+    assert changes.totals() == {(1, MARCH, "Dining"): (3, 2000, 300)}
+
+
+async def add_transactions(db, user, rows) -> list[Transaction]:
+    account = BankAccount(user_id=user.id, name="Chequing")
+    db.add(account)
+    await db.flush()
+    transactions = [
+        Transaction(
+            user_id=user.id, account_id=account.id, posted_on=posted_on, amount=Decimal(amount),
+            description=category, merchant=category.upper(), category=category, content_hash=f"h{i}",
+        )
+        for i, (posted_on, amount, category) in enumerate(rows)
+    ]
+    db.add_all(transactions)
+    changes = RollupChanges()
+    for transaction in transactions:
+        changes.add_transaction(transaction)
+    await changes.apply(db)
+    await db.commit()
+    return transactions
+
+
+async def stored(db) -> dict:
+    result = await db.execute(select(SpendingRollup).execution_options(populate_existing=True))
+    return {
+        (row.month, row.category): (row.transaction_count, row.spent_cents, row.received_cents)
+        for row in result.scalars()
+        if row.transaction_count
+    }
+
+
+async def test_patch_and_delete_move_rollup_totals(db, user, client):
+    coffee, groceries = await add_transactions(db, user, [
+        (date(2024, 3, 5), "-5.00", "Dining"),
+        (date(2024, 3, 6), "-80.00", "Groceries"),
+    ])
+
+    response = await client.patch(f"/api/v1/transactions/{coffee.id}", json={"category": "Groceries"})
+    assert response.status_code == 200
+    assert await stored(db) == {(MARCH, "Groceries"): (2, 8500, 0)}
+
+    response = await client.patch(
+        f"/api/v1/transactions/{groceries.id}", json={"posted_on": "2024-04-01", "amount": "-90.00"}
+    )
+    assert response.status_code == 200
+    assert await stored(db) == {
+        (MARCH, "Groceries"): (1, 500, 0),
+        (date(2024, 4, 1), "Groceries"): (1, 9000, 0),
+    }
+
+    assert (await client.delete(f"/api/v1/transactions/{coffee.id}")).status_code == 204
+    assert await stored(db) == {(date(2024, 4, 1), "Groceries"): (1, 9000, 0)}
+    assert (await verify(db))["drifted"] == 0
+
+
+async def test_patch_rejects_unknown_category(user, client, db):
+    (coffee,) = await add_transactions(db, user, [(date(2024, 3, 5), "-5.00", "Dining")])
+    response = await client.patch(f"/api/v1/transactions/{coffee.id}", json={"category": "Nope"})
+    assert response.status_code == 400
+
+
+async def test_rebuild_repairs_drift(db, user):
+    await add_transactions(db, user, [
+        (date(2024, 3, 5), "-5.00", "Dining"),
+        (date(2024, 3, 15), "2500.00", "Income"),
+    ])
+    rollup = (await db.execute(select(SpendingRollup).where(SpendingRollup.category == "Dining"))).scalar_one()
+    rollup.spent_cents = 1
+    await db.commit()
+
+    report = await verify(db)
+    assert report["drifted"] == 1
+    assert report["examples"][0]["expected"] == (1, 500, 0)
+
+    assert await rebuild(db, user.id) == 2
+    assert (await verify(db))["drifted"] == 0
+
+
+async def test_spending_summary(db, user):
+    assert await spending_summary(db, user.id) is None
+    await add_transactions(db, user, [
+        (date(2024, 3, 5), "-5.00", "Dining"),
+        (date(2024, 3, 6), "-80.00", "Groceries"),
+        (date(2024, 3, 15), "2500.00", "Income"),
+    ])
+    summary = await spending_summary(db, user.id)
+    assert "2024-03: spent $85.00 (Groceries $80.00, Dining $5.00); income $2,500.00" in summary
+
+
+async def test_rollups_on_databases_without_upserts(db, user, monkeypatch):
+    monkeypatch.setattr("app.core.database._dialect_insert", lambda model: None)
+    await add_transactions(db, user, [(date(2024, 3, 5), "-5.00", "Dining")])
+    changes = RollupChanges()
+    changes.add(user.id, date(2024, 3, 9), "Dining", Decimal("-7.00"))
+    changes.add(user.id, date(2024, 3, 9), "Groceries", Decimal("-20.00"))
+    await changes.apply(db)
+    await db.commit()
+    assert await stored(db) == {(MARCH, "Dining"): (2, 1200, 0), (MARCH, "Groceries"): (1, 2000, 0)}
@@ -0,0 +1,35 @@
+import subprocess
+import sys
+from pathlib import Path
+
+from app.core.database import init_db, schema_fingerprint
+
+
+async def test_init_db_only_runs_ddl_when_models_change(db, monkeypatch):
+    assert await init_db() == "applied"
+    assert await init_db() == "up to date"
+
+    monkeypatch.setattr("app.core.database.schema_fingerprint", lambda: "changed")
+    assert await init_db() == "applied"
+    assert await init_db() == "up to date"
+
+
+async def test_init_db_modes(db, monkeypatch):
+    monkeypatch.setattr("app.core.config.settings.DB_SCHEMA_INIT", "skip")
+    assert await init_db() == "skipped"
+    monkeypatch.setattr("app.core.config.settings.DB_SCHEMA_INIT", "always")
+    assert await init_db() == "applied"
+    assert await init_db() == "applied"
+
+
+def test_schema_fingerprint_is_stable():
+    assert schema_fingerprint() == schema_fingerprint()
+
+
+def test_worker_import_skips_auth_and_http_libraries():
+    code = (
+        "import sys, app.services.job_queue, app.services.batch_jobs; "
+        "print(sorted({'jose', 'passlib', 'httpx'} & set(sys.modules)))"
+    )
+    result = subprocess.run([sys.executable, "-c", code], cwd=Path(__file__).parents[1], capture_output=True, text=True)
+    assert result.stdout.strip() == "[]", result.stderr
@@ -0,0 +1,265 @@
+import asyncio
+from datetime import date
+
+import pytest
+from sqlalchemy import func, select
+
+from app.core.database import async_session_maker
+from app.core.uploads import UploadStream
+from app.models.finance import BankAccount, SpendingRollup, StatementFormat, Transaction
+from app.services.statement_import import (
+    CSVStatementParser,
+    OFXStatementParser,
+    StatementImportError,
+    StatementRow,
+    _AmbiguousDate,
+    _DateParser,
+    _Decoder,
+    _Parser,
+    _RowError,
+    categorize,
+    content_hash,
+    import_statement,
+    normalize_merchant,
+    parse_cents,
+)
+
+BOUNDARY = "----statementtest"
+
+
+def upload(data: bytes, filename: str = "statement.csv", chunk_size: int = 7) -> UploadStream:
+    body = (
+        f'--{BOUNDARY}\r\nContent-Disposition: form-data; name="file"; filename="{filename}"\r\n'
+        f"Content-Type: application/octet-stream\r\n\r\n"
+    ).encode() + data + f"\r\n--{BOUNDARY}--\r\n".encode()
+
+    async def chunks():
+        for i in range(0, len(body), chunk_size):
+            yield body[i:i + chunk_size]
+
+    return UploadStream(f"multipart/form-data; boundary={BOUNDARY}", chunks())
+
+
+def parse_csv(text: str, chunk_size: int = 5) -> tuple[list[StatementRow], CSVStatementParser]:
+    parser = CSVStatementParser()
+    rows = []
+    for i in range(0, len(text), chunk_size):
+        rows.extend(parser.feed(text[i:i + chunk_size]))
+    rows.extend(parser.close())
+    return rows, parser
+
+
+@pytest.mark.parametrize("text, cents", [
+    ("12.34", 1234),
+    ("-$1,234.56", -123456),
+    ("(12.00)", -1200),
+    ("12.00 DR", -1200),
+    ("12.00 CR", 1200),
+    ("CAD 5", 500),
+    ("  ", None),
+])
+def test_parse_cents(text, cents):
+    assert parse_cents(text) == cents
+
+
+def test_parse_cents_rejects_garbage():
+    with pytest.raises(_RowError):
+        parse_cents("twelve")
+
+
+def test_normalize_and_categorize():
+    merchant = normalize_merchant("POS TIM HORTONS #1234 TORONTO ON")
+    assert "TIM HORTONS" in merchant
+    assert "1234" not in merchant
+    assert categorize(merchant, -250) != "Uncategorized"
+    assert categorize("SOMETHING UNKNOWN", -100) == "Uncategorized"
+    assert categorize("SOMETHING UNKNOWN", 100) == "Income"
+
+
+def test_date_parser_settles_day_month_order_once_per_file():
+    parse = _DateParser()
+    with pytest.raises(_AmbiguousDate):
+        parse("03/04/2024")
+    assert parse("05/05/2024") == date(2024, 5, 5)
+    assert parse("13/04/2024") == date(2024, 4, 13)
+    assert parse("03/04/2024") == date(2024, 4, 3)
+    # A month-first date no longer fits the file
+    with pytest.raises(_RowError):
+        parse("04/13/2024")
+
+
+def test_date_parser_formats():
+    assert _DateParser()("2024-01-05") == date(2024, 1, 5)
+    assert _DateParser()("05-Jan-2024") == date(2024, 1, 5)
+    assert _DateParser()("Jan 5, 2024") == date(2024, 1, 5)
+    with pytest.raises(_RowError):
+        _DateParser()("yesterday")
+
+
+def test_csv_with_preamble_and_quoted_newline():
+    text = (
+        "Account,12345\n"
+        "Period,2024-01\n"
+        "\n"
+        "Date,Description,Amount\n"
+        '2024-01-05,"LOBLAWS\n#12",-45.10\n'
+        "2024-01-06,PAYROLL ACME CORP,\"3,125.50\"\n"
+    )
+    rows, parser = parse_csv(text)
+    assert [(r.posted_on, r.description, r.amount) for r in rows] == [
+        (date(2024, 1, 5), "LOBLAWS\n#12", -4510),
+        (date(2024, 1, 6), "PAYROLL ACME CORP", 312550),
+    ]
+    assert parser.rejected == 0
+
+
+def test_csv_debit_credit_columns_and_rejects():
+    text = (
+        "Transaction Date,Description 1,Description 2,Debit,Credit\n"
+        "2024-02-01,NETFLIX.COM,,21.00,\n"
+        "2024-02-02,E-TRANSFER,FROM SAM,,50.00\n"
+        "not a date,BROKEN,,1.00,\n"
+        "2024-02-03,NO AMOUNT,,,\n"
+    )
+    rows, parser = parse_csv(text)
+    assert [(r.description, r.amount) for r in rows] == [("NETFLIX.COM", -2100), ("E-TRANSFER FROM SAM", 5000)]
+    assert parser.rejected == 2
+    assert parser.first_error.startswith("Row 4: invalid date")
+
+
+def test_csv_headerless_layout():
+    rows, _ = parse_csv("01/15/2024,ROGERS WIRELESS,95.00,\n01/16/2024,DEPOSIT,,100.00\n")
+    assert [(r.posted_on, r.amount) for r in rows] == [(date(2024, 1, 15), -9500), (date(2024, 1, 16), 10000)]
+
+
+def test_csv_holds_ambiguous_dates_until_the_file_settles_them():
+    text = "Date,Description,Amount\n03/04/2024,A,-1.00\n13/04/2024,B,-2.00\n"
+    rows, parser = parse_csv(text)
+    assert sorted((r.description, r.posted_on) for r in rows) == [("A", date(2024, 4, 3)), ("B", date(2024, 4, 13))]
+    assert parser.rejected == 0
+
+
+def test_csv_rejects_dates_the_file_never_settles():
+    rows, parser = parse_csv("Date,Description,Amount\n03/04/2024,A,-1.00\n04/03/2024,B,-2.00\n")
+    assert rows == []
+    assert parser.rejected == 2
+    assert "ambiguous date" in parser.first_error
+
+
+def test_csv_rejects_dates_in_a_second_format():
+    rows, parser = parse_csv("Date,Description,Amount\n2024-04-05,A,-1.00\n04/06/2024,B,-2.00\n")
+    assert [r.description for r in rows] == ["A"]
+    assert parser.first_error == "Row 3: invalid date '04/06/2024'"
+
+
+def test_csv_without_header_fails():
+    with pytest.raises(StatementImportError):
+        parse_csv("\n".join(f"line {i},x,y" for i in range(30)) + "\n")
+
+
+def test_ofx_parser():
+    ofx = (
+        "OFXHEADER:100\nDATA:OFXSGML\n\n<OFX><BANKTRANLIST>\n"
+        "<STMTTRN>\n<TRNTYPE>DEBIT\n<DTPOSTED>20240105120000\n<TRNAMT>-12.50\n<FITID>A1\n"
+        "<NAME>TIM HORTONS &amp; CO\n<MEMO>CARD 1234\n</STMTTRN>\n"
+        "<STMTTRN>\n<DTPOSTED>20240106\n<TRNAMT>bad\n<FITID>A2\n<NAME>X\n</STMTTRN>\n"
+        "</BANKTRANLIST></OFX>\n"
+    )
+    parser = OFXStatementParser()
+    rows = []
+    for i in range(0, len(ofx), 9):
+        rows.extend(parser.feed(ofx[i:i + 9]))
+    rows.extend(parser.close())
+    assert [(r.posted_on, r.amount, r.description, r.fit_id) for r in rows] == [
+        (date(2024, 1, 5), -1250, "TIM HORTONS & CO CARD 1234", "A1"),
+    ]
+    assert parser.rejected == 1
+
+
+def test_content_hash():
+    row = StatementRow(date(2024, 1, 5), -1250, "TIM HORTONS")
+    assert content_hash(row, "TIM HORTONS", 0) == content_hash(row, "TIM HORTONS", 0)
+    assert content_hash(row, "TIM HORTONS", 0) != content_hash(row, "TIM HORTONS", 1)
+    with_fit_id = StatementRow(date(2024, 1, 5), -1250, "TIM HORTONS", fit_id="A1")
+    assert content_hash(with_fit_id, "X", 0) == content_hash(
+        StatementRow(date(2024, 2, 1), 1, "Other", fit_id="A1"), "Y", 3
+    )
+
+
+CSV = (
+    "Date,Description,Amount\n"
+    "2024-03-01,STARBUCKS STORE 1,-5.00\n"
+    "2024-03-01,STARBUCKS STORE 1,-5.00\n"
+    "2024-03-02,PAYROLL ACME CORP,3000.00\n"
+    "2024-03-03,BROKEN,abc\n"
+).encode()
+
+
+async def test_import_dedups_reimports_and_updates_rollups(db, user):
+    account = BankAccount(user_id=user.id, name="Chequing")
+    db.add(account)
+    await db.commit()
+
+    statement = await import_statement(db, account, upload(CSV), batch_size=2)
+    assert statement.format == StatementFormat.CSV
+    assert statement.filename == "statement.csv"
+    assert (statement.rows_parsed, statement.rows_inserted, statement.rows_duplicate) == (3, 3, 0)
+    assert statement.rows_rejected == 1
+
+    # Same file again: the two identical coffees are told apart by occurrence
+    again = await import_statement(db, account, upload(CSV))
+    assert (again.rows_inserted, again.rows_duplicate) == (0, 3)
+    assert await db.scalar(select(func.count(Transaction.id))) == 3
+
+    rollups = {
+        row.category: (row.transaction_count, row.spent_cents, row.received_cents)
+        for row in (await db.execute(select(SpendingRollup))).scalars()
+    }
+    assert rollups["Income"] == (1, 0, 300000)
+    assert sum(count for count, _, _ in rollups.values()) == 3
+    assert sum(spent for _, spent, _ in rollups.values()) == 1000
+
+
+async def test_import_rejects_empty_file(db, user):
+    account = BankAccount(user_id=user.id, name="Chequing")
+    db.add(account)
+    await db.commit()
+    with pytest.raises(StatementImportError):
+        await import_statement(db, account, upload(b""))
+
+
+async def test_import_writes_nothing_until_the_upload_is_complete(db, user):
+    account = BankAccount(user_id=user.id, name="Chequing")
+    db.add(account)
+    await db.commit()
+    received = asyncio.Event()
+    finish = asyncio.Event()
+
+    async def slow_client():
+        async for chunk in upload(CSV, chunk_size=64).body:
+            yield chunk
+            received.set()
+            await finish.wait()
+
+    task = asyncio.create_task(
+        import_statement(db, account, UploadStream(f"multipart/form-data; boundary={BOUNDARY}", slow_client()))
+    )
+    await received.wait()
+    async with async_session_maker() as other:
+        other.add(BankAccount(user_id=user.id, name="Savings"))
+        await asyncio.wait_for(other.commit(), 1)
+    finish.set()
+    statement = await asyncio.wait_for(task, 1)
+    assert statement.rows_inserted == 3
+
+
+def test_parser_base_is_abstract():
+    with pytest.raises(TypeError):
+        _Parser()
+
+
+def test_decoder_keeps_bytes_buffered_when_falling_back_to_cp1252():
+    decoder = _Decoder()
+    # "Café" in UTF-8 is split across chunks, then a cp1252-only byte shows up
+    text = decoder.decode("Café ".encode()[:-2]) + decoder.decode(b"\xa9 \x93x\x94", final=True)
+    assert text == "CafÃ© “x”"